@@ -0,0 +1,466 @@
+# QUESTION_GENERATION/aggregate.py
+"""
+Agregat skor & latency per struktur × model × subject langsung dari outputs/**.csv,
+tanpa memuat semua CSV ke pandas.
+
+Tiap CSV dibaca streaming (csv.reader di atas baris byte, per chunk
+AGG_CHUNK_ROWS baris) dan hanya kolom yang diagregasi yang disimpan, sebagai
+matriks float32 per file. Cache per file (di memori + SQLite
+.qg_state/aggregate_cache.sqlite) dikunci (mtime, size):
+  - file tidak berubah      → tidak dibaca sama sekali
+  - file hanya bertambah    → hanya ekor baru yang di-parse (append CsvSink)
+  - file ditulis ulang      → parse ulang penuh (mis. resume menulis ulang CSV)
+Baris terakhir yang belum lengkap (run masih menulis) dibiarkan untuk refresh
+berikutnya.
+
+Statistik (n, mean, std ddof=1, kuantil) dihitung NumPy atas gabungan matriks;
+nilai kosong = NaN dan tidak dihitung. Per file satu baris per index, dengan
+aturan yang sama seperti resume: baris terverifikasi menang atas baris partial.
+
+    python aggregate.py outputs/ [--by struktur,model,topic] [--watch 30] [--json out.json]
+"""
+from __future__ import annotations
+import argparse, csv, hashlib, io, json, os, pathlib, threading, time
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from utils.state import connect_sqlite, state_path
+
+# kolom matriks per file (urutan tetap; "correct" = final_answer_accuracy == Correct)
+METRICS = (
+    "clarity",
+    "context_accuracy",
+    "quality_of_working",
+    "correct",
+    "latency_model_ms",
+    "latency_verifier_ms",
+)
+GROUP_COLS = ("struktur", "model", "topic")
+QUANTILES = (0.5, 0.9)
+
+_HEAD_BYTES = 4096
+_TAIL_BYTES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    head_hash TEXT NOT NULL,
+    tail_hash TEXT NOT NULL,
+    header TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+def _digest(b: bytes) -> str:
+    return hashlib.blake2b(b, digest_size=8).hexdigest()
+
+
+def _to_f32(values: List[str]) -> np.ndarray:
+    arr = np.asarray(values, dtype=object)
+    arr[arr == ""] = "nan"
+    try:
+        return arr.astype(np.float32)
+    except ValueError:
+        # nilai aneh (mis. "N/A") → NaN, sisanya tetap
+        out = np.empty(len(values), dtype=np.float32)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except ValueError:
+                out[i] = np.nan
+        return out
+
+
+class _FileStats:
+    """Kolom yang diagregasi dari satu CSV + posisi byte terakhir yang sudah di-parse."""
+
+    def __init__(self, header: List[str]):
+        self.header = header
+        self.mtime_ns = 0
+        self.size = 0
+        self.offset = 0
+        self.head_hash = ""
+        self.tail_hash = ""
+        self.labels: List[Tuple[str, str, str]] = []
+        self._label_ix: Dict[Tuple[str, str, str], int] = {}
+        self.values = np.empty((0, len(METRICS)), dtype=np.float32)
+        self.index = np.empty(0, dtype=np.int64)
+        self.verified = np.empty(0, dtype=bool)
+        self.codes = np.empty(0, dtype=np.int32)
+        self._deduped: Tuple[np.ndarray, np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # ---------- parse ----------
+
+    def add_rows(self, rows: List[List[str]]) -> None:
+        col = {name: i for i, name in enumerate(self.header)}
+
+        def get(name: str) -> List[str]:
+            i = col.get(name)
+            if i is None:
+                return [""] * len(rows)
+            return [r[i] if i < len(r) else "" for r in rows]
+
+        faa = get("final_answer_accuracy")
+        correct = np.array(
+            [np.nan if not v.strip() else float(v.strip().lower() == "correct") for v in faa],
+            dtype=np.float32,
+        )
+        block = np.column_stack(
+            [correct if m == "correct" else _to_f32(get(m)) for m in METRICS]
+        ).astype(np.float32, copy=False)
+
+        idx = _to_f32(get("index"))
+        keys = list(zip(get("topic"), get("struktur"), get("model")))
+        codes = np.empty(len(rows), dtype=np.int32)
+        for i, k in enumerate(keys):
+            c = self._label_ix.get(k)
+            if c is None:
+                c = self._label_ix[k] = len(self.labels)
+                self.labels.append(k)
+            codes[i] = c
+
+        self.values = np.concatenate([self.values, block])
+        self.index = np.concatenate([self.index, np.nan_to_num(idx, nan=0).astype(np.int64)])
+        self.verified = np.concatenate([self.verified, np.array([bool(v) for v in get("verifier_model")])])
+        self.codes = np.concatenate([self.codes, codes])
+        self._deduped = None
+
+    def deduped(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(values, codes) dengan satu baris per index (terverifikasi pertama, atau partial terakhir)."""
+        if self._deduped is None:
+            self._deduped = self._dedup()
+        return self._deduped
+
+    def _dedup(self) -> Tuple[np.ndarray, np.ndarray]:
+        keep = self.index > 0
+        if len(np.unique(self.index[keep])) == int(keep.sum()):
+            return self.values[keep], self.codes[keep]
+        pos = np.arange(len(self.index))
+        order = np.lexsort((np.where(self.verified, pos, -pos), ~self.verified, self.index))
+        order = order[self.index[order] > 0]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = self.index[order][1:] != self.index[order][:-1]
+        sel = np.sort(order[first])
+        return self.values[sel], self.codes[sel]
+
+    # ---------- cache (SQLite) ----------
+
+    def to_blob(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(buf, values=self.values, index=self.index, verified=self.verified, codes=self.codes)
+        return buf.getvalue()
+
+    @classmethod
+    def from_record(cls, rec: Tuple) -> "_FileStats":
+        _, mtime_ns, size, offset, head_hash, tail_hash, header, labels, data = rec
+        fs = cls(json.loads(header))
+        fs.mtime_ns, fs.size, fs.offset = mtime_ns, size, offset
+        fs.head_hash, fs.tail_hash = head_hash, tail_hash
+        fs.labels = [tuple(x) for x in json.loads(labels)]
+        fs._label_ix = {k: i for i, k in enumerate(fs.labels)}
+        with np.load(io.BytesIO(data), allow_pickle=False) as z:
+            fs.values, fs.index, fs.verified, fs.codes = z["values"], z["index"], z["verified"], z["codes"]
+        return fs
+
+
+def _record_lines(fh, counter: List[int]) -> Iterator[str]:
+    # csv.reader menarik baris satu per satu tanpa read-ahead → counter[0] =
+    # byte yang sudah dikonsumsi reader sampai record terakhir yang di-yield
+    for raw in fh:
+        if not raw.endswith(b"\n"):
+            return  # baris terakhir belum selesai ditulis
+        counter[0] += len(raw)
+        yield raw.decode("utf-8")
+
+
+class Aggregator:
+    """
+    Agregator outputs/**.csv dengan cache per file. Satu instance bisa di-refresh
+    berulang kali (mis. --watch), hanya file baru/berubah yang dibaca.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike = "outputs",
+        *,
+        cache_path: str | os.PathLike | None = None,
+        persist: bool = True,
+        chunk_rows: int | None = None,
+    ):
+        self.root = pathlib.Path(root)
+        self.chunk_rows = max(1, chunk_rows or int(os.getenv("AGG_CHUNK_ROWS", "4096")))
+        self._files: Dict[str, _FileStats] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self.last_refresh: Dict[str, int] = {}
+        # hasil aggregate() terakhir per (by, quantiles); dibuang kalau ada file berubah
+        self._memo: Dict[Tuple, List[Dict[str, Any]]] = {}
+        if persist:
+            path = cache_path or os.getenv("AGG_CACHE") or state_path("aggregate_cache.sqlite")
+            self._db = connect_sqlite(path)
+            self._db.executescript(_SCHEMA)
+            for rec in self._db.execute("SELECT * FROM files"):
+                self._files[rec[0]] = _FileStats.from_record(rec)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---------- scan ----------
+
+    def _csv_files(self) -> List[pathlib.Path]:
+        if self.root.is_file():
+            return [self.root]
+        return sorted(p for p in self.root.rglob("*.csv") if not p.name.startswith("_"))
+
+    def _parse(self, path: pathlib.Path, fs: _FileStats | None, st: os.stat_result) -> _FileStats:
+        with path.open("rb") as fh:
+            # hanya ekor baru yang dibaca kalau byte awal file + byte sebelum
+            # offset lama masih sama (file cuma bertambah, bukan ditulis ulang)
+            appendable = fs is not None and 0 < fs.offset <= st.st_size
+            if appendable:
+                appendable = _digest(fh.read(min(fs.offset, _HEAD_BYTES))) == fs.head_hash
+            if appendable:
+                fh.seek(fs.offset - min(fs.offset, _TAIL_BYTES))
+                appendable = _digest(fh.read(min(fs.offset, _TAIL_BYTES))) == fs.tail_hash
+            start = fs.offset if appendable else 0
+            if not appendable:
+                fs = None
+            fh.seek(start)
+
+            counter = [0]
+            reader = csv.reader(_record_lines(fh, counter), strict=True)
+            done = 0  # byte sampai record lengkap terakhir
+            if fs is None:
+                try:
+                    fs = _FileStats(next(reader))
+                    done = counter[0]
+                except (StopIteration, csv.Error):
+                    fs = _FileStats([])
+            chunk: List[List[str]] = []
+            try:
+                for row in reader:
+                    chunk.append(row)
+                    done = counter[0]
+                    if len(chunk) >= self.chunk_rows:
+                        fs.add_rows(chunk)
+                        chunk = []
+            except csv.Error:
+                pass  # record terpotong di akhir file → dibaca lagi saat refresh berikutnya
+            if chunk:
+                fs.add_rows(chunk)
+
+            fs.offset = start + done
+            fh.seek(0)
+            fs.head_hash = _digest(fh.read(min(fs.offset, _HEAD_BYTES)))
+            fh.seek(fs.offset - min(fs.offset, _TAIL_BYTES))
+            fs.tail_hash = _digest(fh.read(min(fs.offset, _TAIL_BYTES)))
+        fs.mtime_ns, fs.size = st.st_mtime_ns, st.st_size
+        self.last_refresh["tail" if appendable else "full"] += 1
+        return fs
+
+    def refresh(self) -> Dict[str, int]:
+        """Sinkronkan cache dengan isi root. Return jumlah file per aksi (skip/tail/full/removed)."""
+        with self._lock:
+            self.last_refresh = {"skip": 0, "tail": 0, "full": 0, "removed": 0}
+            seen, changed = set(), []
+            under = self.root.resolve().as_posix()
+            for path in self._csv_files():
+                key = under if path == self.root else f"{under}/{path.relative_to(self.root).as_posix()}"
+                seen.add(key)
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                fs = self._files.get(key)
+                if fs is not None and (fs.mtime_ns, fs.size) == (st.st_mtime_ns, st.st_size):
+                    self.last_refresh["skip"] += 1
+                    continue
+                self._files[key] = self._parse(path, fs, st)
+                changed.append(key)
+            removed = [
+                k for k in self._files
+                if k not in seen and (k == under or k.startswith(under.rstrip("/") + "/"))
+            ]
+            for k in removed:
+                del self._files[k]
+            self.last_refresh["removed"] = len(removed)
+            if changed or removed:
+                self._memo.clear()
+            if self._db is not None and (changed or removed):
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._db.executemany("DELETE FROM files WHERE path = ?", [(k,) for k in removed])
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                k, fs.mtime_ns, fs.size, fs.offset, fs.head_hash, fs.tail_hash,
+                                json.dumps(fs.header), json.dumps(fs.labels), fs.to_blob(),
+                            )
+                            for k in changed
+                            for fs in (self._files[k],)
+                        ],
+                    )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+            return dict(self.last_refresh)
+
+    # ---------- agregasi ----------
+
+    def _combined(self) -> Tuple[np.ndarray, List[Tuple[str, str, str]], np.ndarray]:
+        labels: List[Tuple[str, str, str]] = []
+        label_ix: Dict[Tuple[str, str, str], int] = {}
+        values, codes = [], []
+        under = self.root.resolve().as_posix()
+        for key in sorted(self._files):
+            if key != under and not key.startswith(under.rstrip("/") + "/"):
+                continue
+            v, c = self._files[key].deduped()
+            remap = np.array(
+                [label_ix.setdefault(k, len(label_ix)) for k in self._files[key].labels] or [0],
+                dtype=np.int32,
+            )
+            values.append(v)
+            codes.append(remap[c])
+        labels = list(label_ix)
+        if not values:
+            return np.empty((0, len(METRICS)), dtype=np.float32), labels, np.empty(0, dtype=np.int32)
+        return np.concatenate(values), labels, np.concatenate(codes)
+
+    def aggregate(
+        self,
+        by: Sequence[str] = GROUP_COLS,
+        *,
+        quantiles: Sequence[float] = QUANTILES,
+        refresh: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """
+        Satu dict per grup `by` (subset dari struktur/model/topic), berisi
+        n_items, lalu per metrik: {metrik}_n, _mean, _std, _p50, _p90, ...
+        (correct_mean = Correct rate atas item terverifikasi).
+        """
+        bad = [b for b in by if b not in GROUP_COLS]
+        if bad:
+            raise ValueError(f"by harus subset dari {GROUP_COLS}, bukan {bad}")
+        if refresh:
+            self.refresh()
+        memo_key = (tuple(by), tuple(quantiles))
+        if memo_key in self._memo:
+            return [dict(d) for d in self._memo[memo_key]]
+        with self._lock:
+            values, labels, codes = self._combined()
+        # label per file = (topic, struktur, model)
+        pos = {"topic": 0, "struktur": 1, "model": 2}
+        group_keys = sorted({tuple(lab[pos[b]] for b in by) for lab in labels})
+        gix = {k: i for i, k in enumerate(group_keys)}
+        to_group = np.array([gix[tuple(lab[pos[b]] for b in by)] for lab in labels] or [0], dtype=np.int32)
+        g = to_group[codes] if len(codes) else codes
+        ng = len(group_keys)
+
+        counts = np.bincount(g, minlength=ng)
+        out = [dict(zip(by, k), n_items=int(counts[i])) for i, k in enumerate(group_keys)]
+
+        for j, m in enumerate(METRICS):
+            col = values[:, j].astype(np.float64)
+            ok = ~np.isnan(col)
+            gv, v = g[ok], col[ok]
+            n = np.bincount(gv, minlength=ng)
+            s = np.bincount(gv, weights=v, minlength=ng)
+            ss = np.bincount(gv, weights=v * v, minlength=ng)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = s / n
+                std = np.sqrt(np.maximum((ss - n * mean ** 2) / (n - 1), 0.0))
+            # kuantil semua grup sekaligus: urutkan (grup, nilai), interpolasi
+            # linear di posisi start + q·(n-1) (sama dengan np.quantile default)
+            v = v[np.lexsort((v, gv))]
+            start = np.concatenate([[0], np.cumsum(n)[:-1]])
+            qv = {}
+            for q in quantiles:
+                p = start + q * np.maximum(n - 1, 0)
+                lo = np.floor(p).astype(np.int64)
+                hi = np.minimum(lo + 1, start + np.maximum(n - 1, 0))
+                if len(v):
+                    lo_v, hi_v = v[np.minimum(lo, len(v) - 1)], v[np.minimum(hi, len(v) - 1)]
+                    qv[q] = lo_v + (hi_v - lo_v) * (p - lo)
+            for i in range(ng):
+                d = out[i]
+                d[f"{m}_n"] = int(n[i])
+                d[f"{m}_mean"] = float(mean[i]) if n[i] else None
+                d[f"{m}_std"] = float(std[i]) if n[i] > 1 else None
+                for q in quantiles:
+                    d[f"{m}_p{round(q * 100)}"] = float(qv[q][i]) if n[i] else None
+        self._memo[memo_key] = out
+        return [dict(d) for d in out]
+
+
+def _fmt(v: Any, spec: str, scale: float = 1.0) -> str:
+    return "-" if v is None else format(v / scale, spec)
+
+
+def print_table(rows: List[Dict[str, Any]], by: Sequence[str]) -> None:
+    widths = [max([len(b)] + [len(str(r[b])) for r in rows]) for b in by]
+
+    def score(r: Dict[str, Any], m: str) -> str:
+        return f"{_fmt(r[m + '_mean'], '.2f')}±{_fmt(r[m + '_std'], '.2f')}"
+
+    def secs(r: Dict[str, Any], m: str) -> str:
+        return f"{_fmt(r.get(m + '_p50'), '.1f', 1000)}/{_fmt(r.get(m + '_p90'), '.1f', 1000)}"
+
+    head = " ".join(f"{b:{w}}" for b, w in zip(by, widths))
+    print(
+        f"{head} {'n':>5} {'clarity':>11} {'context':>11} {'quality':>11} {'correct':>7}"
+        f" {'gen p50/p90 s':>14} {'judge p50/p90 s':>16}"
+    )
+    for r in rows:
+        keys = " ".join(f"{str(r[b]):{w}}" for b, w in zip(by, widths))
+        print(
+            f"{keys} {r['n_items']:5d} {score(r, 'clarity'):>11} {score(r, 'context_accuracy'):>11}"
+            f" {score(r, 'quality_of_working'):>11} {_fmt(r['correct_mean'], '.1%'):>7}"
+            f" {secs(r, 'latency_model_ms'):>14} {secs(r, 'latency_verifier_ms'):>16}"
+        )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("root", nargs="?", default="outputs")
+    ap.add_argument("--by", default=",".join(GROUP_COLS), help="subset struktur,model,topic")
+    ap.add_argument("--watch", type=float, default=0.0, help="refresh tiap N detik")
+    ap.add_argument("--json", default=None, help="tulis hasil ke file JSON")
+    ap.add_argument("--no-cache", action="store_true", help="jangan pakai/isi cache SQLite")
+    args = ap.parse_args()
+
+    by = [b.strip() for b in args.by.split(",") if b.strip()]
+    agg = Aggregator(args.root, persist=not args.no_cache)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            rows = agg.aggregate(by)
+            ms = (time.perf_counter() - t0) * 1000
+            r = agg.last_refresh
+            print(
+                f"[aggregate] {args.root}: {len(agg._files)} file, skip {r['skip']} / tail {r['tail']}"
+                f" / full {r['full']} / removed {r['removed']} ({ms:.1f} ms)"
+            )
+            print_table(rows, by)
+            if args.json:
+                pathlib.Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+            if args.watch <= 0:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agg.close()
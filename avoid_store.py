@@ -0,0 +1,106 @@
+# QUESTION_GENERATION/avoid_store.py
+"""
+Avoid-list untuk prompt generator, dibatasi token budget.
+
+Dulu avoid_set cuma bertambah (±10 term per soal), jadi di soal ke-50 daftar
+"Avoid reusing ..." sudah ratusan token, prompt eval makin lama dan num_ctx
+2048 bisa terpotong diam-diam. AvoidTermStore menyimpan term + statistiknya,
+lalu tiap item hanya mengirim term dengan skor tertinggi yang muat budget.
+
+Skor (hibrida LRU/LFU): freq * 0.5 ** (umur / half_life)
+  freq     = berapa soal yang memakai term ini
+  umur     = jumlah soal sejak term terakhir muncul
+Urutan output = urutan pertama kali term masuk, jadi deterministik
+(tidak tergantung hash seed seperti set lama).
+
+Env:
+  AVOID_TOKEN_BUDGET  (default 120; 0 = tanpa batas)
+  AVOID_HALF_LIFE     (default 10 soal)
+  AVOID_MAX_TERMS     (default 500; term skor terendah dibuang)
+"""
+from __future__ import annotations
+import os
+from typing import Dict, Iterable, List
+
+from normalize import extract_avoid_terms
+
+
+def estimate_tokens(text: str) -> int:
+    # kasar: ~4 karakter per token (sama dengan estimasi di validator_gemini)
+    return (len(text) + 3) // 4
+
+
+class AvoidTermStore:
+    def __init__(
+        self,
+        *,
+        token_budget: int | None = None,
+        half_life: float | None = None,
+        max_terms: int | None = None,
+    ):
+        if token_budget is None:
+            token_budget = int(os.getenv("AVOID_TOKEN_BUDGET", "120") or 0)
+        if half_life is None:
+            half_life = float(os.getenv("AVOID_HALF_LIFE", "10") or 10)
+        if max_terms is None:
+            max_terms = int(os.getenv("AVOID_MAX_TERMS", "500") or 500)
+        self.token_budget = max(0, token_budget)
+        self.half_life = max(half_life, 1e-6)
+        self.max_terms = max(1, max_terms)
+        self.items = 0
+        # term -> [freq, last_seen]; dict menjaga urutan insert
+        self._terms: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _score(self, term: str) -> float:
+        freq, last = self._terms[term]
+        return freq * 0.5 ** ((self.items - last) / self.half_life)
+
+    def add(self, terms: Iterable[str]) -> None:
+        """Catat term dari SATU soal (dihitung sebagai satu langkah waktu)."""
+        self.items += 1
+        for t in dict.fromkeys(terms):
+            st = self._terms.get(t)
+            if st is None:
+                self._terms[t] = [1, self.items]
+            else:
+                st[0] += 1
+                st[1] = self.items
+        if len(self._terms) > self.max_terms:
+            keep = sorted(self._terms, key=self._score, reverse=True)[: self.max_terms]
+            keep_set = set(keep)
+            self._terms = {t: st for t, st in self._terms.items() if t in keep_set}
+
+    def add_stem(self, stem: str | None) -> None:
+        if stem:
+            self.add(extract_avoid_terms(stem))
+
+    def terms(self) -> List[str]:
+        """Term terpilih untuk prompt berikutnya (muat budget, urutan insert)."""
+        if not self.token_budget:
+            return list(self._terms)
+        # prioritas: skor, lalu paling baru, lalu yang masuk duluan
+        order = {t: i for i, t in enumerate(self._terms)}
+        ranked = sorted(
+            self._terms,
+            key=lambda t: (-self._score(t), -self._terms[t][1], order[t]),
+        )
+        chosen = set()
+        used = 0
+        for t in ranked:
+            cost = estimate_tokens(t + ", ")
+            if used + cost > self.token_budget:
+                continue
+            chosen.add(t)
+            used += cost
+        return [t for t in self._terms if t in chosen]
+
+    @classmethod
+    def from_stems(cls, stems: Iterable[str | None], **kwargs) -> "AvoidTermStore":
+        """Bangun ulang store dari soal tersimpan (urut index), mis. saat resume."""
+        store = cls(**kwargs)
+        for stem in stems:
+            store.add_stem(stem)
+        return store
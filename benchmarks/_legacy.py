@@ -0,0 +1,138 @@
+# QUESTION_GENERATION/benchmarks/_legacy.py
+# Salinan implementasi LAMA (sebelum parser toleran single-pass) — hanya
+# dipakai sebagai pembanding di benchmark. Jangan dipakai di kode produksi.
+import json, re
+from typing import Any, List
+
+
+def _balanced_chunk(s: str, open_ch: str, close_ch: str) -> str | None:
+    start = s.find(open_ch)
+    if start == -1: return None
+    depth = 0
+    for i, ch in enumerate(s[start:], start=start):
+        if ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return s[start:i+1]
+    return None
+
+def _sanitize(s: str) -> str:
+    s = re.sub(r",\s*([}\]])", r"\1", s)
+    s = re.sub(r'\\(?!["\\\/bfnrtu])', r"\\\\", s)
+    return s
+
+def _to_strict_json(s: str) -> str:
+    t = s
+    t = re.sub(r'([{,]\s*)([A-Za-z_]\w*)\s*:', r'\1"\2":', t)
+    t = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", lambda m: '"' + m.group(1).replace('"','\\"') + '"', t)
+    return t
+
+def extract_json_array(text: str) -> List[Any]:
+    if not text: return []
+    clean = str(text).strip()
+    clean = re.sub(r'```json|```', '', clean, flags=re.I).strip()
+    clean = clean.replace('“','"').replace('”','"').replace('’',"'").replace('‘',"'")
+
+    chunk = _balanced_chunk(clean, '[', ']')
+    if chunk is None:
+        chunk = _balanced_chunk(clean, '{', '}')
+    if chunk is None:
+        chunk = clean
+
+    jsonish = _sanitize(chunk)
+    try:
+        parsed = json.loads(jsonish)
+        return parsed if isinstance(parsed, list) else [parsed]
+    except Exception:
+        jsonish = _sanitize(_to_strict_json(jsonish))
+        parsed = json.loads(jsonish)
+        return parsed if isinstance(parsed, list) else [parsed]
+
+def extract_json_array_loose(text: str) -> List[Any]:
+    s = (text or "").strip()
+    s = s.replace("```json", "").replace("```", "").strip()
+    try:
+        arr = extract_json_array(s)
+        if isinstance(arr, list) and arr:
+            return arr
+    except Exception:
+        pass
+    start = s.find("[")
+    if start == -1:
+        return []
+    depth = 0
+    end = -1
+    for i, ch in enumerate(s[start:], start=start):
+        if ch == "[":
+            depth += 1
+        elif ch == "]":
+            depth -= 1
+            if depth == 0:
+                end = i
+                break
+    if end == -1:
+        return []
+    chunk = s[start:end+1].strip()
+    try:
+        arr = json.loads(chunk)
+    except Exception:
+        try:
+            tmp = json.loads(chunk)
+            if isinstance(tmp, str):
+                arr = json.loads(tmp)
+            else:
+                return []
+        except Exception:
+            return []
+    if isinstance(arr, list):
+        return arr
+    return []
+
+def extract_json_object(text: str) -> dict | None:
+    s = (text or "").strip()
+    s = re.sub(r"```json|```", "", s, flags=re.I).strip()
+    start = s.find("{")
+    if start == -1:
+        return None
+    depth, end = 0, -1
+    for i, ch in enumerate(s[start:], start=start):
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                end = i
+                break
+    if end == -1:
+        return None
+    chunk = s[start:end+1]
+    chunk = chunk.replace("“", '"').replace("”", '"').replace("’", "'").replace("‘", "'")
+    chunk = re.sub(r",\s*}", "}", chunk)
+    try:
+        return json.loads(chunk)
+    except Exception:
+        return None
+
+
+def normalize_math_text(s: str) -> str:
+    if not s: return s
+    t = s
+    t = t.replace('$','')
+    t = t.replace('\\\\','\\')
+    repl = [
+        (r'\\times','×'), (r'\\cdot','·'), (r'\\pi','π'),
+        (r'\\deg|\\degree|\\circ','°'),
+        (r'\\sin','sin'), (r'\\cos','cos'), (r'\\tan','tan'),
+        (r'\\sqrt','sqrt'), (r'\\ln','ln'), (r'\\log','log'),
+        (r'\\cup','∪'), (r'\\cap','∩'), (r'\\leq','≤'), (r'\\geq','≥'),
+        (r'\\ne','≠'), (r'\\pm','±'), (r'\\left|\\right',''),
+    ]
+    for p, r in repl: t = re.sub(p, r, t)
+    t = re.sub(r'\\frac\{([^}]+)\}\{([^}]+)\}', r'(\1)/(\2)', t)
+    t = re.sub(r'\^\{(\d+)\}', r'^\1', t)
+    t = re.sub(r'[{}]', '', t)
+    t = t.replace('\\','')
+    t = re.sub(r'\s+',' ', t).strip()
+    return t
@@ -0,0 +1,188 @@
+# QUESTION_GENERATION/benchmarks/bench_aggregate.py
+"""
+aggregate.Aggregator vs "load semua CSV lalu hitung" untuk satu grid sintetis
+(3 struktur × 4 topic × 4 model × --items soal, baris dari bench_sink._rows).
+
+Cek kebenaran sebelum timing (AssertionError kalau beda):
+  - hasil agregat == referensi (csv.DictReader penuh + statistics/numpy float64)
+  - append sebagian record (run masih menulis) tidak ikut dihitung sampai lengkap
+  - append baris ke satu file → hanya file itu yang di-parse, dari ekornya saja
+  - file ditulis ulang (seperti resume) → di-parse ulang penuh
+  - cache SQLite dibaca ulang oleh instance baru → tidak ada file yang di-parse
+
+    python -m benchmarks.bench_aggregate [--items 50] [--repeats 3]
+"""
+from __future__ import annotations
+import argparse, csv, math, pathlib, random, shutil, statistics, tempfile, time
+from collections import defaultdict
+
+import numpy as np
+
+from aggregate import GROUP_COLS, METRICS, Aggregator
+from benchmarks.bench_sink import MODELS, STRUKTURS, TOPICS, _rows
+from sinks import CSV_HEADER, CsvSink, read_csv_rows
+
+
+def build_grid(root: pathlib.Path, items: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for s in STRUKTURS:
+        for t in TOPICS:
+            for m in MODELS:
+                d = root / t / s
+                d.mkdir(parents=True, exist_ok=True)
+                sink = CsvSink(d / f"{m}.csv", CSV_HEADER)
+                for row in _rows(t, s, m, items, rng):
+                    sink.write(row)
+                sink.close()
+
+
+def reference(root: pathlib.Path) -> dict:
+    """Cara notebook: baca semua baris, kelompokkan, hitung (float64, tanpa cache)."""
+    acc = defaultdict(lambda: defaultdict(list))
+    for f in sorted(root.rglob("*.csv")):
+        for r in read_csv_rows(f):
+            key = (r["struktur"], r["model"], r["topic"])
+            acc[key]["_n"].append(1)
+            for m in METRICS:
+                if m == "correct":
+                    v = r["final_answer_accuracy"]
+                    if v:
+                        acc[key][m].append(float(v == "Correct"))
+                elif r[m]:
+                    acc[key][m].append(float(r[m]))
+    out = {}
+    for key, cols in acc.items():
+        d = {"n_items": len(cols["_n"])}
+        for m in METRICS:
+            vals = cols.get(m, [])
+            d[f"{m}_mean"] = statistics.fmean(vals) if vals else None
+            d[f"{m}_std"] = statistics.stdev(vals) if len(vals) > 1 else None
+            d[f"{m}_p90"] = float(np.quantile(vals, 0.9)) if vals else None
+        out[key] = d
+    return out
+
+
+def check(agg_rows: list, ref: dict) -> None:
+    got = {tuple(r[c] for c in GROUP_COLS): r for r in agg_rows}
+    assert got.keys() == ref.keys(), (sorted(got)[:3], sorted(ref)[:3])
+    for key, want in ref.items():
+        for k, w in want.items():
+            g = got[key][k]
+            if w is None:
+                assert g is None, (key, k, g)
+            else:
+                assert math.isclose(g, w, rel_tol=1e-5, abs_tol=1e-4), (key, k, g, w)
+
+
+def _time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50)
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    tmp = pathlib.Path(tempfile.mkdtemp(prefix="qg_bench_agg_"))
+    root, cache = tmp / "outputs", tmp / "aggregate_cache.sqlite"
+    try:
+        build_grid(root, args.items)
+        agg = Aggregator(root, cache_path=cache)
+        check(agg.aggregate(), reference(root))
+        assert agg.last_refresh["full"] == len(list(root.rglob("*.csv")))
+
+        # record terpotong di akhir file (run masih menulis) → diabaikan dulu
+        target = root / "physics" / "struktur2" / "qwen.csv"
+        extra = list(_rows("physics", "struktur2", "qwen", args.items + 3, random.Random(1)))[-3:]
+        for i, r in enumerate(extra):
+            r["index"] = args.items + 1 + i
+        buf = tmp / "extra.csv"
+        with buf.open("w", newline="", encoding="utf-8") as fh:
+            csv.DictWriter(fh, fieldnames=CSV_HEADER).writerows(extra)
+        data = buf.read_bytes()
+        cut = data.index(b"\n", data.rfind(b"Multiply")) + 1  # di tengah field multiline record terakhir
+        with target.open("ab") as fh:
+            fh.write(data[:cut])
+        agg.aggregate()
+        assert agg.last_refresh == {"skip": 47, "tail": 1, "full": 0, "removed": 0}, agg.last_refresh
+        check(agg.aggregate(refresh=False), _drop_partial_tail(reference, root, target, args.items + 2))
+        with target.open("ab") as fh:
+            fh.write(data[cut:])
+        check(agg.aggregate(), reference(root))
+        assert agg.last_refresh["tail"] == 1
+
+        # resume menulis ulang file → parse penuh
+        rows = read_csv_rows(target)
+        rows[0]["clarity"] = "1.5"
+        with target.open("w", newline="", encoding="utf-8") as fh:
+            w = csv.DictWriter(fh, fieldnames=CSV_HEADER)
+            w.writeheader()
+            w.writerows(rows)
+        check(agg.aggregate(), reference(root))
+        assert agg.last_refresh["full"] == 1, agg.last_refresh
+        agg.close()
+
+        # instance baru (proses lain) → semua dari cache SQLite
+        agg2 = Aggregator(root, cache_path=cache)
+        check(agg2.aggregate(), reference(root))
+        assert agg2.last_refresh["skip"] == 48, agg2.last_refresh
+        agg2.close()
+        print("[equivalence] agregat == referensi (full, tail append, record terpotong, rewrite, cache)")
+
+        n = sum(1 for f in root.rglob("*.csv") for _ in read_csv_rows(f))
+
+        def cold():
+            a = Aggregator(root, persist=False)
+            a.aggregate()
+
+        warm_agg = Aggregator(root, cache_path=cache)
+        grow_rows = iter(_rows("biology", "struktur1", "phi", 10_000, random.Random(2)))
+        grow = root / "biology" / "struktur1" / "phi.csv"
+
+        def append_one():
+            sink = CsvSink(grow, CSV_HEADER)
+            sink.write(next(grow_rows))
+            sink.close()
+            warm_agg.aggregate()
+
+        timings = [
+            ("reference (DictReader + stats)", lambda: reference(root)),
+            ("aggregator, cold", cold),
+            ("aggregator, refresh no change", warm_agg.aggregate),
+            ("aggregator, 1 file appended", append_one),
+        ]
+        base = None
+        for name, fn in timings:
+            t = _time(fn, args.repeats)
+            base = base or t
+            print(f"[aggregate] {n} baris, {name:32} {t * 1000:8.1f} ms  ({t / base:.2f}x)")
+        warm_agg.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _drop_partial_tail(ref_fn, root: pathlib.Path, target: pathlib.Path, complete_upto: int) -> dict:
+    # referensi dihitung dari salinan tree tanpa record yang terpotong
+    copy = root.parent / "ref_copy"
+    shutil.rmtree(copy, ignore_errors=True)
+    shutil.copytree(root, copy)
+    t = copy / target.relative_to(root)
+    rows = [r for r in read_csv_rows(t) if int(r["index"]) <= complete_upto]
+    with t.open("w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=CSV_HEADER)
+        w.writeheader()
+        w.writerows(rows)
+    try:
+        return ref_fn(copy)
+    finally:
+        shutil.rmtree(copy, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
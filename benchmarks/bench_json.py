@@ -0,0 +1,106 @@
+# QUESTION_GENERATION/benchmarks/bench_json.py
+"""
+Microbenchmark parser JSON: implementasi lama (benchmarks/_legacy.py) vs
+json_utils.parse_tolerant. Tanpa network.
+
+Sebelum timing, hasil lama dan baru dicek sama untuk setiap sampel yang
+berhasil di-parse keduanya; kalau beda, AssertionError. Input dengan nesting
+sangat dalam juga harus gagal sebagai parse biasa (bukan RecursionError).
+
+    python -m benchmarks.bench_json [--rounds 2000]
+"""
+from __future__ import annotations
+import argparse, timeit
+
+from benchmarks import _legacy
+from json_utils import TolerantParseError, extract_json_array, parse_tolerant
+from quiz_service import _extract_json_array_loose
+from validator_gemini import _extract_json_object
+
+ITEM = (
+    '{"question": "A car accelerates uniformly from 12 m/s to 30 m/s in 6 s. What is its acceleration?", '
+    '"options": ["2.00 m/s^2", "3.00 m/s^2", "4.50 m/s^2", "5.00 m/s^2"], "answer": "B", '
+    '"solution": "a = (v - u)/t = (30 - 12)/6 = 3.00 m/s^2."}'
+)
+JUDGE = (
+    '{"solution_verifier": "a = 18/6 = 3 m/s^2, option B.", "scores": {"clarity": 4.5, '
+    '"context_accuracy": 4.0, "quality_of_working": 4.5, "final_answer_accuracy": "Correct"}, '
+    '"notes": "Clear stem.\\nRealistic values."}'
+)
+
+GENERATOR_SAMPLES = {
+    "clean": f"[{ITEM}]",
+    "fenced": f"```json\n[{ITEM}]\n```",
+    "prose+trailing_comma": f"Here is your question:\n[{ITEM[:-1]},}}]\nLet me know!",
+    "smart_quotes": f"[{ITEM}]".replace('"question"', "“question”"),
+    "bare_keys_single_quotes": "[{question: 'What is 2+3?', options: ['4','5','6','7'], answer: 'B', solution: 'add'}]",
+    "latex_backslashes": '[{"question": "Evaluate \\sqrt{16} + \\pi", "options": ["a","b","c","d"], "answer": "A", "solution": "\\sqrt{16} = 4"}]',
+    "double_encoded": '"[' + ITEM.replace('"', '\\"') + ']"',
+    "truncated": f"[{ITEM[:120]}",
+}
+JUDGE_SAMPLES = {
+    "clean": JUDGE,
+    "fenced": f"```json\n{JUDGE}\n```",
+    "trailing_comma": JUDGE[:-1] + ",}",
+}
+
+
+def _bench(fn, text: str, rounds: int) -> float:
+    """Mikrodetik per panggilan, terbaik dari 5 ulangan (exception tetap dihitung)."""
+    def call():
+        try:
+            fn(text)
+        except Exception:
+            pass
+    return min(timeit.repeat(call, number=rounds, repeat=5)) / rounds * 1e6
+
+
+def _result(fn, text: str):
+    """Hasil parse, atau None kalau gagal / kosong."""
+    try:
+        return fn(text) or None
+    except Exception:
+        return None
+
+
+def _check_deep_nesting() -> None:
+    """Output model yang degenerate ("[[[[..." ribuan level) tidak boleh menjatuhkan run."""
+    for depth in (1500, 100_000):
+        deep = "[" * depth + "]" * depth
+        for text in (deep, f"Here you go: {deep}", "[" * depth):
+            try:
+                parse_tolerant(text, "array")
+            except TolerantParseError:
+                pass
+            # extractor menangkap ValueError saja: apa pun selain itu lolos ke sini
+            _extract_json_array_loose(text)
+            _extract_json_object('{"a": ' + text + "}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=2000)
+    args = ap.parse_args()
+    _check_deep_nesting()
+
+    pairs = [
+        ("extract_json_array", _legacy.extract_json_array, extract_json_array, GENERATOR_SAMPLES),
+        ("_extract_json_array_loose", _legacy.extract_json_array_loose, _extract_json_array_loose, GENERATOR_SAMPLES),
+        ("_extract_json_object", _legacy.extract_json_object, _extract_json_object, JUDGE_SAMPLES),
+    ]
+    print(f"{'function':28} {'sample':26} {'old µs':>9} {'new µs':>9} {'speedup':>8}  old/new ok")
+    for name, old, new, samples in pairs:
+        for label, text in samples.items():
+            r_old, r_new = _result(old, text), _result(new, text)
+            if r_old is not None and r_new is not None:
+                assert r_old == r_new, (name, label, r_old, r_new)
+            t_old = _bench(old, text, args.rounds)
+            t_new = _bench(new, text, args.rounds)
+            print(
+                f"{name:28} {label:26} {t_old:9.1f} {t_new:9.1f} {t_old / t_new:7.2f}x"
+                f"  {r_old is not None!s:>5}/{r_new is not None!s}"
+            )
+
+
+if __name__ == "__main__":
+    main()
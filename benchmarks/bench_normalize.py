@@ -0,0 +1,81 @@
+# QUESTION_GENERATION/benchmarks/bench_normalize.py
+"""
+normalize_math_text lama (benchmarks/_legacy.py, ~22 re.sub berurutan) vs
+versi tabel + 2 scan di normalize.py. Sebelum timing, output keduanya
+dicek IDENTIK pada korpus contoh + string acak (golden equivalence);
+kalau beda, script berhenti dengan AssertionError.
+
+    python -m benchmarks.bench_normalize [--rounds 2000] [--fuzz 20000]
+"""
+from __future__ import annotations
+import argparse, random, timeit
+
+from benchmarks import _legacy
+from normalize import normalize_math_text, normalize_many
+
+SAMPLES = {
+    "plain": "Sebuah mobil bergerak dengan kecepatan 20 m/s selama 5 s. Berapa jarak tempuhnya?",
+    "inline_math": "Nilai $x$ jika $2x + 3 = 11$ adalah ...",
+    "latex_heavy": (
+        "$\\frac{\\sqrt{3}}{2} \\times \\pi r^{2} + \\left( \\sin 30^\\circ \\cdot \\cos 60^\\circ \\right)"
+        " \\leq \\frac{a}{b} \\pm 10^{3}$"
+    ),
+    "double_backslash": "\\\\frac{1}{2} \\\\times 4 \\\\neq 3, A \\\\cup B \\\\cap C",
+    "degree_edge": "sudut 45\\degree, \\deg, \\circ;  \\left|x\\right|  \\geq 0",
+    "nested_braces": "\\frac{\\frac{1}{2}}{3} + {{x}}^{12} + e^{-x}",
+    "empty": "",
+}
+
+_TOKENS = [
+    "\\", "\\\\", "$", "{", "}", "^", "^{", "^{2}", "\\frac", "\\frac{a}{b}", "\\times",
+    "\\cdot", "\\pi", "\\pm", "\\deg", "\\degree", "\\circ", "\\sin", "\\cos", "\\tan",
+    "\\sqrt", "\\ln", "\\log", "\\leq", "\\left", "\\right", "\\ne", "\\neq", "\\geq",
+    "\\cup", "\\cap", "x", "12", " ", "  ", "\n", "\t", "\xa0", "(", ")", "/", "a", "b",
+]
+
+
+def _fuzz(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rng.choice(_TOKENS) for _ in range(rng.randint(1, 25)))
+
+
+def check_equivalence(n_fuzz: int) -> int:
+    cases = list(SAMPLES.values()) + list(_fuzz(n_fuzz))
+    for s in cases:
+        old, new = _legacy.normalize_math_text(s), normalize_math_text(s)
+        assert old == new, f"beda untuk {s!r}: lama={old!r} baru={new!r}"
+    assert normalize_many(cases) == [_legacy.normalize_math_text(s) for s in cases]
+    return len(cases)
+
+
+def _bench(fn, arg, rounds: int) -> float:
+    """Mikrodetik per panggilan, terbaik dari 5 ulangan."""
+    return min(timeit.repeat(lambda: fn(arg), number=rounds, repeat=5)) / rounds * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=2000)
+    ap.add_argument("--fuzz", type=int, default=20000)
+    args = ap.parse_args()
+
+    n = check_equivalence(args.fuzz)
+    print(f"[equivalence] {n} input: output lama == baru")
+
+    print(f"{'sample':18} {'old µs':>9} {'new µs':>9} {'speedup':>8}")
+    for label, text in SAMPLES.items():
+        t_old = _bench(_legacy.normalize_math_text, text, args.rounds)
+        t_new = _bench(normalize_math_text, text, args.rounds)
+        print(f"{label:18} {t_old:9.2f} {t_new:9.2f} {t_old / t_new:7.2f}x")
+
+    # batch: satu "kolom CSV" (opsi jawaban banyak yang berulang)
+    column = [s for s in SAMPLES.values()] * 50
+    rounds = max(1, args.rounds // 50)
+    t_old = _bench(lambda xs: [_legacy.normalize_math_text(x) for x in xs], column, rounds)
+    t_new = _bench(normalize_many, column, rounds)
+    print(f"{'normalize_many':18} {t_old:9.1f} {t_new:9.1f} {t_old / t_new:7.2f}x  ({len(column)} sel)")
+
+
+if __name__ == "__main__":
+    main()
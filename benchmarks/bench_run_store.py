@@ -0,0 +1,108 @@
+# QUESTION_GENERATION/benchmarks/bench_run_store.py
+"""
+Run store SQLite (run_store.py) di skala ~100k item: throughput tulis per
+ukuran batch transaksi, lalu latency query lintas run yang umum dipakai
+analisis. Baris sintetis dibuat oleh benchmarks.bench_sink._rows (prompt
+asli + avoid-list yang tumbuh), dibagi rata ke grid 3 × 4 × 4.
+
+Sebelum timing, hasil mean_scores dicek sama dengan agregasi manual di
+Python atas baris yang sama; kalau beda, AssertionError.
+
+    python -m benchmarks.bench_run_store [--items 100000] [--repeats 5]
+"""
+from __future__ import annotations
+import argparse, pathlib, random, shutil, statistics, tempfile, time
+from collections import defaultdict
+
+from benchmarks.bench_sink import MODELS, STRUKTURS, TOPICS, _rows
+from run_store import RunStore
+
+QUERIES = {
+    "mean clarity by model (physics)": lambda s: s.mean_scores(by="model", topic="physics"),
+    "mean scores by struktur (all)": lambda s: s.mean_scores(by="struktur"),
+    "count Incorrect final answers": lambda s: s.query(
+        "SELECT COUNT(*) AS n FROM verifications WHERE final_answer_accuracy = 'Incorrect'"
+    ),
+    "Incorrect items, one cell (rows)": lambda s: s.rows(
+        "i.topic = ? AND i.struktur = ? AND i.model = ? AND v.final_answer_accuracy = ?",
+        ("chemistry", "struktur2", "gemma", "Incorrect"),
+    ),
+    "clarity < 3.6, top 100 by latency": lambda s: s.query(
+        "SELECT i.id, i.model, v.clarity FROM verifications v JOIN items i ON i.id = v.item_id"
+        " WHERE v.clarity < 3.6 ORDER BY i.latency_model_ms DESC LIMIT 100"
+    ),
+    "one cell, all columns (rows)": lambda s: s.rows(
+        "i.topic = ? AND i.struktur = ? AND i.model = ?", ("biology", "struktur3", "phi")
+    ),
+}
+
+
+def fill(store: RunStore, items: int, batch: int, seed: int = 0) -> tuple[int, float, list]:
+    rng = random.Random(seed)
+    cells = [(t, s, m) for s in STRUKTURS for t in TOPICS for m in MODELS]
+    per_cell = max(1, items // len(cells))
+    runs_per_cell = max(1, per_cell // 50)  # run @50 soal, seperti grid sungguhan
+    n = 0
+    all_rows = []
+    elapsed = 0.0
+    for t, s, m in cells:
+        for r in range(runs_per_cell):
+            rows = list(_rows(t, s, m, per_cell // runs_per_cell, rng))
+            all_rows.extend(rows)
+            t0 = time.perf_counter()
+            run_id = store.start_run(f"outputs/{t}/{s}/{m}_{r:05d}.csv", topic=t, struktur=s, model=m)
+            for i in range(0, len(rows), batch):
+                n += store.write_rows(run_id, rows[i:i + batch])
+            store.finish_run(run_id)
+            elapsed += time.perf_counter() - t0
+    return n, elapsed, all_rows
+
+
+def check_equivalence(store: RunStore, rows: list) -> None:
+    acc = defaultdict(list)
+    for r in rows:
+        if r["topic"] == "physics" and r["verifier_model"]:
+            acc[r["model"]].append(float(r["clarity"]))
+    got = {d["model"]: (d["n"], d["clarity"]) for d in store.mean_scores(by="model", topic="physics")}
+    want = {m: (len(v), sum(v) / len(v)) for m, v in acc.items()}
+    assert got.keys() == want.keys(), (got, want)
+    for m in want:
+        assert got[m][0] == want[m][0] and abs(got[m][1] - want[m][1]) < 1e-9, (m, got[m], want[m])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--repeats", type=int, default=5)
+    args = ap.parse_args()
+
+    root = pathlib.Path(tempfile.mkdtemp(prefix="qg_bench_store_"))
+    try:
+        # batching: 1 transaksi per baris vs per 50 baris (sampel kecil, cukup untuk rasio)
+        for batch in (1, 50):
+            store = RunStore(root / f"batch{batch}.sqlite")
+            n, secs, _ = fill(store, 4800, batch)
+            print(f"[write] batch={batch:<3} {n} baris: {n / secs:8.0f} baris/s")
+            store.close()
+
+        store = RunStore(root / "runs.sqlite")
+        n, secs, rows = fill(store, args.items, 50)
+        size = (root / "runs.sqlite").stat().st_size
+        print(f"[write] {n} baris dalam {secs:.1f}s ({n / secs:.0f} baris/s), db {size / 1e6:.1f} MB")
+        check_equivalence(store, rows)
+        print("[equivalence] mean_scores == agregasi manual")
+
+        for name, q in QUERIES.items():
+            times = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                res = q(store)
+                times.append(time.perf_counter() - t0)
+            print(f"[query] {name:36} {statistics.median(times) * 1000:8.2f} ms  ({len(res)} baris)")
+        store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
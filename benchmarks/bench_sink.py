@@ -0,0 +1,173 @@
+# QUESTION_GENERATION/benchmarks/bench_sink.py
+"""
+CSV vs Parquet (sinks.py) untuk output satu grid penuh: 3 struktur × 4 topic
+× 4 model × --items soal, dengan prompt_generator asli (build_messages_single
++ avoid-list yang tumbuh lewat AvoidTermStore) dan skor/latency acak.
+
+Sebelum angka dilaporkan, isi Parquet (+ sidecar prompt) dicek IDENTIK dengan
+CSV per sel (kosong ↔ null, angka ↔ tipe numerik); kalau beda, AssertionError.
+
+    python -m benchmarks.bench_sink [--items 50] [--repeats 3]
+
+Yang diukur: ukuran di disk, dan waktu load seluruh grid untuk analisis
+(semua kolom kecuali teks prompt): csv.DictReader + konversi angka, pandas
+read_csv (kalau pandas terpasang), sinks.read_results per file run, dan
+read_results atas file gabungan (merge_results → _all.parquet).
+"""
+from __future__ import annotations
+import argparse, pathlib, random, shutil, tempfile, time
+
+from avoid_store import AvoidTermStore
+from prompting import build_messages_single
+from sinks import (
+    CSV_HEADER, MERGED_NAME, CsvSink, ParquetSink, merge_results, prompts_path_for, read_csv_rows, read_results,
+)
+
+STRUKTURS = ("struktur1", "struktur2", "struktur3")
+TOPICS = ("mathematics", "physics", "biology", "chemistry")
+MODELS = ("qwen", "gemma", "llama", "phi")
+_NUMERIC = ("index", "latency_model_ms", "latency_verifier_ms", "clarity", "context_accuracy",
+            "quality_of_working", "ttft_ms", "tokens_per_sec", "prompt_tokens", "prompt_est_tokens")
+
+
+def _rows(topic: str, struktur: str, model: str, n: int, rng: random.Random):
+    avoid = AvoidTermStore()
+    for i in range(1, n + 1):
+        msgs = build_messages_single(struktur, topic, avoid.terms())
+        prompt = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in msgs)
+        a, b = rng.randint(2, 90), rng.randint(2, 90)
+        question = f"A {rng.choice(['cart', 'beaker', 'cell', 'matrix'])} problem with {a} and {b} units: compute {a} x {b}."
+        avoid.add_stem(question)
+        partial = rng.random() < 0.03
+        yield {
+            "topic": topic, "model": model, "struktur": struktur, "index": i,
+            "latency_model_ms": rng.randint(4000, 90000),
+            "question": question,
+            "optionA": str(a * b - 1), "optionB": str(a * b), "optionC": str(a * b + 2), "optionD": str(a + b),
+            "answer": "B",
+            "solution_model": f"Multiply {a} by {b}.\nThe product is {a * b}.\nAnswer: B.",
+            "solution_verifier": "" if partial else f"Recomputed: {a} x {b} = {a * b}. Matches B.",
+            "verifier_model": "" if partial else "gemini-2.5-pro",
+            "latency_verifier_ms": "" if partial else rng.randint(3000, 40000),
+            "clarity": "" if partial else rng.choice([3.5, 4, 4.5, 5]),
+            "context_accuracy": "" if partial else rng.choice([3, 4, 5]),
+            "final_answer_accuracy": "" if partial else rng.choice(["Correct", "Correct", "Incorrect"]),
+            "quality_of_working": "" if partial else rng.choice([3.5, 4, 4.5]),
+            "judge_notes": "" if partial else "Clear stem.\nPlausible distractors.",
+            "prompt_generator": prompt,
+            "ttft_ms": "", "tokens_per_sec": round(rng.uniform(3, 15), 2),
+            "prompt_tokens": rng.randint(600, 900), "prompt_est_tokens": len(prompt) // 4,
+        }
+
+
+def build_grid(root: pathlib.Path, items: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for s in STRUKTURS:
+        for t in TOPICS:
+            for m in MODELS:
+                d = root / t / s
+                d.mkdir(parents=True, exist_ok=True)
+                csv_sink = CsvSink(d / f"{m}.csv", CSV_HEADER)
+                pq_sink = ParquetSink(d / f"{m}.parquet")
+                for row in _rows(t, s, m, items, rng):
+                    csv_sink.write(row)
+                    pq_sink.write(row)
+                csv_sink.close()
+                pq_sink.close()
+
+
+def check_equivalence(root: pathlib.Path) -> int:
+    n = 0
+    for csv_file in sorted(root.rglob("*.csv")):
+        rows = read_csv_rows(csv_file)
+        table = read_results(csv_file.with_suffix(".parquet"), prompts=True).to_pylist()
+        assert len(rows) == len(table), csv_file
+        for a, b in zip(rows, table):
+            for k, v in a.items():
+                w = b[k]
+                if v == "":
+                    assert w is None, (csv_file, k, v, w)
+                elif k in _NUMERIC:
+                    assert abs(float(w) - float(v)) < 1e-3, (csv_file, k, v, w)
+                else:
+                    assert w == v, (csv_file, k, v, w)
+            n += 1
+    return n
+
+
+def _load_csv_stdlib(root: pathlib.Path) -> int:
+    n = 0
+    for f in root.rglob("*.csv"):
+        for r in read_csv_rows(f):
+            for k in _NUMERIC:
+                float(r[k]) if r[k] else None
+            n += 1
+    return n
+
+
+def _load_csv_pandas(root: pathlib.Path) -> int:
+    import pandas as pd
+    return len(pd.concat([pd.read_csv(f) for f in root.rglob("*.csv")], ignore_index=True))
+
+
+def _load_parquet(root: pathlib.Path) -> int:
+    return read_results(root).num_rows
+
+
+def _load_merged(root: pathlib.Path) -> int:
+    return read_results(root / MERGED_NAME).num_rows
+
+
+def _best(fn, root: pathlib.Path, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(root)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50)
+    ap.add_argument("--repeats", type=int, default=3)
+    args = ap.parse_args()
+
+    root = pathlib.Path(tempfile.mkdtemp(prefix="qg_bench_sink_"))
+    try:
+        build_grid(root, args.items)
+        n = check_equivalence(root)
+        merge_results(root)
+        merged = read_results(root / MERGED_NAME, prompts=True)
+        assert merged.num_rows == n
+        assert merged.drop_columns(["source"]).to_pylist() == read_results(root, prompts=True).to_pylist()
+        print(f"[equivalence] {n} baris Parquet (per run dan gabungan) identik dengan CSV")
+
+        csv_bytes = sum(f.stat().st_size for f in root.rglob("*.csv"))
+        pq_files = [f for f in root.rglob("*.parquet") if not f.name.endswith(".prompts.parquet") and f.name != MERGED_NAME]
+        pq_bytes = sum(f.stat().st_size for f in pq_files)
+        side_bytes = sum(prompts_path_for(f).stat().st_size for f in pq_files)
+        print(f"[size] CSV {csv_bytes / 1e6:.2f} MB | Parquet {pq_bytes / 1e6:.2f} MB"
+              f" + sidecar prompt {side_bytes / 1e6:.2f} MB ({(pq_bytes + side_bytes) / csv_bytes:.1%})")
+        merged_bytes = (root / MERGED_NAME).stat().st_size + prompts_path_for(root / MERGED_NAME).stat().st_size
+        print(f"[size] gabungan {MERGED_NAME} + sidecar {merged_bytes / 1e6:.2f} MB ({merged_bytes / csv_bytes:.1%})")
+
+        loaders = [("csv (DictReader)", _load_csv_stdlib)]
+        try:
+            import pandas  # noqa: F401
+            loaders.append(("csv (pandas)", _load_csv_pandas))
+        except ImportError:
+            print("[load] pandas tidak terpasang, pandas.read_csv dilewati")
+        loaders.append(("parquet per run", _load_parquet))
+        loaders.append((f"parquet {MERGED_NAME}", _load_merged))
+        base = None
+        for name, fn in loaders:
+            t = _best(fn, root, args.repeats)
+            base = base or t
+            print(f"[load] {name:24} {t * 1000:8.1f} ms  ({t / base:.2f}x)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# QUESTION_GENERATION/benchmarks/bench_structured.py
+"""
+Laju gagal parse generator Ollama per model, tanpa vs dengan JSON schema
+(constrained decoding, OLLAMA_STRUCTURED_OUTPUT / OpenRouterService(structured=True)).
+
+Tiap model diminta --n soal dengan prompt yang sama seperti run sungguhan
+(temperature per struktur, seed beda per request), sekali tanpa schema dan
+sekali dengan schema. Output di-parse dengan parser QuizService
+(_parse_generator_output). Satu baris per model × mode di-append ke --out
+(JSONL), jadi angka per model terkumpul antar mesin / versi model.
+
+    python -m benchmarks.bench_structured --models qwen,gemma,llama,phi --n 30
+    python -m benchmarks.bench_structured --fake --malformed 0.3 --n 200   # tanpa Ollama
+
+Model = suffix env OPENROUTER_MODEL_<MODEL> (sama dengan main.py).
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, statistics, time
+from collections import Counter
+from typing import Any, Dict, List
+
+
+def measure(svc, *, n: int, struktur: str, topic: str) -> Dict[str, Any]:
+    from prompting import build_messages_single
+    from quiz_service import _parse_generator_output
+
+    messages = build_messages_single(struktur, topic)
+    temperature = 0.4 if struktur == "struktur1" else 0.75
+    fails: Counter = Counter()
+    latencies: List[int] = []
+    wasted_ms = 0
+    for i in range(n):
+        out = svc.chat(messages, temperature=temperature, seed=i)
+        latencies.append(out.latency_ms)
+        raw, fail = _parse_generator_output(out.text)
+        if raw is None:
+            fails[fail] += 1
+            wasted_ms += out.latency_ms
+    failed = sum(fails.values())
+    return {
+        "n": n,
+        "parse_failed": failed,
+        "parse_failure_rate": round(failed / n, 4) if n else 0.0,
+        "reasons": dict(fails),
+        "latency_p50_ms": int(statistics.median(latencies)) if latencies else None,
+        # waktu generasi yang terbuang karena output gagal di-parse
+        "wasted_s": round(wasted_ms / 1000, 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models", default="qwen,gemma,llama,phi", help="alias OPENROUTER_MODEL_<ALIAS>, dipisah koma")
+    ap.add_argument("--n", type=int, default=30)
+    ap.add_argument("--struktur", default="struktur1")
+    ap.add_argument("--topic", default="physics")
+    ap.add_argument("--out", default="outputs/parse_failure_rates.jsonl")
+    ap.add_argument("--fake", action="store_true", help="pakai loadtest.fakes.FakeOpenAIServer, bukan Ollama")
+    ap.add_argument("--malformed", type=float, default=0.3, help="(--fake) peluang output rusak tanpa schema")
+    ap.add_argument("--messy", type=float, default=0.2, help="(--fake) peluang output berantakan tanpa schema")
+    args = ap.parse_args()
+
+    server = None
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    if args.fake:
+        from loadtest.fakes import FakeOpenAIServer, FaultProfile
+
+        server = FakeOpenAIServer(
+            FaultProfile(latency_ms=5, malformed_rate=args.malformed, messy_rate=args.messy)
+        ).start()
+        models = ["fake"]
+        # URL dibaca saat models.openrouter di-import
+        os.environ.update({
+            "OLLAMA_OPENAI_URL": server.url,
+            "OLLAMA_OPENAI_URLS": server.url,
+            "OPENROUTER_MODEL_FAKE": "fake-7b",
+        })
+
+    from models.openrouter import OpenRouterService
+
+    out_path = pathlib.Path(args.out)
+    if not args.fake:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        print(f"{'model':10} {'schema':>6} {'n':>5} {'failed':>7} {'rate':>7} {'p50 ms':>8}  reasons")
+        for alias in models:
+            for structured in (False, True):
+                svc = OpenRouterService(alias, structured=structured, stream=False)
+                res = measure(svc, n=args.n, struktur=args.struktur, topic=args.topic)
+                rec = {
+                    "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "model": svc.model,
+                    "alias": alias.lower(),
+                    "structured": structured,
+                    "struktur": args.struktur,
+                    "topic": args.topic,
+                    **res,
+                }
+                if not args.fake:
+                    with out_path.open("a", encoding="utf-8") as fh:
+                        fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                print(
+                    f"{alias:10} {'on' if structured else 'off':>6} {res['n']:5d} {res['parse_failed']:7d}"
+                    f" {res['parse_failure_rate']:7.1%} {res['latency_p50_ms']!s:>8}  {res['reasons']}"
+                )
+    finally:
+        if server is not None:
+            server.stop()
+    if not args.fake:
+        print(f"[bench_structured] dicatat ke {out_path}")
+
+
+if __name__ == "__main__":
+    main()
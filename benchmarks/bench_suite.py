@@ -0,0 +1,172 @@
+# QUESTION_GENERATION/benchmarks/bench_suite.py
+"""
+Suite microbenchmark jalur CPU (tanpa network) di atas korpus respons
+rekaman (benchmarks/data/corpus.json: clean, fenced, truncated, LaTeX-heavy,
+double-encoded, dst.), dibandingkan dengan baseline tersimpan.
+
+    python -m benchmarks.bench_suite                    # laporan vs baseline
+    python -m benchmarks.bench_suite --check            # exit 1 kalau ada regresi
+    python -m benchmarks.bench_suite --update-baseline  # simpan angka sekarang
+
+Kecepatan CPU (terutama VM) bisa berubah ~2x antar run, jadi yang
+dibandingkan bukan µs mentah tapi "score" = waktu case / waktu workload
+referensi tetap (_reference) yang diukur tepat sebelum case itu.
+Regresi = score > baseline × (1 + --tolerance). Kalau platform beda dari
+yang tercatat di baseline, laporan memberi peringatan.
+"""
+from __future__ import annotations
+import argparse, json, pathlib, platform, re, statistics, sys, time, timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from avoid_store import AvoidTermStore
+from json_utils import extract_json_array
+from normalize import normalize_quiz, extract_avoid_terms
+from prompting import build_messages_single
+from quiz_service import _extract_json_array_loose
+from validator_gemini import _extract_json_object
+
+DATA = pathlib.Path(__file__).resolve().parent / "data"
+CORPUS = DATA / "corpus.json"
+BASELINE = DATA / "baseline.json"
+
+Case = Tuple[str, Callable[[], Any]]
+
+
+def _safe(fn: Callable[..., Any], *args: Any) -> Callable[[], Any]:
+    # exception (mis. truncated) tetap dihitung waktunya, bukan menggagalkan suite
+    def call():
+        try:
+            return fn(*args)
+        except Exception:
+            return None
+    return call
+
+
+def build_cases(corpus: Dict[str, Any]) -> List[Case]:
+    cases: List[Case] = []
+    for label, text in corpus["generator"].items():
+        cases.append((f"extract_json_array/{label}", _safe(extract_json_array, text)))
+    for label, text in corpus["generator"].items():
+        cases.append((f"_extract_json_array_loose/{label}", _safe(_extract_json_array_loose, text)))
+    for label, text in corpus["judge"].items():
+        cases.append((f"_extract_json_object/{label}", _safe(_extract_json_object, text)))
+    for label, q in corpus["quiz"].items():
+        cases.append((f"normalize_quiz/{label}", _safe(normalize_quiz, q)))
+    for label, q in corpus["quiz"].items():
+        cases.append((f"extract_avoid_terms/{label}", _safe(extract_avoid_terms, q["question"])))
+
+    # avoid-list realistis: store yang sudah melihat semua soal korpus
+    store = AvoidTermStore(token_budget=120)
+    for q in corpus["quiz"].values():
+        store.add_stem(q["question"])
+    avoid = store.terms()
+    for struktur in ("struktur1", "struktur2", "struktur3"):
+        cases.append((
+            f"build_messages_single/{struktur}",
+            _safe(build_messages_single, struktur, "physics", avoid),
+        ))
+    return cases
+
+
+def _measure(call: Callable[[], Any], rounds: int, repeats: int) -> Tuple[float, float]:
+    """
+    (µs per panggilan, score). Case dan _reference diukur berselang-seling
+    dalam potongan kecil; score = median rasio tiap pasangan, jadi perubahan
+    clock CPU di tengah run ikut ternormalisasi.
+    """
+    n = max(1, rounds // repeats)
+    case_t: List[float] = []
+    ratios: List[float] = []
+    for _ in range(repeats):
+        r = timeit.timeit(_reference, number=n)
+        c = timeit.timeit(call, number=n)
+        case_t.append(c)
+        ratios.append(c / r)
+    return min(case_t) / n * 1e6, statistics.median(ratios)
+
+
+_REF_TEXT = json.dumps({"question": "reference " * 20, "options": list("ABCD"), "n": list(range(30))})
+_REF_RE = re.compile(r"\s+")
+
+
+def _reference() -> None:
+    # campuran kerja yang mirip jalur yang diukur: json C, regex, loop Python
+    obj = json.loads(_REF_TEXT)
+    _REF_RE.sub(" ", obj["question"])
+    sum(i * i for i in obj["n"])
+
+
+def _meta() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or "",
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=2000)
+    ap.add_argument("--repeats", type=int, default=40)
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit code 1 kalau ada regresi")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--filter", default="", help="hanya case yang namanya memuat string ini")
+    args = ap.parse_args()
+
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    cases = [c for c in build_cases(corpus) if args.filter in c[0]]
+
+    baseline_path = pathlib.Path(args.baseline)
+    baseline: Dict[str, Any] = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    base = baseline.get("results", {})
+    meta = _meta()
+    if base and baseline.get("meta", {}).get("platform") != meta["platform"]:
+        print(f"[warn] baseline dari platform lain ({baseline.get('meta', {}).get('platform')}); angka hanya indikatif")
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions: List[str] = []
+    print(f"{'case':52} {'µs':>9} {'score':>8} {'baseline':>9} {'ratio':>7}")
+    for name, call in cases:
+        us, score = _measure(call, args.rounds, args.repeats)
+        results[name] = {"us": round(us, 3), "score": round(score, 4)}
+        entry = base.get(name)
+        ref = entry.get("score") if isinstance(entry, dict) else None
+        if ref:
+            ratio = score / ref
+            flag = ""
+            if ratio > 1 + args.tolerance:
+                flag = "  REGRESSION"
+                regressions.append(name)
+            elif ratio < 1 / (1 + args.tolerance):
+                flag = "  faster"
+            print(f"{name:52} {us:9.2f} {score:8.3f} {ref:9.3f} {ratio:6.2f}x{flag}")
+        else:
+            print(f"{name:52} {us:9.2f} {score:8.3f} {'-':>9} {'-':>7}")
+
+    if args.update_baseline:
+        merged = {**base, **results} if args.filter else results
+        baseline_path.write_text(
+            json.dumps(
+                {"meta": {**meta, "created": time.strftime("%Y-%m-%d"), "rounds": args.rounds}, "results": merged},
+                indent=2,
+                sort_keys=True,
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        print(f"[baseline] {len(results)} case disimpan ke {baseline_path}")
+
+    if regressions:
+        print(f"[report] {len(regressions)} regresi > {args.tolerance:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"[report] tidak ada regresi > {args.tolerance:.0%}")
+    return 1 if (args.check and regressions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# QUESTION_GENERATION/dedup_index.py
+"""
+Index near-duplicate soal (MinHash + LSH banding), persisten per topic.
+
+Stem soal dinormalisasi (normalize_math_text, lowercase, hanya alnum), dipecah
+jadi shingle karakter 5-gram, lalu diringkas jadi signature MinHash
+NUM_PERM=128. Signature dibagi BANDS=16 band × 8 baris; tiap band di-hash ke
+satu bucket dan disimpan di SQLite (.qg_state/dedup_{topic}.sqlite) dengan
+index (band, bucket). Lookup = satu query indexed untuk 16 bucket + cek
+kemiripan signature kandidat, jadi tetap sub-milidetik di ~100k item.
+
+Dengan 16×8, pasangan dengan Jaccard ≥ ~0.7 hampir pasti jadi kandidat;
+keputusan akhir pakai estimasi Jaccard dari signature ≥ DEDUP_THRESHOLD
+(default 0.8).
+"""
+from __future__ import annotations
+import hashlib, os, re, threading, time, zlib
+from typing import Dict, Tuple
+
+import numpy as np
+
+from normalize import normalize_math_text
+from utils.state import state_path, connect_sqlite
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX32 = np.uint64(0xFFFFFFFF)
+# permutasi tetap (seed konstan) → signature stabil antar run / proses
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def canonical_stem(question: str) -> str:
+    t = normalize_math_text(question or "").lower()
+    return _NON_ALNUM.sub(" ", t).strip()
+
+
+def minhash(text: str) -> np.ndarray:
+    """Signature MinHash (uint32[NUM_PERM]) dari shingle karakter teks kanonik."""
+    s = canonical_stem(text)
+    if len(s) <= SHINGLE:
+        shingles = {s}
+    else:
+        shingles = {s[i:i + SHINGLE] for i in range(len(s) - SHINGLE + 1)}
+    h = np.fromiter(
+        (zlib.crc32(x.encode("utf-8")) for x in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # (a*x + b) mod p, dipotong 32 bit; a, x < 2^32 jadi tidak overflow uint64
+    perm = ((h[:, None] * _A[None, :] + _B[None, :]) % _MERSENNE) & _MAX32
+    return perm.min(axis=0).astype(np.uint32)
+
+
+def _band_keys(sig: np.ndarray) -> list[Tuple[int, int]]:
+    raw = sig.tobytes()
+    width = ROWS * 4
+    return [
+        (b, int.from_bytes(hashlib.blake2b(raw[b * width:(b + 1) * width], digest_size=8).digest(), "big", signed=True))
+        for b in range(BANDS)
+    ]
+
+
+class NearDupIndex:
+    def __init__(self, topic: str, path: str | None = None, *, threshold: float | None = None):
+        self.topic = topic
+        self.path = path or str(state_path(f"dedup_{topic}.sqlite"))
+        if threshold is None:
+            threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " id INTEGER PRIMARY KEY, stem TEXT NOT NULL, sig BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL, bucket INTEGER NOT NULL, item_id INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands(band, bucket)")
+        self._where = " OR ".join(["(band = ? AND bucket = ?)"] * BANDS)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def _best(self, sig: np.ndarray, keys) -> Tuple[float, str] | None:
+        params = [v for k in keys for v in k]
+        rows = self._conn.execute(
+            "SELECT DISTINCT i.stem, i.sig FROM bands b JOIN items i ON i.id = b.item_id"
+            f" WHERE {self._where}",
+            params,
+        ).fetchall()
+        best = None
+        for stem, blob in rows:
+            sim = float(np.count_nonzero(np.frombuffer(blob, dtype=np.uint32) == sig)) / NUM_PERM
+            if sim >= self.threshold and (best is None or sim > best[0]):
+                best = (sim, stem)
+        return best
+
+    def query(self, question: str) -> Tuple[float, str] | None:
+        """(estimasi Jaccard, stem tersimpan) untuk near-duplicate terdekat, atau None."""
+        sig = minhash(question)
+        with self._lock:
+            return self._best(sig, _band_keys(sig))
+
+    def _insert(self, question: str, sig: np.ndarray, keys) -> None:
+        cur = self._conn.execute(
+            "INSERT INTO items(stem, sig, created) VALUES (?, ?, ?)",
+            (canonical_stem(question), sig.tobytes(), time.time()),
+        )
+        self._conn.executemany(
+            "INSERT INTO bands(band, bucket, item_id) VALUES (?, ?, ?)",
+            [(b, k, cur.lastrowid) for b, k in keys],
+        )
+
+    def check_and_add(self, question: str, *, add: bool = True) -> Tuple[float, str] | None:
+        """
+        Atomic (antar thread dan proses): kalau ada near-duplicate, return
+        (sim, stem) tanpa menyimpan; kalau tidak, simpan soal (kecuali
+        add=False) dan return None.
+        """
+        sig = minhash(question)
+        keys = _band_keys(sig)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                hit = self._best(sig, keys)
+                if hit is None and add:
+                    self._insert(question, sig, keys)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return hit
+
+    def add(self, question: str) -> None:
+        sig = minhash(question)
+        keys = _band_keys(sig)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert(question, sig, keys)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_INDEXES: Dict[str, NearDupIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_dedup_index(topic: str) -> NearDupIndex:
+    """Satu index per topic per proses (dipakai bersama sel grid yang paralel)."""
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(topic)
+        if idx is None:
+            idx = _INDEXES[topic] = NearDupIndex(topic)
+        return idx
@@ -0,0 +1,142 @@
+# QUESTION_GENERATION/grid.py
+"""
+Runner grid eksperimen penuh: struktur × topic × model (3 × 4 × 4).
+
+Sel diurutkan per model supaya tiap model Ollama di-load SEKALI (ganti model
+= puluhan detik load time yang merusak angka latency). Dalam satu model,
+beberapa sel boleh jalan paralel; budget verifier tetap dibagi lewat rate
+limiter bersama, jadi sel tambahan cukup mengantri di limiter.
+Output tiap sel tetap outputs/{topic}/{struktur}/{model}_{ts}.csv.
+"""
+from __future__ import annotations
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+from main import (
+    _build_models, _canon_topic, _csv_path, _dedup_from_env, _generation_from_env, _output_format_from_env,
+    _verify_cache_from_env, _verify_mode_from_env,
+)
+from models.openrouter import OLLAMA_OPENAI_URLS
+from quiz_service import QuizService
+
+STRUKTURS = ("struktur1", "struktur2", "struktur3")
+TOPICS = ("mathematics", "physics", "biology", "chemistry")
+MODELS = ("qwen", "gemma", "llama", "phi")
+
+Cell = Tuple[str, str, str]  # (model, struktur, topic)
+
+
+def plan_cells(
+    strukturs: Sequence[str] = STRUKTURS,
+    topics: Sequence[str] = TOPICS,
+    models: Sequence[str] = MODELS,
+) -> List[Cell]:
+    """Semua sel grid, dikelompokkan per model (urutan model sesuai input)."""
+    return [(m, s, t) for m in models for s in strukturs for t in topics]
+
+
+def run_grid(
+    strukturs: Sequence[str] = STRUKTURS,
+    topics: Sequence[str] = TOPICS,
+    models: Sequence[str] = MODELS,
+    *,
+    count: int = 4,
+    outdir: str = "outputs",
+    parallel_cells: int | None = None,
+    pipelined: bool = False,
+    verify_batch: int = 1,
+) -> List[Dict[str, object]]:
+    """
+    Jalankan seluruh grid. parallel_cells = jumlah sel (model yang sama) yang
+    jalan bersamaan; default GRID_PARALLEL_CELLS, atau OLLAMA_NUM_PARALLEL ×
+    jumlah endpoint OLLAMA_OPENAI_URLS (min 1).
+    Return ringkasan per sel: model, struktur, topic, csv, error, elapsed_s.
+    """
+    model_map = _build_models()
+    missing = [m for m in models if m not in model_map]
+    if missing:
+        raise RuntimeError(f"Model {missing} is not available. Check your environment variables.")
+
+    if parallel_cells is None:
+        parallel_cells = int(
+            os.getenv("GRID_PARALLEL_CELLS")
+            or int(os.getenv("OLLAMA_NUM_PARALLEL") or 1) * len(OLLAMA_OPENAI_URLS)
+        )
+    parallel_cells = max(1, parallel_cells)
+    verify_cache = _verify_cache_from_env()
+    dedup = _dedup_from_env()
+    output_format = _output_format_from_env()
+    verify_mode = _verify_mode_from_env()
+    generation = _generation_from_env()
+
+    cells = plan_cells(strukturs, topics, models)
+    print(f"[grid] {len(cells)} cells, {len(models)} models, parallel_cells={parallel_cells}")
+
+    def run_cell(cell: Cell) -> Dict[str, object]:
+        model, struktur, topic = cell
+        internal_topic, topic_dir = _canon_topic(topic)
+        csv_path = _csv_path(outdir, topic_dir, struktur, model)
+        t0 = time.time()
+        err = ""
+        try:
+            QuizService(
+                model_map,
+                verify_cache=verify_cache,
+                output_format=output_format,
+                **verify_mode,
+                **dedup,
+                **generation,
+            ).generate_items_incremental_to_csv(
+                topic=internal_topic,
+                model_key=model,
+                struktur=struktur,
+                count=count,
+                csv_path=csv_path,
+                pipelined=pipelined,
+                verify_batch=verify_batch,
+            )
+        except Exception as e:
+            err = f"{type(e).__name__}: {e}"
+            print(f"[grid] cell {cell} FAILED: {err}")
+        return {
+            "model": model,
+            "struktur": struktur,
+            "topic": topic,
+            "csv": csv_path.as_posix(),
+            "error": err,
+            "elapsed_s": round(time.time() - t0, 1),
+        }
+
+    summary: List[Dict[str, object]] = []
+    for model in models:
+        group = [c for c in cells if c[0] == model]
+        warmup = getattr(model_map[model], "warmup", None)
+        if callable(warmup):
+            try:
+                warmup()
+            except Exception as e:
+                print(f"[grid] warmup {model} failed: {e}")
+
+        print(f"[grid] model={model}: {len(group)} cells")
+        # satu model per waktu → tidak ada swap model di Ollama selama grup ini
+        with ThreadPoolExecutor(max_workers=parallel_cells, thread_name_prefix=f"grid-{model}") as ex:
+            summary.extend(ex.map(run_cell, group))
+
+    if verify_mode["on_verify_error"] == "defer":
+        # sisa antrian dari sel yang selesai saat judge masih jeda
+        drainer = QuizService(model_map, verify_cache=verify_cache, **verify_mode)
+        for r in summary:
+            if drainer.judge_backoff.remaining() > 0:
+                print("[grid] judge still paused; run `python verify_queue.py drain` later")
+                break
+            drainer.drain_verify_queue(str(r["csv"]))
+
+    failed = sum(1 for r in summary if r["error"])
+    print(f"[grid] done: {len(summary) - failed} ok, {failed} failed")
+    return summary
+
+
+if __name__ == "__main__":
+    # example: full grid, 50 soal per sel
+    run_grid(count=50)
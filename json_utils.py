@@ -1,48 +1,432 @@
 # QUESTION_GENERATION/json_utils.py
 import json, re
-from typing import Any, List
-
-def _balanced_chunk(s: str, open_ch: str, close_ch: str) -> str | None:
-    start = s.find(open_ch)
-    if start == -1: return None
-    depth = 0
-    for i, ch in enumerate(s[start:], start=start):
-        if ch == open_ch:
-            depth += 1
-        elif ch == close_ch:
-            depth -= 1
-            if depth == 0:
-                return s[start:i+1]
-    return None
-
-def _sanitize(s: str) -> str:
-    s = re.sub(r",\s*([}\]])", r"\1", s)
-    s = re.sub(r'\\(?!["\\\/bfnrtu])', r"\\\\", s)
-    return s
-
-def _to_strict_json(s: str) -> str:
-    t = s
-    t = re.sub(r'([{,]\s*)([A-Za-z_]\w*)\s*:', r'\1"\2":', t)
-    t = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", lambda m: '"' + m.group(1).replace('"','\\"') + '"', t)
-    return t
+from typing import Any, List, Tuple
+
+# Parser JSON toleran untuk output LLM.
+#
+# Jalur cepat: cari bracket pembuka lalu json raw_decode langsung dari situ
+# (C, satu pass, teks sebelum/sesudah JSON diabaikan). Kalau gagal, pre-repair
+# murah (regex: smart quotes, trailing comma, backslash liar) lalu raw_decode
+# sekali lagi; itu menangani kerusakan paling umum dari model kecil. Baru kalau
+# masih gagal, jalur toleran: satu pass recursive-descent yang memperbaiki sambil jalan:
+#   fence ```json, smart quotes, trailing comma, bare key, string kutip tunggal,
+#   backslash liar (LaTeX), newline mentah di string, True/False/None,
+#   koma hilang antar elemen, dan string ter-encode ganda ("[{\"a\":1}]").
+# Perbaikan yang dipakai dilaporkan sebagai list nama (lihat parse_tolerant).
+
+class TolerantParseError(ValueError):
+    pass
+
+_DECODER = json.JSONDecoder()
+_OPEN_QUOTES = {'"': '"', "'": "'", "“": "”", "”": "”"}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_WS = re.compile(r"[ \t\r\n]*")
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_BARE = re.compile(r"[A-Za-z_][\w\-]*")
+_FENCE = re.compile(r"```(?:json)?", re.I)
+_scanstring = json.decoder.scanstring
+_CTRL = re.compile(r"[\x00-\x1f]")
+_HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+# karakter yang menghentikan scan isi string, per jenis kutip pembuka
+_STR_STOP = {
+    '"': re.compile(r'[\\"\x00-\x1f]'),
+    "'": re.compile(r"[\\'\x00-\x1f]"),
+    "“": re.compile(r'[\\”"\x00-\x1f]'),
+    "”": re.compile(r'[\\”"\x00-\x1f]'),
+}
+_MAX_STARTS = 4
+# pre-repair: koma sebelum } / ], dan backslash yang bukan escape JSON valid
+# (pasangan "\\" disisihkan dulu supaya backslash keduanya tidak dianggap liar).
+# Semua template literal → substitusi tetap di C, tanpa ekspansi grup per match.
+_TRAILING_COMMA = re.compile(r",(?=\s*[}\]])")
+_STRAY_BACKSLASH = re.compile(r'\\(?!["\\/bfnrtu])')
+# karakter di posisi error raw_decode yang memang bisa diperbaiki pre-repair
+_PRE_REPAIRABLE = frozenset('\\}]“”')
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+class _Parser:
+    def __init__(self, s: str):
+        self.s = s
+        self.n = len(s)
+        self.repairs: List[str] = []
+
+    def _fix(self, name: str) -> None:
+        if name not in self.repairs:
+            self.repairs.append(name)
+
+    def _ws(self, i: int) -> int:
+        if i < self.n and self.s[i] not in " \t\r\n":
+            return i
+        return _WS.match(self.s, i).end()
+
+    def _fail(self, i: int, what: str):
+        raise TolerantParseError(f"{what} at char {i}")
+
+    def value(self, i: int, fast: bool = True) -> Tuple[Any, int]:
+        i = self._ws(i)
+        if i >= self.n:
+            self._fail(i, "unexpected end of input")
+        ch = self.s[i]
+        if fast and ch in "[{":
+            # sub-nilai yang sudah JSON valid → decoder C, tanpa jalan per token
+            try:
+                return _DECODER.raw_decode(self.s, i)
+            except ValueError:
+                pass
+        if ch == "{":
+            return self.obj(i + 1)
+        if ch == "[":
+            return self.arr(i + 1)
+        if ch in _OPEN_QUOTES:
+            return self.string(i)
+        if ch == "\\" and i + 1 < self.n and self.s[i + 1] in "\"'":
+            # \"...\" di posisi struktural (JSON yang di-escape tanpa kutip luar)
+            self._fix("stray_backslash")
+            return self.string(i + 1, escaped_delim=True)
+        m = _NUMBER.match(self.s, i)
+        if m:
+            txt = m.group()
+            try:
+                return (float(txt) if any(c in txt for c in ".eE") else int(txt)), m.end()
+            except ValueError:
+                pass
+        m = _BARE.match(self.s, i)
+        if m and m.group() in _LITERALS:
+            if m.group()[0].isupper():
+                self._fix("python_literals")
+            return _LITERALS[m.group()], m.end()
+        self._fail(i, f"unexpected character {ch!r}")
+
+    def string(self, i: int, escaped_delim: bool = False) -> Tuple[str, int]:
+        s, n = self.s, self.n
+        open_q = s[i]
+        close_q = _OPEN_QUOTES[open_q]
+        stop = _STR_STOP[open_q]
+        if open_q == "'":
+            self._fix("single_quotes")
+        elif open_q in "“”":
+            self._fix("smart_quotes")
+        if open_q == '"' and not escaped_delim:
+            # string JSON biasa → scanner C; backslash liar / error → scanner toleran di bawah
+            try:
+                val, end = _scanstring(s, i + 1, False)
+            except ValueError:
+                pass
+            else:
+                if _CTRL.search(s, i + 1, end):
+                    self._fix("control_chars")
+                return val, end
+        out: List[str] = []
+        j = start = i + 1
+        while True:
+            m = stop.search(s, j)
+            if m is None:
+                self._fail(i, "unterminated string")
+            j = m.start()
+            ch = s[j]
+            if ch == "\\":
+                if escaped_delim and j + 1 < n and s[j + 1] == open_q:
+                    out.append(s[start:j])
+                    return "".join(out), j + 2
+                out.append(s[start:j])
+                nxt = s[j + 1] if j + 1 < n else ""
+                if nxt in _ESCAPES:
+                    out.append(_ESCAPES[nxt])
+                    j += 2
+                elif nxt == "u" and _HEX4.fullmatch(s, j + 2, j + 6):
+                    out.append(chr(int(s[j + 2:j + 6], 16)))
+                    j += 6
+                elif nxt == "'" and open_q == "'":
+                    out.append("'")
+                    j += 2
+                else:
+                    # backslash liar (mis. LaTeX \sqrt) → simpan apa adanya
+                    self._fix("stray_backslash")
+                    out.append("\\")
+                    j += 1
+                start = j
+            elif ch == close_q or (open_q in "“”" and ch == '"'):
+                if open_q == "'" and not self._closes_here(j + 1):
+                    # apostrof di dalam string kutip tunggal (What's) → bukan penutup
+                    j += 1
+                    continue
+                out.append(s[start:j])
+                return "".join(out), j + 1
+            else:
+                # karakter kontrol mentah (newline di dalam string) → terima apa adanya
+                self._fix("control_chars")
+                j += 1
+
+    def _closes_here(self, j: int) -> bool:
+        j = self._ws(j)
+        return j >= self.n or self.s[j] in ",:}]"
+
+    def key(self, i: int) -> Tuple[str, int]:
+        ch = self.s[i] if i < self.n else ""
+        if ch in _OPEN_QUOTES:
+            return self.string(i)
+        if ch == "\\" and i + 1 < self.n and self.s[i + 1] in "\"'":
+            self._fix("stray_backslash")
+            return self.string(i + 1, escaped_delim=True)
+        m = _BARE.match(self.s, i)
+        if not m:
+            self._fail(i, "expected object key")
+        self._fix("bare_keys")
+        return m.group(), m.end()
+
+    def obj(self, i: int) -> Tuple[dict, int]:
+        out: dict = {}
+        i = self._ws(i)
+        expect_item = True
+        while True:
+            if i >= self.n:
+                self._fail(i, "unterminated object")
+            if self.s[i] == "}":
+                if out and expect_item:
+                    self._fix("trailing_commas")
+                return out, i + 1
+            if not expect_item:
+                self._fix("missing_commas")
+            k, i = self.key(i)
+            i = self._ws(i)
+            if i >= self.n or self.s[i] != ":":
+                self._fail(i, "expected ':'")
+            v, i = self.value(i + 1)
+            out[k] = v
+            i = self._ws(i)
+            expect_item = False
+            if i < self.n and self.s[i] == ",":
+                i = self._ws(i + 1)
+                expect_item = True
+
+    def arr(self, i: int) -> Tuple[list, int]:
+        out: list = []
+        i = self._ws(i)
+        expect_item = True
+        while True:
+            if i >= self.n:
+                self._fail(i, "unterminated array")
+            if self.s[i] == "]":
+                if out and expect_item:
+                    self._fix("trailing_commas")
+                return out, i + 1
+            if not expect_item:
+                self._fix("missing_commas")
+            v, i = self.value(i)
+            out.append(v)
+            i = self._ws(i)
+            expect_item = False
+            if i < self.n and self.s[i] == ",":
+                i = self._ws(i + 1)
+                expect_item = True
+
+
+def _has_text(chunk: str) -> bool:
+    """Ada teks selain whitespace / fence ```json ?"""
+    return bool(_FENCE.sub("", chunk).strip())
+
+
+def _find_start(s: str, want: str | None) -> int:
+    if want == "object":
+        return s.find("{")
+    a = s.find("[")
+    if want == "array":
+        return a if a != -1 else s.find("{")
+    o = s.find("{")
+    return min(x for x in (a, o) if x != -1) if (a != -1 or o != -1) else -1
+
+
+def _tolerant_from(s: str, start: int, want: str | None, repairs: List[str]) -> Tuple[Any, int]:
+    """Jalur toleran; kalau bracket pertama ternyata prosa ("[note]"), coba bracket berikutnya."""
+    first_err = None
+    for _ in range(_MAX_STARTS):
+        p = _Parser(s)
+        try:
+            # bracket terluar sudah gagal di jalur cepat → langsung jalur toleran
+            value, end = p.value(start, fast=False)
+        except (TolerantParseError, RecursionError) as e:
+            if isinstance(e, RecursionError):
+                # nesting sangat dalam (output model yang rusak) → gagal parse biasa
+                e = TolerantParseError(f"JSON nested too deeply at char {start}")
+            first_err = first_err or e
+            nxt = _find_start(s[start + 1:], want)
+            if nxt == -1:
+                break
+            start += 1 + nxt
+            continue
+        repairs += p.repairs
+        return value, end
+    raise first_err
+
+
+def _pre_repair(s: str, start: int, repairs: List[str]) -> Tuple[str, Any, int] | None:
+    """
+    Perbaikan regex satu kali pada s[start:] lalu raw_decode; return
+    (teks_diperbaiki, nilai, end) atau None (lanjut ke jalur toleran).
+    """
+    t = s[start:]
+    fixes: List[str] = []
+    if "“" in t or "”" in t:
+        t = t.replace("“", '"').replace("”", '"')
+        fixes.append("smart_quotes")
+    t, n = _TRAILING_COMMA.subn("", t)
+    if n:
+        fixes.append("trailing_commas")
+    if "\x00" not in t:
+        t, n = _STRAY_BACKSLASH.subn(r"\\\\", t.replace("\\\\", "\x00"))
+        t = t.replace("\x00", "\\\\")
+        if n:
+            fixes.append("stray_backslash")
+    if not fixes:
+        return None
+    fixed = s[:start] + t
+    try:
+        value, end = _DECODER.raw_decode(fixed, start)
+    except (ValueError, RecursionError):
+        return None
+    repairs += fixes
+    return fixed, value, end
+
+
+def parse_tolerant(text: str, want: str | None = None) -> Tuple[Any, List[str]]:
+    """
+    Parse JSON dari teks LLM. want: "array" (bracket [ pertama, fallback {),
+    "object" ({ pertama), atau None (mana yang muncul duluan).
+    Return (nilai, daftar_perbaikan). Gagal → TolerantParseError (ValueError).
+    """
+    s = str(text or "")
+    if "‘" in s or "’" in s:
+        s = s.replace("‘", "'").replace("’", "'")
+    repairs: List[str] = []
+    if "```" in s:
+        repairs.append("fence")
+
+    # JSON ter-encode ganda: seluruh teks adalah satu string JSON
+    lead = s.lstrip().lstrip("`").lstrip()
+    if lead[:4].lower() == "json":
+        lead = lead[4:].lstrip()
+    if lead[:1] == '"':
+        try:
+            inner, _ = _DECODER.raw_decode(lead)
+        except ValueError:
+            inner = None
+        if isinstance(inner, str) and inner.strip()[:1] in "[{":
+            value, more = parse_tolerant(inner, want)
+            return value, repairs + ["double_encoded"] + [r for r in more if r not in repairs]
+
+    start = _find_start(s, want)
+    if start == -1:
+        # tidak ada bracket: mungkin skalar JSON polos
+        try:
+            return _DECODER.raw_decode(s.strip())[0], repairs
+        except ValueError:
+            raise TolerantParseError("no JSON value found") from None
+
+    # jalur cepat (C): JSON valid mulai dari bracket pertama
+    try:
+        value, end = _DECODER.raw_decode(s, start)
+    except RecursionError:
+        value, end = _tolerant_from(s, start, want, repairs)
+    except json.JSONDecodeError as e:
+        # error pertama di backslash / } ] / smart quote → coba pre-repair dulu;
+        # selain itu (mis. "[catatan]" prosa) langsung jalur toleran
+        pre = _pre_repair(s, start, repairs) if s[e.pos:e.pos + 1] in _PRE_REPAIRABLE else None
+        if pre is not None:
+            s, value, end = pre
+        else:
+            value, end = _tolerant_from(s, start, want, repairs)
+    if _has_text(s[:start]) or _has_text(s[end:]):
+        repairs.append("surrounding_text")
+    if isinstance(value, str) and value.strip()[:1] in "[{":
+        inner, more = parse_tolerant(value, want)
+        return inner, repairs + ["double_encoded"] + [r for r in more if r not in repairs]
+    return value, repairs
+
 
 def extract_json_array(text: str) -> List[Any]:
     if not text: return []
-    clean = str(text).strip()
-    clean = re.sub(r'```json|```', '', clean, flags=re.I).strip()
-    clean = clean.replace('“','"').replace('”','"').replace('’',"'").replace('‘',"'")
+    parsed, _ = parse_tolerant(text, "array")
+    return parsed if isinstance(parsed, list) else [parsed]
 
-    chunk = _balanced_chunk(clean, '[', ']')
-    if chunk is None:
-        chunk = _balanced_chunk(clean, '{', '}')
-    if chunk is None:
-        chunk = clean
+class ArrayCloseTracker:
+    """
+    Lacak keseimbangan [ ] secara incremental pada teks yang datang bertahap
+    (streaming), dengan mengabaikan bracket di dalam string JSON "..." dan di
+    dalam blok <think>...</think>.
+    feed() return True begitu array terluar tertutup DAN isinya ter-parse
+    (parse_tolerant) jadi list objek yang tidak kosong. Bracket prosa seperti
+    "[kinematics]" tidak lolos cek itu → tracker di-reset dan lanjut membaca.
+    """
 
-    jsonish = _sanitize(chunk)
-    try:
-        parsed = json.loads(jsonish)
-        return parsed if isinstance(parsed, list) else [parsed]
-    except Exception:
-        jsonish = _sanitize(_to_strict_json(jsonish))
-        parsed = json.loads(jsonish)
-        return parsed if isinstance(parsed, list) else [parsed]
+    _THINK_OPEN = "<think>"
+    _THINK_CLOSE = "</think>"
+
+    def __init__(self):
+        self.text = ""
+        self.closed = False
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._in_think = False
+
+    def feed(self, chunk: str) -> bool:
+        if self.closed:
+            return True
+        self.text += chunk
+        s, i, n = self.text, self._pos, len(self.text)
+        while i < n:
+            if self._in_think:
+                k = s.find(self._THINK_CLOSE, i)
+                if k < 0:
+                    # tag penutup bisa terpotong antar chunk
+                    i = max(i, n - len(self._THINK_CLOSE) + 1)
+                    break
+                self._in_think = False
+                i = k + len(self._THINK_CLOSE)
+                continue
+            ch = s[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == "<" and self._start < 0:
+                head = s[i:i + len(self._THINK_OPEN)]
+                if head == self._THINK_OPEN:
+                    self._in_think = True
+                    i += len(head)
+                    continue
+                if len(head) < len(self._THINK_OPEN) and self._THINK_OPEN.startswith(head):
+                    break  # tunggu chunk berikutnya
+            elif self._start < 0:
+                if ch == "[":
+                    self._start, self._depth = i, 1
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "[":
+                self._depth += 1
+            elif ch == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._is_quiz_array(s[self._start:i + 1]):
+                        self._pos = i + 1
+                        self.closed = True
+                        return True
+                    # bracket prosa → cari array berikutnya
+                    self._start = -1
+            i += 1
+        self._pos = i
+        return False
+
+    @staticmethod
+    def _is_quiz_array(candidate: str) -> bool:
+        try:
+            value, _ = parse_tolerant(candidate, "array")
+        except ValueError:
+            return False
+        return isinstance(value, list) and bool(value) and all(isinstance(v, dict) for v in value)
@@ -0,0 +1,300 @@
+# QUESTION_GENERATION/loadtest/fakes.py
+"""
+Backend LLM palsu untuk load test (tanpa Ollama, tanpa kuota Gemini).
+
+FakeOpenAIServer : server HTTP OpenAI-compatible (/v1/chat/completions,
+                   non-stream + SSE) untuk OpenRouterService / GroqService.
+FakeGeminiModel  : pengganti genai.GenerativeModel (generate_content) untuk
+                   GeminiService dan Verifier (judge single + batch).
+
+Perilaku diatur FaultProfile: distribusi latency (lognormal), injeksi 429
+dengan hint "try again in Ns" / "retry in Ns", rasio JSON rusak, dan field
+token usage. Semua counter (served, rate_limited, malformed) thread-safe.
+"""
+from __future__ import annotations
+import json, math, random, re, threading, time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+_TOPICS = {
+    "Physics": ("block", "incline", "projectile", "spring", "resistor", "pendulum", "car", "lens"),
+    "Chemistry": ("NaCl", "HCl", "buffer", "titration", "electrolysis", "glucose", "ammonia", "gas"),
+    "Biology": ("allele", "enzyme", "mitochondria", "food chain", "genotype", "osmosis", "neuron", "leaf"),
+    "Mathematics": ("function", "matrix", "derivative", "integral", "sequence", "triangle", "limit", "dataset"),
+}
+
+
+@dataclass
+class FaultProfile:
+    latency_ms: float = 800.0          # median latency
+    latency_sigma: float = 0.5         # sigma lognormal (0 = konstan)
+    rate_limit_rate: float = 0.0       # peluang 429 per request
+    retry_hint_s: float = 0.5          # angka di pesan "try again in Ns"
+    malformed_rate: float = 0.0        # output tidak bisa diparse sama sekali
+    messy_rate: float = 0.0            # output rusak tapi bisa direparasi (fence, trailing comma, prosa)
+    outage_after: int = 0              # >0: setelah request ke-N, semua request 429 selama outage_s
+    outage_s: float = 0.0
+    seed: int = 0
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._outage_until: float | None = None
+
+    def in_outage(self) -> bool:
+        """Kuota habis sementara: dipanggil sekali per request, setelah count("requests")."""
+        if self.outage_after <= 0 or self.outage_s <= 0:
+            return False
+        with self._lock:
+            if self._outage_until is None:
+                if self.counters.get("requests", 0) <= self.outage_after:
+                    return False
+                self._outage_until = time.monotonic() + self.outage_s
+            return time.monotonic() < self._outage_until
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def choice(self, seq):
+        with self._lock:
+            return self._rng.choice(seq)
+
+    def latency_s(self) -> float:
+        with self._lock:
+            z = self._rng.gauss(0.0, 1.0)
+        return self.latency_ms / 1000.0 * math.exp(self.latency_sigma * z)
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+            return self.counters[key]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _mcq_text(profile: FaultProfile, prompt: str, *, constrained: bool = False) -> str:
+    """
+    Satu MCQ JSON (unik per request), kadang dibuat berantakan / rusak.
+    constrained=True meniru decoding dengan JSON schema: tidak ada prosa / fence,
+    yang tersisa hanya output terpotong (num_predict habis).
+    """
+    n = profile.count("mcq")
+    m = re.search(r"Topic:\s*(\w+)", prompt)
+    label = m.group(1) if m and m.group(1) in _TOPICS else "Physics"
+    thing = profile.choice(_TOPICS[label])
+    a, b = 3 + n % 17, 5 + (n * 7) % 23
+    item = {
+        "question": f"[{label} #{n}] A {thing} problem uses values {a} and {b}. What is {a} × {b}?",
+        "options": [str(a * b - 2), str(a * b), str(a * b + 3), str(a + b)],
+        "answer": "B",
+        "solution": f"Multiply the given values: {a} × {b} = {a * b}.\nSo the answer is option B.",
+    }
+    text = json.dumps([item], ensure_ascii=False)
+    r = profile.roll()
+    if constrained:
+        profile.count("structured")
+        # dari dua varian "malformed" hanya yang terpotong yang masih mungkin
+        if r < profile.malformed_rate / 2:
+            profile.count("malformed")
+            return text[: len(text) // 3]
+        return text
+    if r < profile.malformed_rate:
+        profile.count("malformed")
+        return profile.choice([
+            text[: len(text) // 3],
+            "I'm sorry, I can only provide one question in plain text: what is 2 + 2?",
+        ])
+    if r < profile.malformed_rate + profile.messy_rate:
+        profile.count("messy")
+        return profile.choice([
+            "```json\n" + text + "\n```",
+            "Here is your question:\n" + text[:-2] + ",}]\nHope this helps!",
+        ])
+    return text
+
+
+def _judgement(item_id: str | None = None) -> Dict[str, Any]:
+    out = {
+        "solution_verifier": "Recomputed the product independently; it matches option B.",
+        "scores": {"clarity": 4.5, "context_accuracy": 4.0, "quality_of_working": 4.5, "final_answer_accuracy": "Correct"},
+        "notes": "Clear stem.\nRealistic numbers.\nDistractors are plausible.",
+    }
+    return {"id": item_id, **out} if item_id is not None else out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):  # jangan spam stderr
+        pass
+
+    def _send_json(self, code: int, obj: Dict[str, Any], headers: Dict[str, str] | None = None) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # client sudah memutus (mis. kandidat spekulatif yang di-cancel)
+            self.server.profile.count("client_closed")
+            self.close_connection = True
+
+    def do_GET(self):
+        # health check EndpointPool (GET /v1/models)
+        if self.path.rstrip("/").endswith("/models"):
+            return self._send_json(200, {"object": "list", "data": [{"id": "fake-7b", "object": "model"}]})
+        self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        profile = self.server.profile
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        profile.count("requests")
+
+        if profile.roll() < profile.rate_limit_rate:
+            profile.count("rate_limited")
+            time.sleep(0.005)
+            return self._send_json(429, {"error": {
+                "type": "rate_limit_error",
+                "message": f"Rate limit reached for model. Please try again in {profile.retry_hint_s}s.",
+            }})
+
+        prompt = "\n".join(str(m.get("content", "")) for m in req.get("messages") or [])
+        max_tokens = req.get("max_tokens") or (req.get("options") or {}).get("num_predict")
+        # response_format json_schema (OpenAI-compat) / format (API native Ollama)
+        constrained = (req.get("response_format") or {}).get("type") == "json_schema" or bool(req.get("format"))
+        text = "ok" if max_tokens == 1 else _mcq_text(profile, prompt, constrained=constrained)
+        usage = {
+            "prompt_tokens": _tokens(prompt),
+            "completion_tokens": _tokens(text),
+            "total_tokens": _tokens(prompt) + _tokens(text),
+        }
+        delay = profile.latency_s()
+
+        if not req.get("stream"):
+            time.sleep(delay)
+            profile.count("served")
+            return self._send_json(200, {
+                "id": f"chatcmpl-{profile.counters.get('requests')}",
+                "object": "chat.completion",
+                "model": req.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        # SSE: ~4 karakter per chunk, latency dibagi rata per chunk
+        chunks = [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+        per_chunk = delay / len(chunks)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for c in chunks:
+                time.sleep(per_chunk)
+                ev = {"choices": [{"index": 0, "delta": {"content": c}}]}
+                self.wfile.write(f"data: {json.dumps(ev)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            profile.count("served")
+        except (BrokenPipeError, ConnectionResetError):
+            profile.count("client_closed")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    profile: FaultProfile
+
+
+class FakeOpenAIServer:
+    """
+    Server OpenAI-compatible lokal di thread background.
+
+        with FakeOpenAIServer(FaultProfile(latency_ms=300)) as srv:
+            os.environ["OLLAMA_OPENAI_URL"] = srv.url
+    """
+
+    def __init__(self, profile: FaultProfile | None = None, *, host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile or FaultProfile()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.profile = self.profile
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class FakeGeminiModel:
+    """
+    Pengganti genai.GenerativeModel. role="judge" → JSON penilaian (single atau
+    batch sesuai "### Item id:" di prompt); role="generator" → MCQ JSON.
+    429 dilempar sebagai Exception dengan pesan bergaya Gemini ("retry in Ns").
+    """
+
+    def __init__(self, profile: FaultProfile | None = None, *, role: str = "judge"):
+        self.profile = profile or FaultProfile()
+        self.role = role
+
+    def generate_content(self, contents, generation_config=None, request_options=None):
+        p = self.profile
+        p.count("requests")
+        prompt = "\n".join(
+            str(part) for m in (contents or []) for part in (m.get("parts") or [])
+        ) if isinstance(contents, list) else str(contents)
+
+        if p.in_outage() or p.roll() < p.rate_limit_rate:
+            p.count("rate_limited")
+            time.sleep(0.005)
+            raise RuntimeError(
+                f"429 Resource has been exhausted (e.g. check quota). Please retry in {p.retry_hint_s}s."
+            )
+
+        time.sleep(p.latency_s())
+        if self.role == "generator":
+            text = _mcq_text(p, prompt)
+        else:
+            ids: List[str] = list(dict.fromkeys(re.findall(r"### Item id: (\S+)", prompt)))
+            if p.roll() < p.malformed_rate:
+                p.count("malformed")
+                text = "The generator's answer looks correct overall."
+            elif ids:
+                text = json.dumps([_judgement(i) for i in ids])
+            else:
+                text = json.dumps(_judgement())
+        p.count("served")
+        usage = SimpleNamespace(
+            prompt_token_count=_tokens(prompt),
+            candidates_token_count=_tokens(text),
+            total_token_count=_tokens(prompt) + _tokens(text),
+        )
+        return SimpleNamespace(text=text, candidates=[], usage_metadata=usage)
@@ -0,0 +1,201 @@
+# QUESTION_GENERATION/loadtest/run.py
+"""
+Load test end-to-end QuizService melawan backend palsu (loadtest/fakes.py).
+
+    python -m loadtest.run --items 40 --gen-latency-ms 300 --judge-latency-ms 600 \
+        --rate-limit 0.05 --malformed 0.05 --pipelined
+
+Generator: ollama (OpenRouterService → FakeOpenAIServer), groq (GroqService →
+FakeOpenAIServer) atau gemini (GeminiService + FakeGeminiModel). Judge selalu
+Verifier + FakeGeminiModel. State (rate limiter, cache) dan trace ditulis ke
+folder sementara, jadi run ini tidak menyentuh .qg_state/ milik eksperimen.
+
+Laporan: items/min, p50/p95/p99 per tahap (dari tracing), jumlah retry
+(HTTP generator + verifier) dan counter injeksi fault di backend palsu.
+"""
+from __future__ import annotations
+import argparse, csv, json, os, pathlib, tempfile, time
+from typing import Any, Dict
+
+from loadtest.fakes import FakeGeminiModel, FakeOpenAIServer, FaultProfile
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=20)
+    ap.add_argument("--generator", choices=("ollama", "groq", "gemini"), default="ollama")
+    ap.add_argument("--endpoints", type=int, default=1, help="jumlah server palsu untuk generator ollama (OLLAMA_OPENAI_URLS)")
+    ap.add_argument("--topic", default="physics")
+    ap.add_argument("--struktur", default="struktur1")
+    ap.add_argument("--gen-latency-ms", type=float, default=300.0)
+    ap.add_argument("--gen-sigma", type=float, default=0.4)
+    ap.add_argument("--judge-latency-ms", type=float, default=600.0)
+    ap.add_argument("--judge-sigma", type=float, default=0.3)
+    ap.add_argument("--judge-rpm", type=float, default=600.0, help="budget token bucket verifier")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="peluang 429 per request (generator & judge)")
+    ap.add_argument("--retry-hint-s", type=float, default=0.2)
+    ap.add_argument("--malformed", type=float, default=0.0)
+    ap.add_argument("--messy", type=float, default=0.2)
+    ap.add_argument("--stream", action="store_true")
+    ap.add_argument("--structured", action="store_true", help="JSON schema ke generator ollama (OLLAMA_STRUCTURED_OUTPUT)")
+    ap.add_argument("--pipelined", action="store_true")
+    ap.add_argument("--verify-batch", type=int, default=1)
+    ap.add_argument("--judge-outage-after", type=int, default=0, help="setelah N request judge, semua 429 selama --judge-outage-s")
+    ap.add_argument("--judge-outage-s", type=float, default=0.0)
+    ap.add_argument("--on-verify-error", choices=("stop", "defer"), default="stop")
+    ap.add_argument("--candidates", type=int, default=1, help="kandidat generator paralel per index (GEN_CANDIDATES)")
+    ap.add_argument("--llm-cache", action="store_true", help="bungkus generator dengan LLM_CACHE=readwrite (cache baru)")
+    ap.add_argument("--max-attempts", type=int, default=5, help="ulangan per index yang gagal (GEN_MAX_ATTEMPTS)")
+    ap.add_argument("--output-format", default="csv", help="csv | parquet | sqlite | both | gabungan, mis. csv,sqlite")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default="", help="simpan laporan ke file JSON")
+    args = ap.parse_args()
+
+    workdir = pathlib.Path(tempfile.mkdtemp(prefix="qg_loadtest_"))
+    gen_profile = FaultProfile(
+        latency_ms=args.gen_latency_ms,
+        latency_sigma=args.gen_sigma,
+        rate_limit_rate=args.rate_limit,
+        retry_hint_s=args.retry_hint_s,
+        malformed_rate=args.malformed,
+        messy_rate=args.messy,
+        seed=args.seed,
+    )
+    judge_profile = FaultProfile(
+        latency_ms=args.judge_latency_ms,
+        latency_sigma=args.judge_sigma,
+        rate_limit_rate=args.rate_limit,
+        retry_hint_s=args.retry_hint_s,
+        malformed_rate=args.malformed,
+        outage_after=args.judge_outage_after,
+        outage_s=args.judge_outage_s,
+        seed=args.seed + 1,
+    )
+
+    servers = [FakeOpenAIServer(gen_profile).start() for _ in range(max(1, args.endpoints))]
+    server = servers[0]
+    # env harus di-set sebelum modul service di-import (URL dibaca saat import)
+    os.environ.update({
+        "QG_STATE_DIR": str(workdir / "state"),
+        "QG_TRACE": str(workdir / "trace.jsonl"),
+        "RUN_STORE_PATH": str(workdir / "runs.sqlite"),
+        "OLLAMA_OPENAI_URL": server.url,
+        "OLLAMA_OPENAI_URLS": ",".join(s.url for s in servers),
+        "OLLAMA_STREAM": "1" if args.stream else "0",
+        "OLLAMA_STRUCTURED_OUTPUT": "1" if args.structured else "0",
+        "OPENROUTER_MODEL_LOADTEST": "fake-7b",
+        "GROQ_URL": server.url,
+        "GROQ_API_KEY": "loadtest",
+        "GROQ_MODEL": "fake-70b",
+        "GEMINI_VERIFIER_RPM": str(args.judge_rpm),
+        "GEMINI_DELAY_BETWEEN_ITEMS": "0",
+    })
+
+    import tracing
+    from quiz_service import QuizService
+    from validator_gemini import Verifier, default_verifier_model, register_verifier
+
+    verifier = Verifier(default_verifier_model(), client=FakeGeminiModel(judge_profile, role="judge"))
+    register_verifier(verifier)
+
+    if args.generator == "ollama":
+        from models.openrouter import OpenRouterService
+        svc = OpenRouterService("LOADTEST")
+        model_key = "loadtest"
+    elif args.generator == "groq":
+        from models.groq import GroqService
+        svc = GroqService()
+        model_key = "groq"
+    else:
+        from models.gemini import GeminiService
+        svc = GeminiService("fake-gemini", client=FakeGeminiModel(gen_profile, role="generator"))
+        model_key = "gemini"
+
+    if args.llm_cache:
+        from models.cache import CachedModelService, ResponseCache
+        svc = CachedModelService(svc, ResponseCache(str(workdir / "llm_cache.sqlite")), mode="readwrite")
+
+    csv_path = workdir / "loadtest.csv"
+    qs = QuizService(
+        {model_key: svc},
+        output_format=args.output_format,
+        on_verify_error=args.on_verify_error,
+        candidates=args.candidates,
+        max_attempts=args.max_attempts,
+    )
+    t0 = time.perf_counter()
+    try:
+        qs.generate_items_incremental_to_csv(
+            topic=args.topic,
+            model_key=model_key,
+            struktur=args.struktur,
+            count=args.items,
+            csv_path=csv_path,
+            pipelined=args.pipelined,
+            verify_batch=args.verify_batch,
+        )
+    finally:
+        elapsed = time.perf_counter() - t0
+        for s in servers:
+            s.stop()
+
+    rows = list(csv.DictReader(csv_path.open(encoding="utf-8"))) if csv_path.exists() else []
+    if not rows and csv_path.with_suffix(".parquet").exists():
+        from sinks import read_results
+        rows = read_results(csv_path.with_suffix(".parquet")).to_pylist()
+    verified = sum(1 for r in rows if r.get("verifier_model"))
+    stages = tracing.summarize(tracing.load(str(workdir / "trace.jsonl")))
+    stages.pop("run", None)
+
+    report: Dict[str, Any] = {
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 2),
+        "items_requested": args.items,
+        "items_written": len(rows),
+        "items_verified": verified,
+        "items_per_min": round(verified / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        "retries": {
+            # AsyncHttpPool.retries (ollama/groq) atau GeminiService.retries
+            "generator": getattr(getattr(svc, "_http", None), "retries", getattr(svc, "retries", 0)),
+            "verifier": verifier.retries,
+            "retry_backoff_spans": stages.get("retry_backoff", {}).get("n", 0),
+        },
+        "fake_generator": dict(gen_profile.counters),
+        "fake_judge": dict(judge_profile.counters),
+        "verify_queue": {
+            **qs.defer_stats,
+            "pending": sum(qs.verify_queue.counts().values()) if qs.verify_queue is not None else 0,
+        },
+        "generation": dict(qs.gen_stats),
+        "llm_cache": {"hits": svc.hits, "misses": svc.misses} if args.llm_cache else {},
+        "endpoints": svc.endpoint_stats() if hasattr(svc, "endpoint_stats") else [],
+        "stages": stages,
+        "workdir": str(workdir),
+    }
+
+    print()
+    print(f"[loadtest] {verified}/{args.items} verified in {elapsed:.1f}s → {report['items_per_min']} items/min")
+    print(f"[loadtest] retries: {report['retries']}")
+    print(f"[loadtest] fake generator: {report['fake_generator']}")
+    print(f"[loadtest] fake judge:     {report['fake_judge']}")
+    print(f"[loadtest] generation:     {report['generation']}")
+    if args.llm_cache:
+        print(f"[loadtest] llm cache:      {report['llm_cache']}")
+        # cache baru: hit berarti ulangan index memakai key yang sama dengan percobaan
+        # sebelumnya (output rusak yang sama di-replay terus)
+        assert svc.hits == 0, f"retry reused a cached generator response: {report['llm_cache']}"
+    if args.on_verify_error == "defer":
+        print(f"[loadtest] verify queue:   {report['verify_queue']}")
+    for e in report["endpoints"]:
+        print(f"[loadtest] endpoint {e['url']}: requests={e['requests']} failures={e['failures']} ewma={e['ewma_ms']} ms")
+    print(f"{'stage':18} {'n':>5} {'total s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for st, v in sorted(stages.items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"{st:18} {v['n']:5d} {v['total_ms'] / 1000:8.2f} {v['p50_ms']:9.1f} {v['p95_ms']:9.1f} {v['p99_ms']:9.1f}")
+    print(f"[loadtest] artefak (csv, trace, state): {workdir}")
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,11 @@ from models.base import LlmModelService
 from models.gemini import GeminiService
 from models.openrouter import OpenRouterService
 from models.groq import GroqService
+from models.cache import CachedModelService, ResponseCache
 
 from quiz_service import QuizService
+from sinks import parse_output_formats
+from verify_cache import VerificationCache
 
 _ALLOWED_TOPICS = ("mathematics", "biology", "physics", "chemistry")
 
@@ -35,9 +38,69 @@ def _build_models() -> Dict[str, LlmModelService]:
         except Exception as e:
             print(f"[warn] {alias} disabled:", e)
 
+    # Opsional: cache respons (LLM_CACHE=readwrite | replay)
+    cache_mode = (os.getenv("LLM_CACHE") or "off").strip().lower()
+    if cache_mode not in ("", "off", "0", "false"):
+        max_mb = float(os.getenv("LLM_CACHE_MAX_MB", "0") or 0)
+        max_days = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "0") or 0)
+        cache = ResponseCache(
+            os.getenv("LLM_CACHE_PATH") or None,
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+            max_age_s=max_days * 86400 if max_days else None,
+        )
+        models = {k: CachedModelService(v, cache, mode=cache_mode) for k, v in models.items()}
+        print(f"[cache] LLM response cache mode={cache_mode} path={cache.path}")
+
     return models
 
 
+def _csv_path(outdir: str, topic_dir: str, struktur: str, model: str) -> pathlib.Path:
+    """outputs/{topic}/{struktur}/{model}_{timestamp}.csv"""
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_path = pathlib.Path(outdir) / topic_dir / struktur
+    out_path.mkdir(parents=True, exist_ok=True)
+    return out_path / f"{model}_{ts}.csv"
+
+def _latest_csv(outdir: str, topic_dir: str, struktur: str, model: str) -> pathlib.Path | None:
+    """CSV terbaru untuk sel ini (nama berisi timestamp → urut leksikal = urut waktu)."""
+    files = sorted((pathlib.Path(outdir) / topic_dir / struktur).glob(f"{model}_*.csv"))
+    return files[-1] if files else None
+
+def _verify_cache_from_env() -> VerificationCache | None:
+    # cache hasil judge opt-in (VERIFY_CACHE=on); default off supaya run ulang tetap mengukur judge
+    if (os.getenv("VERIFY_CACHE") or "off").strip().lower() not in ("on", "1", "true"):
+        return None
+    return VerificationCache(os.getenv("VERIFY_CACHE_PATH") or None)
+
+def _output_format_from_env() -> Tuple[str, ...]:
+    # OUTPUT_FORMAT=csv|parquet|sqlite|both atau gabungan "csv,sqlite" (default csv), lihat sinks.py
+    formats = parse_output_formats(os.getenv("OUTPUT_FORMAT") or "csv")
+    if "parquet" in formats and "csv" not in formats:
+        # Parquet baru punya footer saat close(): crash/kill di tengah run → tidak ada yang terbaca
+        print("[warn] OUTPUT_FORMAT tanpa csv: Parquet dari run yang crash/di-kill tidak bisa dibaca"
+              " dan run tidak bisa di-resume. Pakai both (csv,parquet) supaya aman.")
+    return formats
+
+def _verify_mode_from_env() -> dict:
+    # VERIFY_ON_ERROR=stop|defer (default stop); defer → antrian .qg_state/verify_queue.sqlite
+    mode = (os.getenv("VERIFY_ON_ERROR") or "stop").strip().lower()
+    return {"on_verify_error": "defer" if mode == "defer" else "stop"}
+
+def _generation_from_env() -> dict:
+    # GEN_CANDIDATES=K kandidat paralel per index (default 1), GEN_MAX_ATTEMPTS=ulangan per index (default 5)
+    return {
+        "candidates": int(os.getenv("GEN_CANDIDATES", "1") or 1),
+        "max_attempts": int(os.getenv("GEN_MAX_ATTEMPTS", "5") or 5),
+    }
+
+def _dedup_from_env() -> dict:
+    # DEDUP_INDEX=off|regenerate|skip (default off); index per topic di .qg_state/dedup_{topic}.sqlite
+    mode = (os.getenv("DEDUP_INDEX") or "off").strip().lower()
+    if mode not in ("regenerate", "skip"):
+        return {"dedup": None}
+    return {"dedup": mode, "dedup_retries": int(os.getenv("DEDUP_MAX_RETRIES", "2"))}
+
+
 def main(
     struktur: str,
     topic: str,
@@ -45,6 +108,9 @@ def main(
     *,
     count: int = 4,
     outdir: str = "outputs",
+    pipelined: bool = False,
+    verify_batch: int = 1,
+    resume: bool | str = False,
 ):
     models = _build_models()
     if model not in models:
@@ -52,24 +118,47 @@ def main(
 
     internal_topic, topic_dir = _canon_topic(topic)
 
-    svc = QuizService(models)
-
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    out_path = pathlib.Path(outdir) / topic_dir / struktur
-    out_path.mkdir(parents=True, exist_ok=True)
-    csv_path = out_path / f"{model}_{ts}.csv"
+    svc = QuizService(
+        models,
+        verify_cache=_verify_cache_from_env(),
+        output_format=_output_format_from_env(),
+        **_verify_mode_from_env(),
+        **_dedup_from_env(),
+        **_generation_from_env(),
+    )
 
-    # Incremental mode: write each row; stop on verifier rate-limit (partial CSV preserved).
+    csv_path = None
+    if resume:
+        # resume=True → CSV terbaru sel ini; resume="path/ke/file.csv" → file itu
+        csv_path = pathlib.Path(resume) if isinstance(resume, str) else _latest_csv(outdir, topic_dir, struktur, model)
+        if csv_path is None or not csv_path.exists():
+            print("[resume] no previous CSV found, starting a new run")
+            csv_path = None
+    if csv_path is None:
+        csv_path = _csv_path(outdir, topic_dir, struktur, model)
+
+    # Incremental mode: write each row; on verifier failure stop (partial CSV preserved),
+    # or with VERIFY_ON_ERROR=defer queue the item and keep generating.
     svc.generate_items_incremental_to_csv(
         topic=internal_topic,
         model_key=model,
         struktur=struktur,
         count=count,
         csv_path=csv_path,
+        pipelined=pipelined,
+        verify_batch=verify_batch,
+        resume=bool(resume),
     )
 
     print(f"[csv incremental] {csv_path.as_posix()}")
 
+def drain(*, run: str | None = None, batch: int = 4, limit: int | None = None) -> Dict[str, int]:
+    """Nilai item di antrian verifikasi (VERIFY_ON_ERROR=defer) dan isi baris output-nya."""
+    svc = QuizService({}, verify_cache=_verify_cache_from_env())
+    res = svc.drain_verify_queue(pathlib.Path(run).as_posix() if run else None, batch=batch, limit=limit)
+    print(f"[drain] verified={res['verified']} remaining={res['remaining']}")
+    return res
+
 if __name__ == "__main__":
     # example
     main("struktur3", "mathematics", "phi", count=50)
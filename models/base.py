@@ -1,7 +1,11 @@
 # QUESTION_GENERATION/models/base.py
 from __future__ import annotations
+import asyncio
+import threading
 from dataclasses import dataclass
-from typing import Any, Dict, List, Literal, TypedDict
+from typing import Any, Coroutine, Dict, List, Literal, TypedDict, TypeVar
+
+T = TypeVar("T")
 
 class ChatMessage(TypedDict):
     role: Literal["system", "user", "assistant"]
@@ -12,8 +16,44 @@ class ChatOutput:
     text: str
     latency_ms: int
     usage: Dict[str, Any] | None = None
+    # hanya terisi pada mode streaming
+    ttft_ms: int | None = None          # time-to-first-token
+    tokens_per_sec: float | None = None  # kecepatan decode setelah token pertama
+
+# Satu event loop di background thread, dipakai bersama oleh semua wrapper sync
+# supaya client HTTP async (dan pool koneksinya) tetap hidup antar panggilan chat().
+_LOOP: asyncio.AbstractEventLoop | None = None
+_LOOP_THREAD: threading.Thread | None = None
+_LOOP_LOCK = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP, _LOOP_THREAD
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = asyncio.new_event_loop()
+            _LOOP_THREAD = threading.Thread(
+                target=_LOOP.run_forever, name="llm-event-loop", daemon=True
+            )
+            _LOOP_THREAD.start()
+        return _LOOP
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """Jalankan coroutine di event loop background dan tunggu hasilnya (blocking)."""
+    loop = _background_loop()
+    if threading.current_thread() is _LOOP_THREAD:
+        coro.close()
+        raise RuntimeError("run_sync() tidak boleh dipanggil dari dalam event loop background; pakai await achat()")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
 
 class LlmModelService:
     name: str
-    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7) -> ChatOutput:
+    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
         raise NotImplementedError
+
+    async def achat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
+        """
+        Versi async dari chat(). Default: jalankan chat() sinkron di thread pool;
+        backend HTTP (Ollama/Groq) meng-override ini dengan client async ber-pool.
+        seed: sampling seed (None = acak); backend yang tidak mendukung mengabaikannya.
+        """
+        return await asyncio.to_thread(self.chat, messages, temperature=temperature, seed=seed)
@@ -0,0 +1,174 @@
+# QUESTION_GENERATION/models/cache.py
+from __future__ import annotations
+import hashlib, json, threading, time
+from typing import Any, List
+
+from .base import LlmModelService, ChatMessage, ChatOutput
+from utils.state import state_path, connect_sqlite
+
+
+class CacheMissError(RuntimeError):
+    """Dilempar pada mode replay kalau respons belum ada di cache."""
+
+
+def cache_key(backend: str, model: str, messages: List[ChatMessage], temperature: float, seed: int | None = None) -> str:
+    """Hash konten (sha256) dari backend, model, messages, temperature (+ seed kalau ada)."""
+    body = {
+        "backend": backend,
+        "model": model,
+        "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+        "temperature": round(float(temperature), 6),
+    }
+    if seed is not None:
+        # tanpa seed key tetap sama dengan cache lama
+        body["seed"] = int(seed)
+    blob = json.dumps(
+        body,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache respons chat di SQLite, content-addressed.
+    Eviction: umur (max_age_s, dari waktu dibuat) dan ukuran total
+    (max_bytes, buang yang paling lama tidak diakses).
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        max_bytes: int | None = None,
+        max_age_s: float | None = None,
+        evict_every: int = 50,
+    ):
+        self.path = path or str(state_path("llm_cache.sqlite"))
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.evict_every = max(1, evict_every)
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " backend TEXT, model TEXT,"
+            " text TEXT NOT NULL, latency_ms INTEGER, usage TEXT,"
+            " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses(accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_created ON responses(created)")
+
+    def get(self, key: str) -> ChatOutput | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, latency_ms, usage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            text, latency_ms, usage, created = row
+            if self.max_age_s is not None and time.time() - created > self.max_age_s:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return ChatOutput(
+            text=text,
+            latency_ms=int(latency_ms or 0),
+            usage=json.loads(usage) if usage else None,
+        )
+
+    def put(self, key: str, *, backend: str, model: str, out: ChatOutput) -> None:
+        usage = json.dumps(out.usage, ensure_ascii=False) if out.usage is not None else None
+        size = len(out.text.encode("utf-8")) + len(usage or "")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                "(key, backend, model, text, latency_ms, usage, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, backend, model, out.text, out.latency_ms, usage, size, now, now),
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict_locked()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        if self.max_age_s is not None:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_s,))
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+            excess = total - self.max_bytes
+            if excess <= 0:
+                return
+            freed, victims = 0, []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                victims.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+
+class CachedModelService(LlmModelService):
+    """
+    Pembungkus cache untuk LlmModelService apa pun (Ollama/Groq/Gemini).
+
+    mode:
+      "readwrite" : pakai cache kalau ada, kalau tidak panggil backend lalu simpan
+      "replay"    : hanya dari cache; miss → CacheMissError (rerun deterministik)
+    Respons dari cache mengembalikan latency asli saat direkam; usage diberi
+    tanda "cached": True.
+    """
+
+    def __init__(self, inner: LlmModelService, cache: ResponseCache, *, mode: str = "readwrite"):
+        if mode not in ("readwrite", "replay"):
+            raise ValueError(f"Unknown cache mode '{mode}'. Use 'readwrite' or 'replay'.")
+        self.inner = inner
+        self.cache = cache
+        self.mode = mode
+        self.name = inner.name
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, attr: str) -> Any:
+        # atribut lain (model, alias, dst.) diteruskan ke service asli
+        return getattr(self.inner, attr)
+
+    def _model_id(self) -> str:
+        return str(getattr(self.inner, "model", None) or getattr(self.inner, "model_name", "") or "")
+
+    def _lookup(self, messages: List[ChatMessage], temperature: float, seed: int | None) -> tuple[str, ChatOutput | None]:
+        key = cache_key(self.inner.name, self._model_id(), messages, temperature, seed)
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.hits += 1
+            hit.usage = {**(hit.usage or {}), "cached": True}
+            return key, hit
+        self.misses += 1
+        if self.mode == "replay":
+            raise CacheMissError(f"cache miss in replay mode ({self.inner.name}, key={key[:12]})")
+        return key, None
+
+    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
+        key, hit = self._lookup(messages, temperature, seed)
+        if hit is not None:
+            return hit
+        out = self.inner.chat(messages, temperature=temperature, seed=seed)
+        self.cache.put(key, backend=self.inner.name, model=self._model_id(), out=out)
+        return out
+
+    async def achat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
+        key, hit = self._lookup(messages, temperature, seed)
+        if hit is not None:
+            return hit
+        out = await self.inner.achat(messages, temperature=temperature, seed=seed)
+        self.cache.put(key, backend=self.inner.name, model=self._model_id(), out=out)
+        return out
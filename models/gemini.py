@@ -1,6 +1,6 @@
 # QUESTION_GENERATION/models/gemini.py  — perbaikan konversi usage_metadata (tanpa _asdict)
 # -*- coding: utf-8 -*-
-import os, time
+import os, re, time, random
 from typing import List
 from .base import LlmModelService, ChatMessage, ChatOutput
 
@@ -21,22 +21,51 @@ def _usage_to_dict(usage) -> dict | None:
     return out or {"repr": repr(usage)}
 
 class GeminiService(LlmModelService):
-    def __init__(self, model: str | None = None, api_key_env: str = "GEMINI_API_KEY"):
+    def __init__(self, model: str | None = None, api_key_env: str = "GEMINI_API_KEY", *, client=None):
+        self.model_name = model or os.getenv("GEMINI_MODEL","gemini-2.0-flash")
+        self.name = f"gemini:{self.model_name}"
+        # minimal 1 percobaan: GENAI_MAX_RETRIES=0 tetap memanggil API sekali
+        self.max_retries = max(1, int(os.getenv("GENAI_MAX_RETRIES", "6")))
+        self.retries = 0
+        if client is not None:
+            # objek dengan generate_content() (mis. loadtest.fakes.FakeGeminiModel)
+            self._model = client
+            return
         key = os.getenv(api_key_env)
         if not key:
             raise RuntimeError("GEMINI_API_KEY kosong")
         genai.configure(api_key=key)
-        self.model_name = model or os.getenv("GEMINI_MODEL","gemini-2.0-flash")
-        self.name = f"gemini:{self.model_name}"
         self._model = genai.GenerativeModel(self.model_name)
 
-    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7) -> ChatOutput:
+    def _generate_with_retry(self, contents, temperature: float):
+        # 429/quota → tunggu sesuai hint "retry in Ns" (atau backoff), error lain langsung dilempar
+        for attempt in range(self.max_retries):
+            try:
+                return self._model.generate_content(
+                    contents,
+                    generation_config={"temperature": float(temperature)}
+                )
+            except Exception as e:
+                msg = str(e)
+                low = msg.lower()
+                if attempt == self.max_retries - 1 or not (
+                    "429" in msg or "quota" in low or "rate" in low or "exhausted" in low
+                ):
+                    raise
+                m = re.search(r"retry in\s+([0-9]+(?:\.[0-9]+)?)s", msg, re.I)
+                sleep_s = float(m.group(1)) if m else min(30.0, 1.8 ** attempt)
+                self.retries += 1
+                print(f"[GeminiService] rate limited, retry {attempt+1}/{self.max_retries} in {sleep_s:.1f}s")
+                time.sleep(sleep_s + random.uniform(0, 0.5))
+
+    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
+        # seed diabaikan: generation_config SDK google-generativeai belum punya field seed
         sys = "\n".join([m["content"] for m in messages if m["role"] == "system"])
         user = "\n".join([m["content"] for m in messages if m["role"] == "user"])
         start = time.time()
-        resp = self._model.generate_content(
+        resp = self._generate_with_retry(
             [{"role":"user","parts":[(sys + "\n\n" + user) if sys else user]}],
-            generation_config={"temperature": float(temperature)}
+            temperature,
         )
 
         # Ambil teks aman
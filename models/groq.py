@@ -1,11 +1,12 @@
 # QUESTION_GENERATION/models/groq.py
 from __future__ import annotations
-import os, time, requests
+import os, time
 from typing import List
-from .base import LlmModelService, ChatMessage, ChatOutput
+from .base import LlmModelService, ChatMessage, ChatOutput, run_sync
+from .http import AsyncHttpPool
 
-# Groq OpenAI-compatible endpoint
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Groq OpenAI-compatible endpoint (GROQ_URL bisa diarahkan ke server lain, mis. loadtest)
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
 
 class GroqService(LlmModelService):
     """
@@ -21,19 +22,27 @@ class GroqService(LlmModelService):
         if not self.model:
             raise RuntimeError(f"{model_env} belum di-set")
         self.name = f"groq:{self.model}"
+        self._http = AsyncHttpPool(
+            timeout=120,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
 
-    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7) -> ChatOutput:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
+        return run_sync(self.achat(messages, temperature=temperature, seed=seed))
+
+    async def achat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
         payload = {
             "model": self.model,
             "messages": messages,
             "temperature": float(temperature),
         }
+        if seed is not None:
+            payload["seed"] = int(seed)
         t0 = time.time()
-        r = requests.post(GROQ_URL, headers=headers, json=payload, timeout=120)
+        r = await self._http.post(GROQ_URL, json=payload)
         r.raise_for_status()
         data = r.json()
         text = (data["choices"][0]["message"]["content"] or "").strip()
@@ -0,0 +1,102 @@
+# QUESTION_GENERATION/models/http.py
+from __future__ import annotations
+import asyncio
+import contextlib
+import os
+import random
+import re
+import weakref
+from typing import AsyncIterator, Dict
+
+import httpx
+
+
+class AsyncHttpPool:
+    """
+    Client httpx.AsyncClient keep-alive, satu per event loop (client async
+    terikat ke loop tempat ia dibuat). Opsional: batasi jumlah request
+    in-flight per loop, mis. sesuai OLLAMA_NUM_PARALLEL.
+
+    post() mengulang request yang kena 429/503 (maks HTTP_MAX_RETRIES, default
+    3) dengan jeda dari header Retry-After / pesan "try again in Ns", atau
+    exponential backoff; jumlahnya dicatat di `retries`.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float,
+        headers: Dict[str, str] | None = None,
+        max_connections: int = 16,
+        max_in_flight: int | None = None,
+    ):
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.max_connections = max_connections
+        self.max_in_flight = max_in_flight
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+        self.retries = 0
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        c = self._clients.get(loop)
+        if c is None or c.is_closed:
+            c = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._clients[loop] = c
+        return c
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Tunggu slot in-flight (no-op kalau max_in_flight tidak di-set)."""
+        if not self.max_in_flight:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        sem = self._slots.get(loop)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_in_flight)
+            self._slots[loop] = sem
+        async with sem:
+            yield
+
+    async def post(self, url: str, *, json) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            resp = await self.client().post(url, json=json)
+            if resp.status_code not in (429, 503) or attempt == self.max_retries:
+                return resp
+            self.retries += 1
+            await asyncio.sleep(_retry_delay(resp, attempt))
+        return resp
+
+    async def aclose(self) -> None:
+        """Tutup client milik loop yang sedang berjalan."""
+        c = self._clients.pop(asyncio.get_running_loop(), None)
+        if c is not None:
+            await c.aclose()
+
+
+_RETRY_IN = re.compile(r"(?:try again|retry) in\s+([0-9]+(?:\.[0-9]+)?)\s*(ms|s)\b", re.I)
+
+
+def _retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """Detik tunggu sebelum retry: Retry-After → hint di body → backoff."""
+    ra = resp.headers.get("retry-after")
+    if ra:
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            pass
+    m = _RETRY_IN.search(resp.text or "")
+    if m:
+        v = float(m.group(1))
+        return v / 1000 if m.group(2).lower() == "ms" else v
+    return min(30.0, 1.8 ** attempt + random.uniform(0, 0.5))
@@ -1,17 +1,27 @@
 # QUESTION_GENERATION/models/openrouter.py
 from __future__ import annotations
+import asyncio
+import contextlib
 import os
+import json
 import time
-import requests
-from typing import List
+from typing import AsyncIterator, Dict, List
 
-from .base import LlmModelService, ChatMessage, ChatOutput
+import httpx
+
+from .base import LlmModelService, ChatMessage, ChatOutput, run_sync
+from .http import AsyncHttpPool
+from .routing import EndpointPool, parse_endpoints
+from json_utils import ArrayCloseTracker
+from prompting import MCQ_ARRAY_SCHEMA
 
 # Ollama OpenAI-compatible endpoint
 OLLAMA_OPENAI_URL = os.getenv(
     "OLLAMA_OPENAI_URL",
     "http://localhost:11434/v1/chat/completions"
 )
+# Beberapa server Ollama sekaligus (dipisah koma); kosong → OLLAMA_OPENAI_URL saja
+OLLAMA_OPENAI_URLS = parse_endpoints(os.getenv("OLLAMA_OPENAI_URLS")) or [OLLAMA_OPENAI_URL]
 
 
 class OpenRouterService(LlmModelService):
@@ -21,7 +31,26 @@ class OpenRouterService(LlmModelService):
 
     Interface SENGAJA tetap sama:
       - __init__(alias_env_suffix: str)
-      - chat(messages: List[ChatMessage], temperature=0.7) -> ChatOutput
+      - chat(messages: List[ChatMessage], temperature=0.7, seed=None) -> ChatOutput
+      - achat(...) versi async; koneksi HTTP keep-alive di-pool per service
+
+    OLLAMA_NUM_PARALLEL (opsional) membatasi request in-flight per server
+    Ollama, samakan dengan setting server.
+
+    endpoints (atau env OLLAMA_OPENAI_URLS, dipisah koma): beberapa server
+    Ollama; tiap request dikirim ke endpoint dengan in-flight paling sedikit
+    (dibobot EWMA latency), endpoint yang gagal dikeluarkan lalu di-probe
+    dan dimasukkan lagi (lihat models/routing.py). Statistik per endpoint:
+    endpoint_stats().
+
+    stream=True (atau env OLLAMA_STREAM=1): konsumsi stream SSE dan putus
+    request begitu array JSON satu-item sudah tertutup; ChatOutput diisi
+    ttft_ms dan tokens_per_sec.
+
+    structured=True (atau env OLLAMA_STRUCTURED_OUTPUT=1): kirim JSON schema
+    array satu-MCQ (prompting.MCQ_ARRAY_SCHEMA) sebagai response_format, yang
+    oleh Ollama diteruskan ke `format` → decoding dibatasi grammar, output
+    selalu JSON sesuai schema (kecuali terpotong num_predict).
 
     Konfigurasi model:
       OPENROUTER_MODEL_QWEN      = nama model di Ollama (mis. "qwen2.5:7b")
@@ -29,7 +58,14 @@ class OpenRouterService(LlmModelService):
       OPENROUTER_MODEL_DEEPSEEK  = nama model di Ollama (mis. "deepseek-r1:7b")
     """
 
-    def __init__(self, alias_env_suffix: str):
+    def __init__(
+        self,
+        alias_env_suffix: str,
+        *,
+        stream: bool | None = None,
+        endpoints: List[str] | None = None,
+        structured: bool | None = None,
+    ):
         self.alias = alias_env_suffix.upper()
         self.model = os.getenv(f"OPENROUTER_MODEL_{self.alias}")
         if not self.model:
@@ -38,23 +74,85 @@ class OpenRouterService(LlmModelService):
                 f"(isi dengan nama model Ollama, mis. 'qwen2.5:7b')."
             )
 
-        # cuma label buat logging
-        self.name = f"ollama_openai:{self.alias}:{self.model}"
-        print(f"[OpenRouterService] init alias={self.alias} model={self.model} endpoint={OLLAMA_OPENAI_URL}")
+        if stream is None:
+            stream = (os.getenv("OLLAMA_STREAM") or "0").strip().lower() in ("1", "true", "yes", "on")
+        self.stream = stream
+        if structured is None:
+            structured = (os.getenv("OLLAMA_STRUCTURED_OUTPUT") or "0").strip().lower() in ("1", "true", "yes", "on")
+        self.structured = structured
+
+        # label buat logging; juga bagian key cache respons (models/cache.py),
+        # jadi output dengan / tanpa schema tidak saling tertukar
+        self.name = f"ollama_openai:{self.alias}:{self.model}" + (":schema" if structured else "")
+        num_parallel = int(os.getenv("OLLAMA_NUM_PARALLEL", "0") or 0)
+        urls = parse_endpoints(",".join(endpoints)) if endpoints else OLLAMA_OPENAI_URLS
+        self._endpoints = EndpointPool(urls, max_in_flight=num_parallel or None)
+        self._http = AsyncHttpPool(
+            timeout=600,
+            headers={
+                "Content-Type": "application/json",
+                # OpenAI-compat di Ollama butuh header Authorization, tapi nilainya bebas
+                "Authorization": "Bearer ollama",
+            },
+            max_connections=max(16, 4 * len(urls)),
+            # slot total = per server × jumlah server; pembagian per server diatur EndpointPool
+            max_in_flight=(num_parallel * len(urls)) or None,
+        )
+        shown = urls[0] if len(urls) == 1 else f"{len(urls)} endpoints {urls}"
+        print(
+            f"[OpenRouterService] init alias={self.alias} model={self.model} endpoint={shown}"
+            f" stream={self.stream} structured={self.structured}"
+        )
+
+    def endpoint_stats(self) -> List[Dict[str, object]]:
+        """Per endpoint: url, healthy, in_flight, requests, failures, ejections, ewma_ms."""
+        return self._endpoints.stats()
 
-    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7) -> ChatOutput:
+    def warmup(self) -> int:
+        """
+        Paksa Ollama me-load model (request 1 token) di setiap endpoint yang
+        sehat, supaya waktu load model tidak ikut terhitung di latency soal
+        pertama. Return latency (ms).
+        """
+        t0 = time.time()
+        resp = run_sync(self._http_warmup())
+        latency = int((time.time() - t0) * 1000)
+        print(f"[OpenRouterService] warmup model={self.model} took {latency} ms (status {resp})")
+        return latency
+
+    async def _http_warmup(self) -> Dict[str, int]:
+        health = await self._endpoints.health_check(self._http.client())
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": "ok"}],
+            "keep_alive": "1h",
+            "max_tokens": 1,
+            "options": {"num_predict": 1},
+        }
+
+        async def one(url: str) -> int:
+            async with self._http.slot():
+                resp = await self._http.post(url, json=payload)
+            resp.raise_for_status()
+            return resp.status_code
+
+        live = [u for u, ok in health.items() if ok]
+        if not live:
+            raise RuntimeError(f"semua endpoint Ollama gagal health check: {list(health)}")
+        codes = await asyncio.gather(*(one(u) for u in live))
+        return dict(zip(live, codes))
+
+    def chat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
         """
         Kirim chat ke Ollama (OpenAI-compatible) dan kembalikan ChatOutput.
 
         messages: list of {"role": "system"|"user"|"assistant", "content": "..."}
         temperature: forwarded ke Ollama.
+        seed: forwarded ke Ollama (None = acak).
         """
-        headers = {
-            "Content-Type": "application/json",
-            # OpenAI-compat di Ollama butuh header Authorization, tapi nilainya bebas
-            "Authorization": "Bearer ollama",
-        }
+        return run_sync(self.achat(messages, temperature=temperature, seed=seed))
 
+    async def achat(self, messages: List[ChatMessage], *, temperature: float = 0.7, seed: int | None = None) -> ChatOutput:
         payload = {
             "model": self.model,
             "messages": messages,
@@ -67,10 +165,20 @@ class OpenRouterService(LlmModelService):
                 "num_thread": 8       # sesuaikan sama jumlah core CPU kamu
             },
         }
-        
-        t0 = time.time()
-        resp = requests.post(OLLAMA_OPENAI_URL, headers=headers, json=payload, timeout=600)
-        resp.raise_for_status()
+        if seed is not None:
+            payload["seed"] = int(seed)
+        if self.structured:
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "mcq_single", "schema": MCQ_ARRAY_SCHEMA, "strict": True},
+            }
+
+        if self.stream:
+            return await self._achat_stream(payload)
+
+        async with self._http.slot():
+            t0 = time.time()
+            resp = await self._post_routed(payload)
         data = resp.json()
 
         text = (data["choices"][0]["message"]["content"] or "").strip()
@@ -85,3 +193,98 @@ class OpenRouterService(LlmModelService):
             latency_ms=latency,
             usage=usage,
         )
+
+    async def _post_routed(self, payload: dict) -> httpx.Response:
+        # gagal konek = request belum diproses server → aman dicoba di endpoint lain
+        for attempt in range(len(self._endpoints)):
+            try:
+                async with self._endpoints.lease(self._http.client()) as ep:
+                    resp = await self._http.post(ep.url, json=payload)
+                    resp.raise_for_status()
+                    return resp
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == len(self._endpoints) - 1:
+                    raise
+
+    @contextlib.asynccontextmanager
+    async def _stream_routed(self, payload: dict) -> AsyncIterator[httpx.Response]:
+        # sama dengan _post_routed, tapi hanya sebelum stream mulai dibaca
+        client = self._http.client()
+        for attempt in range(len(self._endpoints)):
+            started = False
+            try:
+                async with self._endpoints.lease(client) as ep:
+                    async with client.stream("POST", ep.url, json=payload) as resp:
+                        resp.raise_for_status()
+                        started = True
+                        yield resp
+                        return
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if started or attempt == len(self._endpoints) - 1:
+                    raise
+
+    async def _achat_stream(self, payload: dict) -> ChatOutput:
+        """
+        Streaming SSE (OpenAI-compatible). Begitu array JSON soal tertutup
+        (lihat ArrayCloseTracker), stream ditutup → koneksi diputus → Ollama
+        berhenti decode. Chunk usage dikirim Ollama paling akhir, jadi pada
+        early stop prompt_tokens/completion_tokens tidak ada (stream_chunks
+        dipakai sebagai jumlah token).
+        """
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        tracker = ArrayCloseTracker()
+        parts: List[str] = []
+        usage = None
+        n_chunks = 0
+        early_stop = False
+        t_first = None
+
+        async with self._http.slot():
+            t0 = time.time()
+            async with self._stream_routed(payload) as resp:
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        obj = json.loads(data)
+                    except ValueError:
+                        continue
+                    if obj.get("usage"):
+                        usage = obj["usage"]
+                    choices = obj.get("choices") or []
+                    delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if not delta:
+                        continue
+                    if t_first is None:
+                        t_first = time.time()
+                    parts.append(delta)
+                    n_chunks += 1
+                    if tracker.feed(delta):
+                        early_stop = True
+                        break
+            t_end = time.time()
+
+        text = "".join(parts).strip()
+        latency = int((t_end - t0) * 1000)
+        ttft_ms = int((t_first - t0) * 1000) if t_first is not None else None
+        # Ollama kirim ~1 token per chunk; pakai completion_tokens kalau tersedia
+        n_tokens = (usage or {}).get("completion_tokens") or n_chunks
+        decode_s = (t_end - t_first) if t_first is not None else 0.0
+        tps = round(n_tokens / decode_s, 2) if decode_s > 0 else None
+
+        usage = {
+            **(usage or {"backend": "ollama-openai", "model": self.model}),
+            "stream": True,
+            "early_stop": early_stop,
+            "stream_chunks": n_chunks,
+        }
+        return ChatOutput(
+            text=text,
+            latency_ms=latency,
+            usage=usage,
+            ttft_ms=ttft_ms,
+            tokens_per_sec=tps,
+        )
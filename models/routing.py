@@ -0,0 +1,214 @@
+# QUESTION_GENERATION/models/routing.py
+"""
+Routing request ke beberapa endpoint Ollama (mis. beberapa mesin CPU).
+
+Pilihan endpoint = least-outstanding-requests, dibobot latency:
+    cost = (in_flight + 1) × EWMA latency
+Endpoint yang belum punya data latency dianggap secepat endpoint tercepat,
+jadi tetap kebagian request. Kalau max_in_flight di-set (OLLAMA_NUM_PARALLEL,
+per server), endpoint yang sudah penuh dilewati selama masih ada yang kosong.
+
+Health: OLLAMA_EJECT_AFTER kegagalan beruntun (error koneksi / timeout /
+HTTP 5xx) → endpoint dikeluarkan OLLAMA_EJECT_SECONDS detik. Setelah itu
+endpoint di-probe (GET /v1/models); kalau sehat masuk lagi, kalau tidak
+jeda eject diperpanjang. Kalau semua endpoint sedang dikeluarkan, yang
+paling cepat habis jedanya tetap dipakai (daripada run berhenti).
+"""
+from __future__ import annotations
+import asyncio
+import contextlib
+import itertools
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Set
+
+import httpx
+
+
+def parse_endpoints(value: str | None) -> List[str]:
+    """"http://a:11434/v1/chat/completions, http://b:11434" → list URL chat lengkap."""
+    out: List[str] = []
+    for raw in (value or "").replace(";", ",").split(","):
+        url = raw.strip().rstrip("/")
+        if not url:
+            continue
+        if not url.endswith("/chat/completions"):
+            url += "/chat/completions" if url.endswith("/v1") else "/v1/chat/completions"
+        if url not in out:
+            out.append(url)
+    return out
+
+
+def _is_endpoint_failure(exc: BaseException) -> bool:
+    # 4xx (mis. model belum di-pull) bukan masalah kesehatan endpoint
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.ewma_ms: float | None = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.probing = False
+
+    @property
+    def models_url(self) -> str:
+        return self.url.rsplit("/chat/completions", 1)[0] + "/models"
+
+    def healthy(self, now: float) -> bool:
+        return self.ejected_until <= now and not self.probing
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: List[str],
+        *,
+        max_in_flight: int | None = None,
+        ewma_alpha: float = 0.3,
+        eject_after: int | None = None,
+        eject_seconds: float | None = None,
+    ):
+        if not urls:
+            raise ValueError("EndpointPool butuh minimal satu endpoint")
+        self.endpoints = [Endpoint(u) for u in urls]
+        self.max_in_flight = max_in_flight
+        self.ewma_alpha = ewma_alpha
+        if eject_after is None:
+            eject_after = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))
+        if eject_seconds is None:
+            eject_seconds = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+        # event loop hanya memegang weak ref ke task; simpan sampai probe selesai
+        self._probe_tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    # ---------- pemilihan ----------
+
+    def _pick(self) -> Endpoint:
+        now = time.monotonic()
+        with self._lock:
+            live = [e for e in self.endpoints if e.healthy(now)]
+            if not live:
+                live = [min(self.endpoints, key=lambda e: e.ejected_until)]
+            if self.max_in_flight:
+                free = [e for e in live if e.in_flight < self.max_in_flight]
+                live = free or live
+            known = [e.ewma_ms for e in live if e.ewma_ms is not None]
+            floor = min(known) if known else 1.0
+            # rotasi titik mulai → tie dibagi rata, bukan selalu endpoint pertama
+            start = next(self._rr) % len(live)
+            order = live[start:] + live[:start]
+            ep = min(order, key=lambda e: (e.in_flight + 1) * (e.ewma_ms if e.ewma_ms is not None else floor))
+            ep.in_flight += 1
+            ep.requests += 1
+            return ep
+
+    @contextlib.asynccontextmanager
+    async def lease(self, http: httpx.AsyncClient | None = None) -> AsyncIterator[Endpoint]:
+        """
+        Pinjam satu endpoint untuk satu request. Latency (sukses) masuk EWMA;
+        error koneksi / 5xx dihitung sebagai kegagalan endpoint. `http` dipakai
+        untuk probe endpoint yang jedanya sudah habis.
+        """
+        if http is not None:
+            self._schedule_probes(http)
+        ep = self._pick()
+        t0 = time.perf_counter()
+        try:
+            yield ep
+        except BaseException as e:
+            with self._lock:
+                ep.in_flight -= 1
+                if _is_endpoint_failure(e):
+                    self._record_failure(ep)
+            raise
+        else:
+            ms = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                ep.in_flight -= 1
+                ep.consecutive_failures = 0
+                ep.ewma_ms = ms if ep.ewma_ms is None else (
+                    self.ewma_alpha * ms + (1 - self.ewma_alpha) * ep.ewma_ms
+                )
+
+    def _record_failure(self, ep: Endpoint) -> None:
+        ep.failures += 1
+        ep.consecutive_failures += 1
+        if ep.consecutive_failures >= self.eject_after and ep.ejected_until <= time.monotonic():
+            self._eject(ep, f"{ep.consecutive_failures} consecutive failures")
+
+    def _eject(self, ep: Endpoint, reason: str) -> None:
+        ep.ejected_until = time.monotonic() + self.eject_seconds
+        ep.ejections += 1
+        print(f"[EndpointPool] eject {ep.url} for {self.eject_seconds:.0f}s ({reason})")
+
+    # ---------- health check ----------
+
+    def _schedule_probes(self, http: httpx.AsyncClient) -> None:
+        now = time.monotonic()
+        with self._lock:
+            due = [e for e in self.endpoints if not e.probing and 0 < e.ejected_until <= now]
+            for e in due:
+                e.probing = True
+        for e in due:
+            task = asyncio.get_running_loop().create_task(self._probe(e, http))
+            self._probe_tasks.add(task)
+            task.add_done_callback(self._probe_tasks.discard)
+
+    async def _probe(self, ep: Endpoint, http: httpx.AsyncClient) -> bool:
+        try:
+            r = await http.get(ep.models_url, timeout=5.0)
+            ok = r.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        with self._lock:
+            ep.probing = False
+            was_out = ep.ejected_until > 0
+            if ok:
+                ep.consecutive_failures = 0
+                ep.ejected_until = 0.0
+            else:
+                self._eject(ep, "health check failed")
+        if ok and was_out:
+            print(f"[EndpointPool] readmit {ep.url}")
+        return ok
+
+    async def health_check(self, http: httpx.AsyncClient) -> Dict[str, bool]:
+        """Probe semua endpoint sekarang (dipakai saat warmup); yang gagal langsung dikeluarkan."""
+        with self._lock:
+            for e in self.endpoints:
+                e.probing = True
+        results = await asyncio.gather(*(self._probe(e, http) for e in self.endpoints))
+        return {e.url: ok for e, ok in zip(self.endpoints, results)}
+
+    # ---------- statistik ----------
+
+    def stats(self) -> List[Dict[str, object]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "healthy": e.ejected_until <= now,
+                    "in_flight": e.in_flight,
+                    "requests": e.requests,
+                    "failures": e.failures,
+                    "ejections": e.ejections,
+                    "ewma_ms": round(e.ewma_ms, 1) if e.ewma_ms is not None else None,
+                }
+                for e in self.endpoints
+            ]
@@ -1,32 +1,69 @@
 # QUESTION_GENERATION/normalize.py
 import re
-from typing import List
+from typing import Dict, Iterable, List
 
 STOPWORDS = {
   'yang','dan','atau','pada','dari','untuk','dengan','adalah','nilai','berapa',
   'tentukan','sebuah','suatu','jika','ke','di','dalam','itu','ini','the','of','a','an','to','is','are'
 }
 
+# LaTeX → Unicode/teks polos. Urutan = prioritas (sama dengan urutan re.sub
+# lama: mis. \deg menang atas \degree, \ne menang atas \neq).
+_LATEX_TABLE = [
+    ('\\times', '×'), ('\\cdot', '·'), ('\\pi', 'π'),
+    ('\\deg', '°'), ('\\degree', '°'), ('\\circ', '°'),
+    ('\\sin', 'sin'), ('\\cos', 'cos'), ('\\tan', 'tan'),
+    ('\\sqrt', 'sqrt'), ('\\ln', 'ln'), ('\\log', 'log'),
+    ('\\cup', '∪'), ('\\cap', '∩'), ('\\leq', '≤'), ('\\geq', '≥'),
+    ('\\ne', '≠'), ('\\pm', '±'), ('\\left', ''), ('\\right', ''),
+]
+_LATEX_MAP = dict(_LATEX_TABLE)
+# scan 1: semua perintah tabel dalam satu regex (alternatif berurutan)
+_LATEX_RE = re.compile("|".join(re.escape(k) for k, _ in _LATEX_TABLE))
+# scan 2: \frac{a}{b}, ^{n}, kurung kurawal, backslash sisa
+_TAIL_RE = re.compile(r'\\frac\{([^}]+)\}\{([^}]+)\}|\^\{(\d+)\}|[{}\\]')
+
+def _latex_sub(m: "re.Match[str]") -> str:
+    return _LATEX_MAP[m.group()]
+
+def _tail_sub(m: "re.Match[str]") -> str:
+    num = m.group(1)
+    if num is not None:
+        # isi [^}]+ tidak bisa memuat }, jadi yang tersisa hanya { dan backslash
+        den = m.group(2)
+        return (
+            "(" + num.replace("{", "").replace("\\", "") + ")/("
+            + den.replace("{", "").replace("\\", "") + ")"
+        )
+    sup = m.group(3)
+    if sup is not None:
+        return "^" + sup
+    return ""
+
 def normalize_math_text(s: str) -> str:
     if not s: return s
-    t = s
-    t = t.replace('$','')
-    t = t.replace('\\\\','\\')
-    repl = [
-        (r'\\times','×'), (r'\\cdot','·'), (r'\\pi','π'),
-        (r'\\deg|\\degree|\\circ','°'),
-        (r'\\sin','sin'), (r'\\cos','cos'), (r'\\tan','tan'),
-        (r'\\sqrt','sqrt'), (r'\\ln','ln'), (r'\\log','log'),
-        (r'\\cup','∪'), (r'\\cap','∩'), (r'\\leq','≤'), (r'\\geq','≥'),
-        (r'\\ne','≠'), (r'\\pm','±'), (r'\\left|\\right',''),
-    ]
-    for p, r in repl: t = re.sub(p, r, t)
-    t = re.sub(r'\\frac\{([^}]+)\}\{([^}]+)\}', r'(\1)/(\2)', t)
-    t = re.sub(r'\^\{(\d+)\}', r'^\1', t)
-    t = re.sub(r'[{}]', '', t)
-    t = t.replace('\\','')
-    t = re.sub(r'\s+',' ', t).strip()
-    return t
+    t = s.replace('$','').replace('\\\\','\\')
+    if '\\' in t:
+        t = _LATEX_RE.sub(_latex_sub, t)
+    t = _TAIL_RE.sub(_tail_sub, t)
+    return " ".join(t.split())
+
+def normalize_many(texts: Iterable[str]) -> List[str]:
+    """
+    Versi batch normalize_math_text (mis. backfill satu kolom CSV).
+    Nilai yang berulang hanya dinormalisasi sekali.
+    """
+    seen: Dict[str, str] = {}
+    out: List[str] = []
+    for t in texts:
+        if not t:
+            out.append(t)
+            continue
+        r = seen.get(t)
+        if r is None:
+            r = seen[t] = normalize_math_text(t)
+        out.append(r)
+    return out
 
 def normalize_quiz(q: dict) -> dict:
     return {
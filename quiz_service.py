@@ -1,89 +1,153 @@
 from __future__ import annotations
-from typing import Dict, List, Any
-import time, os, csv, pathlib
-import json
+from typing import Dict, List, Any, Tuple
+import time, os, pathlib
+import asyncio, json
+import queue, threading, contextvars
+from contextlib import contextmanager
 
-from models.base import LlmModelService
+from models.base import LlmModelService, run_sync
 from prompting import build_messages_single, TopicKey, PromptStructKey
 from json_utils import extract_json_array
-from normalize import normalize_quiz, extract_avoid_terms
-from validator_gemini import verify_with_gemini
-
-CSV_HEADER = [
-    "topic","model","struktur","index","latency_model_ms",
-    "question","optionA","optionB","optionC","optionD",
-    "answer","solution_model","solution_verifier",
-    "verifier_model","latency_verifier_ms",
-    "clarity","context_accuracy","final_answer_accuracy","quality_of_working","judge_notes",
-    "prompt_generator",
-]
+from normalize import normalize_quiz
+from avoid_store import AvoidTermStore, estimate_tokens
+from validator_gemini import (
+    verify_with_gemini,
+    verify_many_with_gemini,
+    default_verifier_model,
+    JUDGE_BATCH_PROMPT_VERSION,
+    JUDGE_PROMPT_VERSION,
+)
+from verify_cache import VerificationCache, item_hash
+from dedup_index import get_dedup_index
+from sinks import (
+    CSV_HEADER, CsvSink, MultiSink, ParquetSink, parse_output_formats, read_csv_rows, rewrite_csv, rows_by_index,
+)
+from run_store import RunStoreSink, get_run_store
+from verify_queue import VerifyQueue, apply_to_outputs, get_judge_backoff, get_verify_queue
+import tracing
+
+# sentinel akhir antrian pada mode pipelined
+_PIPELINE_DONE = object()
+_NEAR_DUP = "near-duplicate"
+# batas kandidat spekulatif per index (seed kandidat = seed dasar + j)
+_MAX_CANDIDATES = 8
+
+_GEMINI_STRICT = """
+STRICT FOR GEMINI:
+- Output plain-text JSON only; do not use LaTeX ($ or backslashes).
+- The "solution" must be 3–6 lines, plain text."""
+# teks baseline untuk generate_per_item_with_latency (eksperimen latency); jangan
+# disamakan dengan _GEMINI_STRICT tanpa mencatat bahwa prompt eksperimennya berubah
+_GEMINI_STRICT_LATENCY = """
+STRICT FOR GEMINI:
+- Output plain text JSON; jangan gunakan LaTeX ($ atau backslash).
+- "solution" berupa langkah ringkas 3–6 baris, plain text."""
+
+
+def _prompt_tokens(usage: Dict[str, Any] | None) -> int | None:
+    """
+    Jumlah token prompt yang benar-benar dievaluasi backend (Ollama/Groq:
+    prompt_tokens, Gemini: prompt_token_count). Di Ollama angka ini turun
+    kalau prefix system prompt diambil dari KV cache.
+    """
+    if not usage:
+        return None
+    n = usage.get("prompt_tokens", usage.get("prompt_token_count"))
+    return n if isinstance(n, int) else None
 
 def _now() -> str:
     import time as _t
     return _t.strftime("%H:%M:%S")
 
 
-def _extract_json_array_loose(text: str) -> List[Any]:
+def _candidate_params(temperature: float, k: int, seed: int) -> List[Tuple[float, int]]:
     """
-    Fallback extractor yang lebih toleran:
-    - hapus ```json / ``` kalau ada
-    - cari substring [ ... ] pertama dengan bracket matching
-    - coba json.loads
-    - kalau hasilnya string, coba json.loads lagi
+    (temperature, seed) untuk k kandidat: kandidat 0 memakai temperature normal,
+    sisanya bergantian +/-0.15, +/-0.30, ... (dibatasi 0.1..1.2), seed berbeda.
     """
-    s = (text or "").strip()
-    # buang code fences sederhana
-    s = s.replace("```json", "").replace("```", "").strip()
+    out = []
+    for j in range(k):
+        step = 0.15 * ((j + 1) // 2) * (1 if j % 2 else -1)
+        out.append((round(min(1.2, max(0.1, temperature + step)), 2), seed + j))
+    return out
+
 
-    # coba dulu pake extractor bawaan
+def _extract_json_array_loose(text: str) -> List[Any]:
+    """
+    Extractor toleran untuk output generator: [] kalau tidak ada array/objek
+    JSON yang bisa dibaca (fence, smart quotes, trailing comma, double-encoded,
+    dsb. sudah ditangani json_utils.parse_tolerant dalam satu pass).
+    """
     try:
-        arr = extract_json_array(s)
-        if isinstance(arr, list) and arr:
-            return arr
-    except Exception:
-        pass
-
-    # manual cari [ ... ]
-    start = s.find("[")
-    if start == -1:
+        arr = extract_json_array(text)
+    except ValueError:
         return []
+    return arr if isinstance(arr, list) else []
 
-    depth = 0
-    end = -1
-    for i, ch in enumerate(s[start:], start=start):
-        if ch == "[":
-            depth += 1
-        elif ch == "]":
-            depth -= 1
-            if depth == 0:
-                end = i
-                break
 
-    if end == -1:
-        return []
+def _parse_generator_output(text: str) -> Tuple[Dict[str, Any] | None, str]:
+    """Objek MCQ mentah (belum dinormalisasi) dari output generator → (dict | None, alasan_gagal)."""
+    quiz_arr: List[Any] = _extract_json_array_loose(text)
+    if not quiz_arr:
+        return None, "no valid JSON array"
 
-    chunk = s[start:end+1].strip()
-    try:
-        arr = json.loads(chunk)
-    except Exception:
-        # mungkin double-encoded, mis. "[{\"question\":...}]"
+    raw_q = quiz_arr[0]
+    if isinstance(raw_q, str):
         try:
-            tmp = json.loads(chunk)
-            if isinstance(tmp, str):
-                arr = json.loads(tmp)
-            else:
-                return []
+            raw_q = json.loads(raw_q)
         except Exception:
-            return []
+            return None, "inner JSON not parseable"
 
-    if isinstance(arr, list):
-        return arr
-    return []
+    if not isinstance(raw_q, dict):
+        return None, "JSON element is not an object"
+    return raw_q, ""
 
 
 class QuizService:
-    def __init__(self, model_map: Dict[str, LlmModelService]):
+    def __init__(
+        self,
+        model_map: Dict[str, LlmModelService],
+        *,
+        verify_cache: VerificationCache | None = None,
+        dedup: str | None = None,
+        dedup_retries: int = 2,
+        output_format: str | Tuple[str, ...] = "csv",
+        on_verify_error: str = "stop",
+        verify_queue: VerifyQueue | None = None,
+        candidates: int = 1,
+        max_attempts: int = 5,
+    ):
         self.model_map = model_map
+        # total waktu verifier tertahan rate limiter (ms) sepanjang umur service
+        self.verifier_wait_ms = 0
+        # cache hasil judge (opsional) + statistik hit/miss
+        self.verify_cache = verify_cache
+        self.verify_cache_stats = {"hit": 0, "miss": 0}
+        # index near-duplicate per topic (dedup_index): None = nonaktif,
+        # "regenerate" = minta soal baru (maks dedup_retries kali), "skip" = lewati index
+        self.dedup = dedup
+        self.dedup_retries = max(0, dedup_retries)
+        self.dedup_stats = {"hit": 0}
+        # csv | parquet | sqlite | both, atau gabungan "csv,sqlite" (sinks.parse_output_formats);
+        # Parquet = csv_path dengan suffix .parquet, SQLite = run store bersama (run_store.py)
+        self.output_formats = parse_output_formats(output_format)
+        # judge gagal: "stop" = tulis baris partial lalu berhenti (resume nanti),
+        # "defer" = baris partial + antrian verifikasi (verify_queue.py), generator lanjut
+        if on_verify_error not in ("stop", "defer"):
+            raise ValueError(f"on_verify_error harus stop|defer, bukan {on_verify_error!r}")
+        self.on_verify_error = on_verify_error
+        self.verify_queue = verify_queue
+        if on_verify_error == "defer" and verify_queue is None:
+            self.verify_queue = get_verify_queue()
+        self.judge_backoff = get_judge_backoff()
+        self.defer_stats = {"deferred": 0, "drained": 0}
+        # candidates > 1: tiap index minta K generasi sekaligus (temperature/seed beda),
+        # yang pertama lolos parse + normalize dipakai, sisanya dibatalkan.
+        # Index yang gagal diulang (maks max_attempts kali) supaya run berisi tepat `count` soal.
+        self.candidates = min(_MAX_CANDIDATES, max(1, int(candidates)))
+        self.max_attempts = max(1, int(max_attempts))
+        # outputs / parse_failed: laju gagal parse generator (bandingkan OLLAMA_STRUCTURED_OUTPUT=0/1)
+        self.gen_stats = {"outputs": 0, "parse_failed": 0, "retried": 0, "candidates": 0, "cancelled": 0}
 
     def _svc(self, key: str) -> LlmModelService:
         svc = self.model_map.get(key)
@@ -103,181 +167,906 @@ class QuizService:
         out = svc.chat(messages, temperature=temperature)
         return out.text
 
-    def generate_items_incremental_to_csv(
+    def _messages_for(
         self,
+        model_key: str,
+        struktur: PromptStructKey,
+        topic: TopicKey,
+        avoid_terms: List[str],
         *,
+        gemini_strict: str = _GEMINI_STRICT,
+    ) -> List[Dict[str, str]]:
+        messages = build_messages_single(struktur, topic, avoid_terms)
+        if model_key.lower().startswith("gemini"):
+            # suffix konstan → system message tetap identik antar item
+            messages[0] = {
+                **messages[0],
+                "content": messages[0]["content"] + gemini_strict,
+            }
+        return messages
+
+    def _generate_one(
+        self,
+        svc: LlmModelService,
+        *,
+        model_key: str,
+        struktur: PromptStructKey,
         topic: TopicKey,
+        avoid_terms: List[str],
+        qidx: int = 0,
+        retry: int = 0,
+    ) -> Tuple[Dict[str, Any] | None, Any, str, str]:
+        """
+        Generate satu soal; kalau near-duplicate dan dedup="regenerate",
+        ulangi (maks dedup_retries kali) sebelum dianggap gagal.
+        Return (quiz_ternormalisasi | None, ChatOutput, prompt_generator, alasan_gagal).
+        """
+        tries = 1 + (self.dedup_retries if self.dedup == "regenerate" else 0)
+        for attempt in range(tries):
+            q, out, prompt_generator, fail = self._generate_attempt(
+                svc,
+                model_key=model_key,
+                struktur=struktur,
+                topic=topic,
+                avoid_terms=avoid_terms,
+                # seed deterministik per (index, ulangan) → run bisa diulang / di-cache
+                seed=((qidx * 100 + retry) * 10 + attempt) * _MAX_CANDIDATES,
+                retry=bool(retry or attempt),
+            )
+            if not fail.startswith(_NEAR_DUP) or attempt == tries - 1:
+                break
+            print(f" {fail}, regenerating...", end="", flush=True)
+        return q, out, prompt_generator, fail
+
+    def _generate_attempt(
+        self,
+        svc: LlmModelService,
+        *,
         model_key: str,
-        struktur: PromptStructKey = "struktur1",
-        count: int = 4,
-        csv_path: pathlib.Path,
-    ):
-        csv_path.parent.mkdir(parents=True, exist_ok=True)
-        file_exists = csv_path.exists()
-        f = csv_path.open("a", newline="", encoding="utf-8")
-        w = csv.DictWriter(f, fieldnames=CSV_HEADER, extrasaction="ignore")
-        if not file_exists:
-            w.writeheader()
-            f.flush()
-            print(f"[{_now()}] CSV created: {csv_path.name}")
+        struktur: PromptStructKey,
+        topic: TopicKey,
+        avoid_terms: List[str],
+        seed: int = 0,
+        retry: bool = False,
+    ) -> Tuple[Dict[str, Any] | None, Any, str, str]:
+        """
+        Satu kali panggil generator + parse + normalize (+ cek near-duplicate).
+        Dengan candidates > 1 panggilannya berupa K kandidat paralel (_race_candidates).
+        retry=True: ulangan index yang sama → seed ikut dikirim, supaya backend
+        (dan key LLM_CACHE) berbeda dari percobaan sebelumnya; percobaan pertama
+        tanpa seed, key cache tetap sama dengan run lama.
+        """
+        with tracing.span("prompt_build", avoid_terms=len(avoid_terms)):
+            messages = self._messages_for(model_key, struktur, topic, avoid_terms)
+            prompt_generator = "\n".join(
+                [f"{m['role'].upper()}: {m['content']}" for m in messages]
+            )
+        temperature_used = 0.4 if struktur == "struktur1" else 0.75
+        if self.candidates > 1:
+            q, out, fail = self._race_candidates(
+                svc, messages, temperature_used, model_key=model_key, topic=topic, seed=seed
+            )
+            return q, out, prompt_generator, fail
 
-        svc = self._svc(model_key)
-        avoid_set: set[str] = set()
+        with tracing.span("generate", model=model_key) as sp:
+            out = svc.chat(messages, temperature=temperature_used, seed=seed if retry else None)
+            sp.update(
+                latency_ms=out.latency_ms,
+                ttft_ms=out.ttft_ms,
+                prompt_tokens=_prompt_tokens(out.usage),
+                cached=bool((out.usage or {}).get("cached")),
+            )
+        q, fail = self._parse_candidate(out, topic)
+        return q, out, prompt_generator, fail
 
-        for i in range(count):
-            qidx = i + 1
+    def _parse_candidate(self, out: Any, topic: TopicKey) -> Tuple[Dict[str, Any] | None, str]:
+        """Parse + normalize (+ cek near-duplicate) satu output generator → (quiz | None, alasan_gagal)."""
+        # ==== PARSE RESULT (LOOSE) ====
+        with tracing.span("parse") as sp:
+            raw_q, fail = _parse_generator_output(out.text)
+            sp["ok"] = raw_q is not None
+        self.gen_stats["outputs"] += 1
+        if raw_q is None:
+            self.gen_stats["parse_failed"] += 1
+            return None, fail
 
-            messages = build_messages_single(struktur, topic, list(avoid_set))
-            if model_key.lower().startswith("gemini"):
-                messages[0] = {
-                    **messages[0],
-                    "content": messages[0]["content"]
-                    + """
-STRICT FOR GEMINI:
-- Output plain-text JSON only; do not use LaTeX ($ or backslashes).
-- The "solution" must be 3–6 lines, plain text."""
-                }
-            prompt_generator = "\n".join(
-                [f"{m['role'].upper()}: {m['content']}" for m in messages]
+        with tracing.span("normalize"):
+            q = normalize_quiz(raw_q)
+        if self.dedup:
+            # cek sebelum verifikasi: duplikat tidak perlu makan slot judge
+            with tracing.span("dedup") as sp:
+                hit = get_dedup_index(topic).check_and_add(q.get("question") or "")
+                sp["hit"] = hit is not None
+            if hit is not None:
+                self.dedup_stats["hit"] += 1
+                return None, f"{_NEAR_DUP} (sim={hit[0]:.2f})"
+        return q, ""
+
+    def _race_candidates(
+        self,
+        svc: LlmModelService,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        *,
+        model_key: str,
+        topic: TopicKey,
+        seed: int,
+    ) -> Tuple[Dict[str, Any] | None, Any, str]:
+        """
+        K kandidat sekaligus lewat achat (temperature/seed beda, lihat _candidate_params);
+        kandidat pertama yang lolos _parse_candidate menang, sisanya di-cancel
+        (request HTTP ke Ollama/Groq ikut diputus). Return (quiz | None, ChatOutput, alasan_gagal);
+        kalau semua kandidat melempar exception, exception terakhir dilempar ulang.
+        """
+        params = _candidate_params(temperature, self.candidates, seed)
+
+        async def one(j: int, temp: float, s: int):
+            return j, await svc.achat(messages, temperature=temp, seed=s)
+
+        async def race():
+            tasks = [asyncio.ensure_future(one(j, t, s)) for j, (t, s) in enumerate(params)]
+            last_out, last_fail, last_exc = None, "", None
+            try:
+                for fut in asyncio.as_completed(tasks):
+                    try:
+                        j, out = await fut
+                    except Exception as e:
+                        last_exc = e
+                        continue
+                    q, fail = self._parse_candidate(out, topic)
+                    if q is not None:
+                        return q, out, "", j
+                    last_out, last_fail = out, fail
+            finally:
+                pending = [t for t in tasks if not t.done()]
+                for t in pending:
+                    t.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.gen_stats["candidates"] += len(tasks)
+                self.gen_stats["cancelled"] += len(pending)
+            if last_out is None and last_exc is not None:
+                raise last_exc
+            return None, last_out, last_fail, -1
+
+        with tracing.span("generate", model=model_key, candidates=len(params)) as sp:
+            q, out, fail, winner = run_sync(race())
+            sp.update(
+                latency_ms=out.latency_ms,
+                ttft_ms=out.ttft_ms,
+                prompt_tokens=_prompt_tokens(out.usage),
+                cached=bool((out.usage or {}).get("cached")),
+                winner=winner,
+            )
+        return q, out, fail
+
+    def _attempt_note(self, attempt: int) -> str:
+        return f" (attempt {attempt}/{self.max_attempts})" if attempt > 1 else ""
+
+    def _after_failure(self, qidx: int, attempt: int, fail: str) -> Tuple[int, int]:
+        """
+        Index gagal → (qidx, attempt) berikutnya: index yang sama dicoba lagi sampai
+        max_attempts kali (lalu RuntimeError, run berhenti; resume bisa melanjutkan).
+        Pengecualian: near-duplicate dengan dedup="skip" tetap melewati index.
+        """
+        if self.dedup == "skip" and fail.startswith(_NEAR_DUP):
+            return qidx + 1, 1
+        if attempt >= self.max_attempts:
+            raise RuntimeError(f"question {qidx}: no valid item after {attempt} attempts (last: {fail})")
+        self.gen_stats["retried"] += 1
+        return qidx, attempt + 1
+
+    @staticmethod
+    def _base_row(
+        q: Dict[str, Any],
+        out: Any,
+        *,
+        topic: TopicKey,
+        model_key: str,
+        struktur: PromptStructKey,
+        qidx: int,
+        prompt_generator: str,
+    ) -> Dict[str, Any]:
+        opts = q.get("options") or ["", "", "", ""]
+        A = opts[0] if len(opts) > 0 else ""
+        B = opts[1] if len(opts) > 1 else ""
+        C = opts[2] if len(opts) > 2 else ""
+        D = opts[3] if len(opts) > 3 else ""
+        prompt_tokens = _prompt_tokens(out.usage)
+
+        return {
+            "topic": topic,
+            "model": model_key,
+            "struktur": struktur,
+            "index": qidx,
+            "latency_model_ms": out.latency_ms,
+            "question": q.get("question", ""),
+            "optionA": A,
+            "optionB": B,
+            "optionC": C,
+            "optionD": D,
+            "answer": q.get("answer", ""),
+            "solution_model": q.get("solution", ""),
+            "solution_verifier": "",
+            "verifier_model": "",
+            "latency_verifier_ms": "",
+            "clarity": "",
+            "context_accuracy": "",
+            "final_answer_accuracy": "",
+            "quality_of_working": "",
+            "judge_notes": "",
+            "prompt_generator": prompt_generator,
+            "ttft_ms": out.ttft_ms if out.ttft_ms is not None else "",
+            "tokens_per_sec": out.tokens_per_sec if out.tokens_per_sec is not None else "",
+            "prompt_tokens": prompt_tokens if prompt_tokens is not None else "",
+            "prompt_est_tokens": estimate_tokens(prompt_generator),
+        }
+
+    @staticmethod
+    def _apply_verification(row: Dict[str, Any], v: Dict[str, Any]) -> None:
+        s = v.get("scores") or {}
+        row.update(
+            {
+                "solution_verifier": v.get("solution_verifier", ""),
+                "verifier_model": v.get("model", ""),
+                "latency_verifier_ms": v.get("latencyMs") if v.get("latencyMs") is not None else "",
+                "clarity": s.get("clarity", ""),
+                "context_accuracy": s.get("context_accuracy", ""),
+                "final_answer_accuracy": s.get("final_answer_accuracy", ""),
+                "quality_of_working": s.get("quality_of_working", ""),
+                "judge_notes": v.get("notes", ""),
+            }
+        )
+
+    def _verify(self, q: Dict[str, Any]) -> Dict[str, Any]:
+        with tracing.span("verify", n=1) as sp:
+            v = self._verify_one(q)
+            sp["cached"] = bool(v.get("cached"))
+            return v
+
+    def _verify_one(self, q: Dict[str, Any]) -> Dict[str, Any]:
+        cache_key = None
+        if self.verify_cache is not None:
+            cache_key = (item_hash(q), default_verifier_model(), JUDGE_PROMPT_VERSION)
+            cached = self.verify_cache.get(*cache_key)
+            if cached is not None:
+                self.verify_cache_stats["hit"] += 1
+                # latency asli milik run yang merekam, bukan run ini → kosong di CSV
+                return {**cached, "cached": True, "latencyMs": None, "rateLimitWaitMs": 0}
+            self.verify_cache_stats["miss"] += 1
+
+        v = verify_with_gemini(
+            q["question"],
+            options=q.get("options"),
+            answer_key=q.get("answer"),
+            model_solution=q.get("solution"),
+        )
+        self.verifier_wait_ms += int(v.get("rateLimitWaitMs") or 0)
+        if cache_key is not None:
+            self.verify_cache.put(*cache_key, v)
+        return v
+
+    def _verify_many(self, qs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Seperti _verify tapi untuk beberapa item; miss cache dinilai dalam satu batch judge."""
+        if len(qs) == 1:
+            return [self._verify(qs[0])]
+        with tracing.span("verify", n=len(qs)) as sp:
+            results = self._verify_batch(qs)
+            sp["cached"] = sum(1 for v in results if v.get("cached"))
+            return results
+
+    def _verify_batch(self, qs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any] | None] = [None] * len(qs)
+        keys: List[Any] = [None] * len(qs)
+        pending: List[int] = []
+        for i, q in enumerate(qs):
+            if self.verify_cache is not None:
+                # vonis prompt batch disimpan terpisah dari vonis single (_verify_one)
+                keys[i] = (item_hash(q), default_verifier_model(), JUDGE_BATCH_PROMPT_VERSION)
+                cached = self.verify_cache.get(*keys[i])
+                if cached is not None:
+                    self.verify_cache_stats["hit"] += 1
+                    results[i] = {**cached, "cached": True, "latencyMs": None, "rateLimitWaitMs": 0}
+                    continue
+                self.verify_cache_stats["miss"] += 1
+            pending.append(i)
+
+        if pending:
+            judged = verify_many_with_gemini(
+                [
+                    {
+                        "id": str(i),
+                        "question": qs[i]["question"],
+                        "options": qs[i].get("options"),
+                        "answer": qs[i].get("answer"),
+                        "solution": qs[i].get("solution"),
+                    }
+                    for i in pending
+                ]
             )
+            for i in pending:
+                v = judged[str(i)]
+                self.verifier_wait_ms += int(v.get("rateLimitWaitMs") or 0)
+                if keys[i] is not None:
+                    self.verify_cache.put(*keys[i], v)
+                results[i] = v
+        return results  # type: ignore[return-value]
 
+    def _verifier_summary(self) -> str:
+        out = f"verifier throttled {self.verifier_wait_ms / 1000:.1f}s"
+        if self.verify_cache is not None:
+            out += (
+                f", verify cache hit={self.verify_cache_stats['hit']}"
+                f" miss={self.verify_cache_stats['miss']}"
+            )
+        if self.dedup:
+            out += f", near-duplicates rejected={self.dedup_stats['hit']}"
+        if self.on_verify_error == "defer":
+            out += f", deferred={self.defer_stats['deferred']} drained={self.defer_stats['drained']}"
+        if self.gen_stats["outputs"]:
+            out += f", parse failures={self.gen_stats['parse_failed']}/{self.gen_stats['outputs']}"
+        if self.gen_stats["retried"]:
+            out += f", generation retries={self.gen_stats['retried']}"
+        if self.candidates > 1:
+            out += (
+                f", candidates={self.gen_stats['candidates']}"
+                f" cancelled={self.gen_stats['cancelled']}"
+            )
+        return out
+
+    def _log_endpoint_stats(self, model_key: str) -> None:
+        # hanya untuk service multi-endpoint (OpenRouterService + OLLAMA_OPENAI_URLS)
+        stats = getattr(self.model_map.get(model_key), "endpoint_stats", None)
+        rows = stats() if callable(stats) else []
+        if len(rows) < 2:
+            return
+        for r in rows:
             print(
-                f"[{_now()}] Generating question {qidx}/{count}...",
-                end="",
+                f"[{_now()}] endpoint {r['url']}: requests={r['requests']} failures={r['failures']}"
+                f" ejections={r['ejections']} ewma={r['ewma_ms']} ms healthy={r['healthy']}",
                 flush=True,
             )
-            temperature_used = 0.4 if struktur == "struktur1" else 0.75
-            out = svc.chat(messages, temperature=temperature_used)
-
-            # ==== PARSE RESULT (LOOSE) ====
-            quiz_arr: List[Any] = _extract_json_array_loose(out.text)
-            if isinstance(quiz_arr, list) and len(quiz_arr) > 1:
-                quiz_arr = [quiz_arr[0]]
-
-            if not quiz_arr:
-                print(" failed (no valid JSON array).", flush=True)
-                if model_key.lower().startswith("gemini"):
-                    gap = float(
-                        os.getenv(
-                            "GEMINI_DELAY_BETWEEN_ITEMS",
-                            os.getenv("GEMINI_DELAY_BETWEEN_CALLS", "1.0"),
-                        )
-                    )
-                    time.sleep(max(0.0, gap))
-                continue
 
-            raw_q = quiz_arr[0]
-            if isinstance(raw_q, str):
-                try:
-                    raw_q = json.loads(raw_q)
-                except Exception:
-                    print(" failed (inner JSON not parseable).", flush=True)
-                    continue
+    # ---------- verifikasi tertunda (on_verify_error="defer") ----------
 
-            if not isinstance(raw_q, dict):
-                print(" failed (JSON element is not an object).", flush=True)
-                continue
+    def _defer(self, csv_path: pathlib.Path, rows: List[Dict[str, Any]], error: BaseException | str) -> str:
+        """Masukkan baris partial ke antrian verifikasi + jeda judge; return pesan log."""
+        for row in rows:
+            self.verify_queue.put(csv_path.as_posix(), row, str(error))
+        self.defer_stats["deferred"] += len(rows)
+        pause = self.judge_backoff.failed() if isinstance(error, BaseException) else self.judge_backoff.remaining()
+        return f"Deferred to verification queue (judge paused {pause:.1f}s), continuing."
 
-            q = normalize_quiz(raw_q)
-            print(" done.", flush=True)
-
-            opts = q.get("options") or ["", "", "", ""]
-            A = opts[0] if len(opts) > 0 else ""
-            B = opts[1] if len(opts) > 1 else ""
-            C = opts[2] if len(opts) > 2 else ""
-            D = opts[3] if len(opts) > 3 else ""
-
-            row = {
-                "topic": topic,
-                "model": model_key,
-                "struktur": struktur,
-                "index": qidx,
-                "latency_model_ms": out.latency_ms,
-                "question": q.get("question", ""),
-                "optionA": A,
-                "optionB": B,
-                "optionC": C,
-                "optionD": D,
-                "answer": q.get("answer", ""),
-                "solution_model": q.get("solution", ""),
-                "solution_verifier": "",
-                "verifier_model": "",
-                "latency_verifier_ms": "",
-                "clarity": "",
-                "context_accuracy": "",
-                "final_answer_accuracy": "",
-                "quality_of_working": "",
-                "judge_notes": "",
-                "prompt_generator": prompt_generator,
-            }
+    def _defer_if_paused(self, csv_path: pathlib.Path, rows: List[Dict[str, Any]]) -> bool:
+        """Judge masih dalam jeda backoff → langsung antrikan tanpa mencoba judge."""
+        if self.on_verify_error != "defer" or self.judge_backoff.remaining() <= 0:
+            return False
+        idxs = ", ".join(str(r["index"]) for r in rows)
+        print(f"[{_now()}] Question(s) {idxs}: {self._defer(csv_path, rows, 'judge paused')}", flush=True)
+        return True
 
-            try:
+    @contextmanager
+    def _deferred_run(self, csv_path: pathlib.Path):
+        """
+        Tandai run aktif di antrian (drain CLI tidak menulis ulang file yang
+        sedang di-append), lalu di akhir run nilai item tertunda run ini kalau
+        judge sudah pulih.
+        """
+        if self.on_verify_error != "defer":
+            yield
+            return
+        run_key = csv_path.as_posix()
+        self.verify_queue.begin_run(run_key)
+        try:
+            yield
+        finally:
+            self.verify_queue.end_run(run_key)
+        if self.verify_queue.counts().get(run_key):
+            if self.judge_backoff.remaining() > 0:
                 print(
-                    f"[{_now()}] Verifying question {qidx} with Gemini Pro...",
-                    end="",
+                    f"[{_now()}] {csv_path.name}: items still in verification queue;"
+                    " run `python verify_queue.py drain` later.",
                     flush=True,
                 )
-                v = verify_with_gemini(
-                    q["question"],
-                    options=q.get("options"),
-                    answer_key=q.get("answer"),
-                    model_solution=q.get("solution"),
-                )
-                s = v.get("scores") or {}
-                row.update(
-                    {
-                        "solution_verifier": v.get("solution_verifier", ""),
-                        "verifier_model": v.get("model", ""),
-                        "latency_verifier_ms": v.get("latencyMs", ""),
-                        "clarity": s.get("clarity", ""),
-                        "context_accuracy": s.get("context_accuracy", ""),
-                        "final_answer_accuracy": s.get(
-                            "final_answer_accuracy", ""
-                        ),
-                        "quality_of_working": s.get("quality_of_working", ""),
-                        "judge_notes": v.get("notes", ""),
-                    }
-                )
+            else:
+                self.drain_verify_queue(run_key)
+
+    @staticmethod
+    def _row_item(r: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "question": r.get("question", ""),
+            "options": [r.get("optionA", ""), r.get("optionB", ""), r.get("optionC", ""), r.get("optionD", "")],
+            "answer": r.get("answer", ""),
+            "solution": r.get("solution_model", ""),
+        }
+
+    def drain_verify_queue(
+        self,
+        run_key: str | None = None,
+        *,
+        batch: int = 4,
+        limit: int | None = None,
+    ) -> Dict[str, int]:
+        """
+        Nilai item di antrian verifikasi (semua run, atau `run_key` saja) per
+        batch judge, lalu isi baris di output run (verify_queue.apply_to_outputs).
+        Berhenti di kegagalan judge pertama; sisanya tetap di antrian.
+        Run yang sedang ditulis proses lain selalu dilewati (file-nya tidak
+        boleh ditulis ulang di bawah handle append), juga kalau `run_key` diberikan.
+        Return {"verified": n, "remaining": m}.
+        """
+        vq = self.verify_queue or get_verify_queue()
+        if run_key is not None and run_key in vq.active_runs(exclude_self=True):
+            print(
+                f"[{_now()}] {pathlib.Path(run_key).name} is still being written by another process;"
+                " drain it after that run finishes.",
+                flush=True,
+            )
+        jobs = vq.pending(run_key, limit=limit, skip_active=True)
+        by_run: Dict[str, List[Dict[str, Any]]] = {}
+        for key, row in jobs:
+            by_run.setdefault(key, []).append(row)
+
+        verified, failed = 0, False
+        for key, rows in by_run.items():
+            done: List[Dict[str, Any]] = []
+            name = pathlib.Path(key).name
+            for i in range(0, len(rows), max(1, batch)):
+                chunk = rows[i:i + max(1, batch)]
+                idxs = [int(r["index"]) for r in chunk]
+                print(f"[{_now()}] Draining {name} question(s) {idxs}...", end="", flush=True)
+                try:
+                    results = self._verify_many([self._row_item(r) for r in chunk])
+                except Exception as e:
+                    vq.fail(key, idxs, str(e))
+                    pause = self.judge_backoff.failed()
+                    print(f" FAILED ({e}). Judge paused {pause:.1f}s; keeping the rest queued.", flush=True)
+                    failed = True
+                    break
+                self.judge_backoff.ok()
+                for r, v in zip(chunk, results):
+                    self._apply_verification(r, v)
+                done.extend(chunk)
                 print(" done.", flush=True)
-            except Exception as e:
+            if done:
+                # output dulu, baru hapus dari antrian: crash di antaranya cuma
+                # berarti dinilai ulang (kena verify cache), bukan hilang
+                updated = apply_to_outputs(key, done)
+                vq.complete(key, [int(r["index"]) for r in done])
+                verified += len(done)
                 print(
-                    f" FAILED ({e}). Writing partial row and stopping.",
+                    f"[{_now()}] Filled {len(done)} verified row(s) in {', '.join(updated) or '(no output found)'}",
                     flush=True,
                 )
-                w.writerow(row)
-                f.flush()
-                f.close()
-                print(
-                    f"[{_now()}] Wrote partial row for question {qidx} to {csv_path.name}"
+            if failed:
+                break
+
+        self.defer_stats["drained"] += verified
+        counts = vq.counts()
+        remaining = counts.get(run_key, 0) if run_key is not None else sum(counts.values())
+        return {"verified": verified, "remaining": remaining}
+
+    @staticmethod
+    def _gemini_item_gap(model_key: str) -> None:
+        if model_key.lower().startswith("gemini"):
+            gap = float(
+                os.getenv(
+                    "GEMINI_DELAY_BETWEEN_ITEMS",
+                    os.getenv("GEMINI_DELAY_BETWEEN_CALLS", "1.0"),
+                )
+            )
+            with tracing.span("rate_limit_sleep", source="item_gap"):
+                time.sleep(max(0.0, gap))
+
+    def generate_items_incremental_to_csv(
+        self,
+        *,
+        topic: TopicKey,
+        model_key: str,
+        struktur: PromptStructKey = "struktur1",
+        count: int = 4,
+        csv_path: pathlib.Path,
+        pipelined: bool = False,
+        pipeline_depth: int = 2,
+        verify_batch: int = 1,
+        resume: bool = False,
+    ):
+        """
+        Generate `count` soal, verifikasi, dan tulis tiap baris ke CSV.
+
+        resume=True    : lanjutkan CSV yang sudah ada: baris partial (belum ada
+                         hasil verifier) diverifikasi ulang, avoid-terms dibangun
+                         ulang dari soal yang tersimpan, lalu lanjut dari index
+                         terakhir + 1 sampai `count`.
+
+        pipelined=True : generator item N+1 jalan di thread terpisah selagi
+                         item N diverifikasi (antrian dibatasi `pipeline_depth`).
+                         Baris tetap ditulis urut index dengan skema CSV yang sama.
+        verify_batch   : (>1, otomatis pakai mode pipelined) nilai beberapa soal
+                         sekaligus dalam satu request judge (verify_many).
+
+        Generator gagal (output tidak bisa di-parse): index yang sama diulang,
+        maks max_attempts kali, jadi CSV berisi tepat `count` soal; candidates > 1
+        meminta K kandidat paralel per index dan memakai yang pertama valid.
+
+        Judge gagal: default baris partial ditulis lalu run berhenti; dengan
+        on_verify_error="defer" item masuk antrian verifikasi (verify_queue.py)
+        dan generator lanjut, antrian dinilai di akhir run / `verify_queue.py drain`.
+        """
+        with tracing.run(
+            kind="incremental_csv",
+            topic=topic,
+            model=model_key,
+            struktur=struktur,
+            count=count,
+            csv=csv_path.name,
+            pipelined=bool(pipelined or verify_batch > 1),
+        ), self._deferred_run(csv_path):
+            csv_path.parent.mkdir(parents=True, exist_ok=True)
+            start_index = 0
+            avoid = AvoidTermStore()
+            if resume and csv_path.exists():
+                resumed = self._resume_csv(csv_path)
+                if resumed is None:
+                    return
+                start_index, avoid = resumed
+
+            sink = self._open_sink(
+                csv_path, resumed=start_index > 0, topic=topic, struktur=struktur, model_key=model_key
+            )
+            svc = self._svc(model_key)
+
+            if pipelined or verify_batch > 1:
+                self._run_pipelined(
+                    svc, sink,
+                    topic=topic,
+                    model_key=model_key,
+                    struktur=struktur,
+                    count=count,
+                    csv_path=csv_path,
+                    depth=pipeline_depth,
+                    verify_batch=verify_batch,
+                    start_index=start_index,
+                    avoid=avoid,
                 )
                 return
 
-            w.writerow(row)
-            f.flush()
+            try:
+                qidx, attempt = start_index + 1, 1
+                while qidx <= count:
+                    tracing.set_item(qidx)
+
+                    print(
+                        f"[{_now()}] Generating question {qidx}/{count}{self._attempt_note(attempt)}...",
+                        end="",
+                        flush=True,
+                    )
+                    avoid_terms = avoid.terms()
+                    q, out, prompt_generator, fail = self._generate_one(
+                        svc,
+                        model_key=model_key,
+                        struktur=struktur,
+                        topic=topic,
+                        avoid_terms=avoid_terms,
+                        qidx=qidx,
+                        retry=attempt - 1,
+                    )
+
+                    if q is None:
+                        print(f" failed ({fail}).", flush=True)
+                        if fail == "no valid JSON array":
+                            self._gemini_item_gap(model_key)
+                        qidx, attempt = self._after_failure(qidx, attempt, fail)
+                        continue
+
+                    print(
+                        f" done (avoid={len(avoid_terms)} terms, prompt~{estimate_tokens(prompt_generator)} tok,"
+                        f" prompt_tokens={_prompt_tokens(out.usage)}).",
+                        flush=True,
+                    )
+
+                    row = self._base_row(
+                        q, out,
+                        topic=topic,
+                        model_key=model_key,
+                        struktur=struktur,
+                        qidx=qidx,
+                        prompt_generator=prompt_generator,
+                    )
+
+                    deferred = self._defer_if_paused(csv_path, [row])
+                    if not deferred:
+                        try:
+                            print(
+                                f"[{_now()}] Verifying question {qidx} with Gemini Pro...",
+                                end="",
+                                flush=True,
+                            )
+                            self._apply_verification(row, self._verify(q))
+                            self.judge_backoff.ok()
+                            print(" done.", flush=True)
+                        except Exception as e:
+                            if self.on_verify_error != "defer":
+                                print(
+                                    f" FAILED ({e}). Writing partial row and stopping.",
+                                    flush=True,
+                                )
+                                with tracing.span("csv_write", partial=True):
+                                    sink.write(row)
+                                print(
+                                    f"[{_now()}] Wrote partial row for question {qidx} to {sink.name}"
+                                )
+                                return
+                            print(f" FAILED ({e}). {self._defer(csv_path, [row], e)}", flush=True)
+                            deferred = True
+
+                    with tracing.span("csv_write", partial=deferred):
+                        sink.write(row)
+                    print(
+                        f"[{_now()}] Wrote {'partial row for ' if deferred else ''}question {qidx} to {sink.name}",
+                        flush=True,
+                    )
+
+                    avoid.add_stem(q.get("question"))
+
+                    self._gemini_item_gap(model_key)
+                    qidx, attempt = qidx + 1, 1
+            finally:
+                sink.close()
+
             print(
-                f"[{_now()}] Wrote question {qidx} to {csv_path.name}",
+                f"[{_now()}] Completed {count} questions. Saved: {sink.name}"
+                f" ({self._verifier_summary()})",
                 flush=True,
             )
+            self._log_endpoint_stats(model_key)
+
+    def _open_sink(
+        self,
+        csv_path: pathlib.Path,
+        *,
+        resumed: bool,
+        topic: TopicKey,
+        struktur: PromptStructKey,
+        model_key: str,
+    ):
+        """CsvSink / ParquetSink / RunStoreSink (atau gabungannya) sesuai output_formats."""
+        # resume: baris yang sudah ada di CSV (partial sudah diverifikasi ulang)
+        # ditulis ulang ke sink lain; Parquet tidak bisa di-append, run store upsert
+        seed = read_csv_rows(csv_path) if resumed and csv_path.exists() else []
+        sinks = []
+        for fmt in self.output_formats:
+            if fmt == "csv":
+                sink = CsvSink(csv_path, CSV_HEADER)
+                if sink.created:
+                    print(f"[{_now()}] CSV created: {csv_path.name}")
+            elif fmt == "parquet":
+                sink = ParquetSink(csv_path.with_suffix(".parquet"))
+                sink.extend(seed)
+            else:
+                sink = RunStoreSink(
+                    get_run_store(), csv_path.as_posix(), topic=topic, struktur=struktur, model=model_key
+                )
+                sink.extend(seed)
+            sinks.append(sink)
+        return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+    def _resume_csv(self, csv_path: pathlib.Path) -> Tuple[int, AvoidTermStore] | None:
+        """
+        Baca CSV run sebelumnya, verifikasi ulang baris partial, tulis ulang file
+        (atomic, urut index). Return (index terakhir, AvoidTermStore), atau None kalau
+        verifikasi ulang gagal lagi (file tetap konsisten, run berhenti). Dengan
+        on_verify_error="defer" sisa baris partial masuk antrian dan run tetap lanjut.
+        """
+        # satu baris per index; baris terverifikasi menang atas baris partial
+        by_index = rows_by_index(read_csv_rows(csv_path))
+
+        partial = [i for i in sorted(by_index) if not by_index[i].get("verifier_model")]
+        print(
+            f"[{_now()}] Resume {csv_path.name}: {len(by_index) - len(partial)} completed,"
+            f" {len(partial)} partial",
+            flush=True,
+        )
+
+        ok = True
+        for n, idx in enumerate(partial):
+            r = by_index[idx]
+            if self._defer_if_paused(csv_path, [by_index[i] for i in partial[n:]]):
+                break
+            print(f"[{_now()}] Re-verifying question {idx}...", end="", flush=True)
+            try:
+                self._apply_verification(r, self._verify(self._row_item(r)))
+                self.judge_backoff.ok()
+                print(" done.", flush=True)
+                if self.on_verify_error == "defer":
+                    self.verify_queue.complete(csv_path.as_posix(), [idx])
+            except Exception as e:
+                if self.on_verify_error == "defer":
+                    rest = [by_index[i] for i in partial[n:]]
+                    print(f" FAILED ({e}). {self._defer(csv_path, rest, e)}", flush=True)
+                    break
+                print(f" FAILED ({e}). Keeping partial row and stopping.", flush=True)
+                ok = False
+                break
+
+        rewrite_csv(csv_path, [by_index[idx] for idx in sorted(by_index)])
 
-            stem = q.get("question")
-            if stem:
-                for t in extract_avoid_terms(stem):
-                    avoid_set.add(t)
+        if not ok:
+            return None
 
-            if model_key.lower().startswith("gemini"):
-                gap = float(
-                    os.getenv(
-                        "GEMINI_DELAY_BETWEEN_ITEMS",
-                        os.getenv("GEMINI_DELAY_BETWEEN_CALLS", "1.0"),
+        avoid = AvoidTermStore.from_stems(by_index[idx].get("question") for idx in sorted(by_index))
+        return max(by_index, default=0), avoid
+
+    def _run_pipelined(
+        self,
+        svc: LlmModelService,
+        sink,
+        *,
+        topic: TopicKey,
+        model_key: str,
+        struktur: PromptStructKey,
+        count: int,
+        csv_path: pathlib.Path,
+        depth: int,
+        verify_batch: int = 1,
+        start_index: int = 0,
+        avoid: AvoidTermStore | None = None,
+    ) -> None:
+        """
+        Producer/consumer: thread generator mengisi antrian (maks `depth` item
+        siap-verifikasi), thread utama memverifikasi dan menulis CSV.
+
+        Beda dengan mode serial: avoid-terms item N sudah dipakai untuk prompt
+        N+1 walaupun item N belum selesai diverifikasi.
+        """
+        jobs: queue.Queue = queue.Queue(maxsize=max(1, int(depth), int(verify_batch)))
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def _put(job) -> bool:
+            while not stop.is_set():
+                try:
+                    jobs.put(job, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer() -> None:
+            store = avoid if avoid is not None else AvoidTermStore()
+            try:
+                qidx, attempt = start_index + 1, 1
+                while qidx <= count:
+                    if stop.is_set():
+                        return
+                    tracing.set_item(qidx)
+                    print(
+                        f"[{_now()}] Generating question {qidx}/{count}{self._attempt_note(attempt)}...",
+                        flush=True,
                     )
-                )
-                time.sleep(max(0.0, gap))
+                    avoid_terms = store.terms()
+                    q, out, prompt_generator, fail = self._generate_one(
+                        svc,
+                        model_key=model_key,
+                        struktur=struktur,
+                        topic=topic,
+                        avoid_terms=avoid_terms,
+                        qidx=qidx,
+                        retry=attempt - 1,
+                    )
+                    if q is None:
+                        print(f"[{_now()}] Question {qidx} failed ({fail}).", flush=True)
+                        if fail == "no valid JSON array":
+                            self._gemini_item_gap(model_key)
+                        qidx, attempt = self._after_failure(qidx, attempt, fail)
+                        continue
+
+                    print(
+                        f"[{_now()}] Generated question {qidx}"
+                        f" (avoid={len(avoid_terms)} terms, prompt~{estimate_tokens(prompt_generator)} tok,"
+                        f" prompt_tokens={_prompt_tokens(out.usage)}).",
+                        flush=True,
+                    )
+                    row = self._base_row(
+                        q, out,
+                        topic=topic,
+                        model_key=model_key,
+                        struktur=struktur,
+                        qidx=qidx,
+                        prompt_generator=prompt_generator,
+                    )
+                    store.add_stem(q.get("question"))
+
+                    if not _put((qidx, q, row)):
+                        return
+                    self._gemini_item_gap(model_key)
+                    qidx, attempt = qidx + 1, 1
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                _put(_PIPELINE_DONE)
+
+        # copy_context: span di thread generator tetap membawa run_id yang sama
+        t = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(producer,),
+            name="quiz-generator",
+            daemon=True,
+        )
+        t.start()
+
+        batch_size = max(1, int(verify_batch))
+        completed = False
+        try:
+            done = False
+            while not done:
+                # kumpulkan sampai `batch_size` item siap (atau producer selesai)
+                batch = []
+                while len(batch) < batch_size:
+                    job = jobs.get()
+                    if job is _PIPELINE_DONE:
+                        done = True
+                        break
+                    batch.append(job)
+                if not batch:
+                    break
+
+                idxs = ", ".join(str(qidx) for qidx, _, _ in batch)
+                tracing.set_item(batch[0][0] if len(batch) == 1 else [qidx for qidx, _, _ in batch])
+                deferred = self._defer_if_paused(csv_path, [row for _, _, row in batch])
+                if not deferred:
+                    print(f"[{_now()}] Verifying question(s) {idxs} with Gemini Pro...", flush=True)
+                    try:
+                        results = self._verify_many([q for _, q, _ in batch])
+                        for (_, _, row), v in zip(batch, results):
+                            self._apply_verification(row, v)
+                        self.judge_backoff.ok()
+                    except Exception as e:
+                        if self.on_verify_error != "defer":
+                            stop.set()
+                            print(
+                                f"[{_now()}] Verify {idxs} FAILED ({e}). Writing partial row(s) and stopping.",
+                                flush=True,
+                            )
+                            with tracing.span("csv_write", partial=True, n=len(batch)):
+                                for _, _, row in batch:
+                                    sink.write(row)
+                            print(
+                                f"[{_now()}] Wrote partial row(s) for question(s) {idxs} to {sink.name}"
+                            )
+                            return
+                        print(
+                            f"[{_now()}] Verify {idxs} FAILED ({e}). "
+                            + self._defer(csv_path, [row for _, _, row in batch], e),
+                            flush=True,
+                        )
+                        deferred = True
+
+                for qidx, _, row in batch:
+                    tracing.set_item(qidx)
+                    with tracing.span("csv_write", partial=deferred):
+                        sink.write(row)
+                    print(
+                        f"[{_now()}] Wrote {'partial row for ' if deferred else ''}question {qidx} to {sink.name}",
+                        flush=True,
+                    )
+            completed = True
+        finally:
+            stop.set()
+            sink.close()
+            # tunggu generasi yang sedang jalan selesai supaya tidak bocor ke sel grid berikutnya
+            t.join()
+            if errors and not completed:
+                print(f"[{_now()}] Generator thread error after stop: {errors[0]!r}", flush=True)
+
+        if errors:
+            raise errors[0]
 
-        f.close()
         print(
-            f"[{_now()}] Completed {count} questions. CSV saved: {csv_path.name}",
+            f"[{_now()}] Completed {count} questions. Saved: {sink.name}"
+            f" ({self._verifier_summary()})",
             flush=True,
         )
+        self._log_endpoint_stats(model_key)
 
     def generate_per_item_with_latency(
         self,
@@ -287,97 +1076,86 @@ STRICT FOR GEMINI:
         count: int = 4,
     ):
         svc = self._svc(model_key)
-        avoid_set: set[str] = set()
+        avoid = AvoidTermStore()
         items: list[dict] = []
         started = time.time()
 
-        for i in range(count):
-            messages = build_messages_single(struktur, topic, list(avoid_set))
-            if model_key.lower().startswith("gemini"):
-                messages[0] = {
-                    **messages[0],
-                    "content": messages[0]["content"]
-                    + """
-STRICT FOR GEMINI:
-- Output plain text JSON; jangan gunakan LaTeX ($ atau backslash).
-- "solution" berupa langkah ringkas 3–6 baris, plain text."""
-                }
-            prompt_generator = "\n".join(
-                [f"{m['role'].upper()}: {m['content']}" for m in messages]
-            )
-            temperature_used = 0.4 if struktur == "struktur1" else 0.75
-            out = svc.chat(messages, temperature=temperature_used)
+        with tracing.run(kind="per_item_latency", topic=topic, model=model_key, struktur=struktur, count=count):
+            for i in range(count):
+                tracing.set_item(i + 1)
+                with tracing.span("prompt_build"):
+                    messages = self._messages_for(
+                        model_key, struktur, topic, avoid.terms(), gemini_strict=_GEMINI_STRICT_LATENCY
+                    )
+                    prompt_generator = "\n".join(
+                        [f"{m['role'].upper()}: {m['content']}" for m in messages]
+                    )
+                temperature_used = 0.4 if struktur == "struktur1" else 0.75
+                with tracing.span("generate", model=model_key) as sp:
+                    out = svc.chat(messages, temperature=temperature_used)
+                    sp.update(latency_ms=out.latency_ms, ttft_ms=out.ttft_ms)
 
-            quiz_arr = _extract_json_array_loose(out.text)
-            if isinstance(quiz_arr, list) and len(quiz_arr) > 1:
-                quiz_arr = [quiz_arr[0]]
+                with tracing.span("parse"):
+                    quiz_arr = _extract_json_array_loose(out.text)
+                if isinstance(quiz_arr, list) and len(quiz_arr) > 1:
+                    quiz_arr = [quiz_arr[0]]
 
-            normalized_list: list[dict] = []
-            if quiz_arr:
-                raw_q = quiz_arr[0]
-                if isinstance(raw_q, str):
-                    try:
-                        raw_q = json.loads(raw_q)
-                    except Exception:
-                        raw_q = None
-                if isinstance(raw_q, dict):
-                    normalized_list = [normalize_quiz(raw_q)]
-
-            quiz_arr = normalized_list
-
-            stem = quiz_arr[0]["question"] if quiz_arr else None
-            if stem:
-                for t in extract_avoid_terms(stem):
-                    avoid_set.add(t)
-
-            verifier_block = None
-            if quiz_arr:
-                q = quiz_arr[0]
-                v = verify_with_gemini(
-                    q["question"],
-                    options=q.get("options"),
-                    answer_key=q.get("answer"),
-                    model_solution=q.get("solution"),
-                )
-                verifier_block = {
-                    "model": v["model"],
-                    "question": q["question"],
-                    "solution_model": q.get("solution", ""),
-                    "solution_verifier": v["solution_verifier"],
-                    "latencyMs": v["latencyMs"],
-                    "usage": v["usage"],
-                    "scores": v["scores"],
-                    "notes": v["notes"],
-                    "rawText": v["rawText"],
-                }
-
-            items.append(
-                {
-                    "index": i + 1,
-                    "latencyMs": out.latency_ms,
-                    "usage": out.usage or None,
-                    "rawText": out.text,
-                    "quiz": quiz_arr,
-                    "verifier": verifier_block,
-                    "prompt_generator": prompt_generator,
-                }
-            )
+                normalized_list: list[dict] = []
+                if quiz_arr:
+                    raw_q = quiz_arr[0]
+                    if isinstance(raw_q, str):
+                        try:
+                            raw_q = json.loads(raw_q)
+                        except Exception:
+                            raw_q = None
+                    if isinstance(raw_q, dict):
+                        with tracing.span("normalize"):
+                            normalized_list = [normalize_quiz(raw_q)]
 
-            if model_key.lower().startswith("gemini"):
-                gap = float(
-                    os.getenv(
-                        "GEMINI_DELAY_BETWEEN_ITEMS",
-                        os.getenv("GEMINI_DELAY_BETWEEN_CALLS", "1.0"),
-                    )
+                quiz_arr = normalized_list
+
+                avoid.add_stem(quiz_arr[0]["question"] if quiz_arr else None)
+
+                verifier_block = None
+                if quiz_arr:
+                    q = quiz_arr[0]
+                    v = self._verify(q)
+                    verifier_block = {
+                        "model": v["model"],
+                        "question": q["question"],
+                        "solution_model": q.get("solution", ""),
+                        "solution_verifier": v["solution_verifier"],
+                        "latencyMs": v["latencyMs"],
+                        "cached": bool(v.get("cached")),
+                        "usage": v["usage"],
+                        "scores": v["scores"],
+                        "notes": v["notes"],
+                        "rawText": v["rawText"],
+                    }
+
+                items.append(
+                    {
+                        "index": i + 1,
+                        "latencyMs": out.latency_ms,
+                        "ttftMs": out.ttft_ms,
+                        "tokensPerSec": out.tokens_per_sec,
+                        "promptTokens": _prompt_tokens(out.usage),
+                        "usage": out.usage or None,
+                        "rawText": out.text,
+                        "quiz": quiz_arr,
+                        "verifier": verifier_block,
+                        "prompt_generator": prompt_generator,
+                    }
                 )
-                time.sleep(max(0.0, gap))
+
+                self._gemini_item_gap(model_key)
 
         total_elapsed_ms = int((time.time() - started) * 1000)
         last_prompt = "\n".join(
             [
                 f"{m['role'].upper()}: {m['content']}"
                 for m in build_messages_single(
-                    struktur, topic, list(avoid_set)
+                    struktur, topic, avoid.terms()
                 )
             ]
         )
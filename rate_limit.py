@@ -0,0 +1,164 @@
+# QUESTION_GENERATION/rate_limit.py
+"""
+Token-bucket rate limiter (RPM / TPM / RPD) yang state-nya disimpan di SQLite,
+sehingga semua proses lokal (mis. dua `python main.py` paralel) berbagi satu budget.
+
+Tiap dimensi adalah satu bucket:
+  - RPM : kapasitas `burst` request, isi ulang rpm/60 per detik
+  - TPM : kapasitas tpm token,       isi ulang tpm/60 per detik
+  - RPD : kapasitas rpd request,     isi ulang rpd/86400 per detik
+acquire() menunggu sampai SEMUA bucket cukup, lalu memotong semuanya dalam satu
+transaksi (BEGIN IMMEDIATE → lock tulis antar proses).
+"""
+from __future__ import annotations
+import threading, time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from utils.state import state_path, connect_sqlite
+
+
+@dataclass
+class _Bucket:
+    kind: str
+    capacity: float
+    rate: float  # isi ulang per detik
+
+
+class TokenBucketLimiter:
+    def __init__(
+        self,
+        key: str,
+        *,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        rpd: float | None = None,
+        burst: int = 1,
+        db_path: str | None = None,
+    ):
+        self.key = key
+        self.buckets: List[_Bucket] = []
+        if rpm:
+            self.buckets.append(_Bucket("rpm", float(max(1, burst)), rpm / 60.0))
+        if tpm:
+            self.buckets.append(_Bucket("tpm", float(tpm), tpm / 60.0))
+        if rpd:
+            self.buckets.append(_Bucket("rpd", float(rpd), rpd / 86400.0))
+
+        self.db_path = db_path or str(state_path("ratelimit.sqlite"))
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.db_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY, level REAL NOT NULL, ts REAL NOT NULL)"
+        )
+
+        self.calls = 0
+        self.throttled_calls = 0
+        self.wait_seconds = 0.0
+
+    def _bucket_key(self, b: _Bucket) -> str:
+        return f"{self.key}:{b.kind}"
+
+    def _levels(self, now: float) -> Dict[str, float]:
+        levels: Dict[str, float] = {}
+        for b in self.buckets:
+            row = self._conn.execute(
+                "SELECT level, ts FROM buckets WHERE key = ?", (self._bucket_key(b),)
+            ).fetchone()
+            if row is None:
+                levels[b.kind] = b.capacity
+            else:
+                level, ts = row
+                levels[b.kind] = min(b.capacity, level + max(0.0, now - ts) * b.rate)
+        return levels
+
+    def _write(self, levels: Dict[str, float], now: float) -> None:
+        for b in self.buckets:
+            self._conn.execute(
+                "INSERT INTO buckets(key, level, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET level = excluded.level, ts = excluded.ts",
+                (self._bucket_key(b), levels[b.kind], now),
+            )
+
+    def _try_take(self, tokens: int) -> float:
+        """Coba ambil budget; return 0 kalau berhasil, atau detik yang perlu ditunggu."""
+        costs = {"rpm": 1.0, "rpd": 1.0, "tpm": float(tokens)}
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = self._levels(now)
+                wait = 0.0
+                for b in self.buckets:
+                    # biaya lebih besar dari kapasitas tidak akan pernah muat → potong ke kapasitas
+                    need = min(costs[b.kind], b.capacity)
+                    if levels[b.kind] < need:
+                        wait = max(wait, (need - levels[b.kind]) / b.rate)
+                if wait <= 0:
+                    for b in self.buckets:
+                        levels[b.kind] -= costs[b.kind]
+                    self._write(levels, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blok sampai budget tersedia. `tokens` = estimasi token request (untuk TPM).
+        Return lama menunggu (detik).
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                break
+            # proses lain bisa mengambil slot duluan → tidur lalu cek lagi
+            time.sleep(wait)
+            waited += wait
+        with self._lock:
+            self.calls += 1
+            if waited > 0:
+                self.throttled_calls += 1
+                self.wait_seconds += waited
+        return waited
+
+    def adjust_tokens(self, delta: int) -> None:
+        """Koreksi bucket TPM setelah jumlah token aktual diketahui (delta = aktual - estimasi)."""
+        if not delta or not any(b.kind == "tpm" for b in self.buckets):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                levels = self._levels(now)
+                levels["tpm"] -= delta
+                self._write(levels, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled_calls": self.throttled_calls,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+_LIMITERS: Dict[Tuple, TokenBucketLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_limiter(key: str, **config) -> TokenBucketLimiter:
+    """Satu limiter per (key, config) per proses; state antar proses lewat SQLite."""
+    ident = (key, tuple(sorted(config.items())))
+    with _LIMITERS_LOCK:
+        lim = _LIMITERS.get(ident)
+        if lim is None:
+            lim = TokenBucketLimiter(key, **config)
+            _LIMITERS[ident] = lim
+        return lim
@@ -0,0 +1,330 @@
+# QUESTION_GENERATION/run_store.py
+"""
+Run store SQLite (WAL) untuk semua eksperimen: satu database, bukan
+ratusan CSV ber-timestamp di outputs/{topic}/{struktur}/.
+
+Tabel:
+  runs          satu baris per run (run_key = path CSV/output run itu)
+  prompts       teks bagian SYSTEM dari prompt_generator, disimpan sekali (hash unik)
+  items         satu baris per soal; topic/struktur/model ikut disimpan supaya
+                filter umum cukup pakai index tanpa join ke runs
+  verifications hasil judge per item (item partial = belum ada barisnya)
+
+Index: items(topic, struktur, model), items(model), verifications(clarity),
+verifications(final_answer_accuracy), dst. → query lintas run tetap
+milidetik di ~100k item (lihat benchmarks/bench_run_store.py).
+
+Tulis lewat RunStoreSink (OUTPUT_FORMAT=csv,sqlite / sqlite): baris di-buffer
+dan di-commit per batch (RUN_STORE_BATCH baris atau RUN_STORE_FLUSH_S detik)
+dalam satu transaksi BEGIN IMMEDIATE.
+
+    python run_store.py import outputs/           # impor CSV lama (idempotent)
+    python run_store.py sql "SELECT ..."          # query ad-hoc + waktu eksekusi
+"""
+from __future__ import annotations
+import argparse, os, pathlib, threading, time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sinks import _to_float, _to_int, join_prompt, prompt_hash, read_csv_rows, split_prompt
+from utils.state import connect_sqlite
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL UNIQUE,
+    topic TEXT, struktur TEXT, model TEXT,
+    started REAL NOT NULL, finished REAL
+);
+CREATE TABLE IF NOT EXISTS prompts (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    idx INTEGER NOT NULL,
+    topic TEXT NOT NULL, struktur TEXT NOT NULL, model TEXT NOT NULL,
+    question TEXT, option_a TEXT, option_b TEXT, option_c TEXT, option_d TEXT,
+    answer TEXT, solution_model TEXT,
+    latency_model_ms INTEGER, ttft_ms INTEGER, tokens_per_sec REAL,
+    prompt_tokens INTEGER, prompt_est_tokens INTEGER,
+    prompt_id INTEGER REFERENCES prompts(id), prompt_user TEXT,
+    UNIQUE (run_id, idx)
+);
+CREATE TABLE IF NOT EXISTS verifications (
+    item_id INTEGER PRIMARY KEY REFERENCES items(id),
+    verifier_model TEXT, latency_verifier_ms INTEGER,
+    clarity REAL, context_accuracy REAL, quality_of_working REAL,
+    final_answer_accuracy TEXT,
+    solution_verifier TEXT, judge_notes TEXT
+);
+CREATE INDEX IF NOT EXISTS items_tsm ON items(topic, struktur, model);
+CREATE INDEX IF NOT EXISTS items_model ON items(model, topic);
+CREATE INDEX IF NOT EXISTS ver_clarity ON verifications(clarity);
+CREATE INDEX IF NOT EXISTS ver_context ON verifications(context_accuracy);
+CREATE INDEX IF NOT EXISTS ver_quality ON verifications(quality_of_working);
+CREATE INDEX IF NOT EXISTS ver_final ON verifications(final_answer_accuracy);
+"""
+
+# view datar dengan kolom sama seperti CSV_HEADER (prompt_generator direkonstruksi lewat join_prompt)
+_FLAT = """
+SELECT i.topic, i.model, i.struktur, i.idx AS "index", i.latency_model_ms,
+       i.question, i.option_a AS optionA, i.option_b AS optionB, i.option_c AS optionC, i.option_d AS optionD,
+       i.answer, i.solution_model, v.solution_verifier, v.verifier_model, v.latency_verifier_ms,
+       v.clarity, v.context_accuracy, v.final_answer_accuracy, v.quality_of_working, v.judge_notes,
+       p.text AS prompt_system, i.prompt_user,
+       i.ttft_ms, i.tokens_per_sec, i.prompt_tokens, i.prompt_est_tokens, r.run_key
+FROM items i
+JOIN runs r ON r.id = i.run_id
+LEFT JOIN verifications v ON v.item_id = i.id
+LEFT JOIN prompts p ON p.id = i.prompt_id
+"""
+
+
+def _text(v: Any) -> str | None:
+    return None if v is None or v == "" else str(v)
+
+
+class RunStore:
+    def __init__(self, path: str | os.PathLike | None = None):
+        self.path = str(path or os.getenv("RUN_STORE_PATH") or "outputs/runs.sqlite")
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+        self._prompt_ids: Dict[str, int] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- tulis ----------
+
+    def start_run(self, run_key: str, *, topic: str, struktur: str, model: str) -> int:
+        """id run untuk run_key (dibuat kalau belum ada; resume memakai run yang sama)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO runs(run_key, topic, struktur, model, started) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(run_key) DO NOTHING",
+                (run_key, topic, struktur, model, time.time()),
+            )
+            return self._conn.execute("SELECT id FROM runs WHERE run_key = ?", (run_key,)).fetchone()[0]
+
+    def finish_run(self, run_id: int) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), run_id))
+
+    def _prompt_id(self, text: str) -> int:
+        h = prompt_hash(text)
+        pid = self._prompt_ids.get(h)
+        if pid is None:
+            self._conn.execute("INSERT INTO prompts(hash, text) VALUES (?, ?) ON CONFLICT(hash) DO NOTHING", (h, text))
+            pid = self._conn.execute("SELECT id FROM prompts WHERE hash = ?", (h,)).fetchone()[0]
+            self._prompt_ids[h] = pid
+        return pid
+
+    def write_rows(self, run_id: int, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upsert baris (format CSV_HEADER) dalam SATU transaksi. Baris dengan
+        (run, index) yang sama menimpa versi lama, jadi baris partial yang
+        kemudian diverifikasi ulang cukup ditulis lagi.
+        """
+        n = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for r in rows:
+                    self._write_row(run_id, r)
+                    n += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._prompt_ids.clear()
+                raise
+        return n
+
+    def _write_row(self, run_id: int, r: Dict[str, Any]) -> None:
+        prompt_id, prompt_user = None, None
+        if r.get("prompt_generator"):
+            head, prompt_user = split_prompt(r["prompt_generator"])
+            prompt_id = self._prompt_id(head)
+        item_id = self._conn.execute(
+            "INSERT INTO items(run_id, idx, topic, struktur, model, question,"
+            " option_a, option_b, option_c, option_d, answer, solution_model,"
+            " latency_model_ms, ttft_ms, tokens_per_sec, prompt_tokens, prompt_est_tokens, prompt_id, prompt_user)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(run_id, idx) DO UPDATE SET"
+            " topic=excluded.topic, struktur=excluded.struktur, model=excluded.model,"
+            " question=excluded.question, option_a=excluded.option_a, option_b=excluded.option_b,"
+            " option_c=excluded.option_c, option_d=excluded.option_d, answer=excluded.answer,"
+            " solution_model=excluded.solution_model, latency_model_ms=excluded.latency_model_ms,"
+            " ttft_ms=excluded.ttft_ms, tokens_per_sec=excluded.tokens_per_sec,"
+            " prompt_tokens=excluded.prompt_tokens, prompt_est_tokens=excluded.prompt_est_tokens,"
+            " prompt_id=excluded.prompt_id, prompt_user=excluded.prompt_user"
+            " RETURNING id",
+            (
+                run_id, _to_int(r.get("index")), r.get("topic") or "", r.get("struktur") or "", r.get("model") or "",
+                _text(r.get("question")), _text(r.get("optionA")), _text(r.get("optionB")),
+                _text(r.get("optionC")), _text(r.get("optionD")), _text(r.get("answer")),
+                _text(r.get("solution_model")), _to_int(r.get("latency_model_ms")), _to_int(r.get("ttft_ms")),
+                _to_float(r.get("tokens_per_sec")), _to_int(r.get("prompt_tokens")),
+                _to_int(r.get("prompt_est_tokens")), prompt_id, prompt_user,
+            ),
+        ).fetchone()[0]
+        if r.get("verifier_model"):
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verifications(item_id, verifier_model, latency_verifier_ms,"
+                " clarity, context_accuracy, quality_of_working, final_answer_accuracy,"
+                " solution_verifier, judge_notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    item_id, r.get("verifier_model"), _to_int(r.get("latency_verifier_ms")),
+                    _to_float(r.get("clarity")), _to_float(r.get("context_accuracy")),
+                    _to_float(r.get("quality_of_working")), _text(r.get("final_answer_accuracy")),
+                    _text(r.get("solution_verifier")), _text(r.get("judge_notes")),
+                ),
+            )
+        else:
+            self._conn.execute("DELETE FROM verifications WHERE item_id = ?", (item_id,))
+
+    def import_csv(self, csv_path: str | pathlib.Path, run_key: str | None = None) -> int:
+        """Impor satu CSV hasil (run_key default = path CSV). Idempotent."""
+        csv_path = pathlib.Path(csv_path)
+        rows = read_csv_rows(csv_path)
+        if not rows:
+            return 0
+        first = rows[0]
+        run_id = self.start_run(
+            run_key or csv_path.as_posix(),
+            topic=first.get("topic") or "", struktur=first.get("struktur") or "", model=first.get("model") or "",
+        )
+        n = self.write_rows(run_id, rows)
+        self.finish_run(run_id)
+        return n
+
+    # ---------- baca ----------
+
+    def query(self, sql: str, params: Tuple[Any, ...] | Dict[str, Any] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            cols = [d[0] for d in cur.description or []]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def rows(self, where: str = "", params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        """Baris datar seperti CSV (+ run_key), mis. rows("v.final_answer_accuracy = ?", ("Incorrect",))."""
+        out = self.query(_FLAT + (f" WHERE {where}" if where else "") + " ORDER BY i.id", params)
+        for r in out:
+            system = r.pop("prompt_system")
+            user = r.pop("prompt_user")
+            r["prompt_generator"] = join_prompt(system, user) if system is not None else None
+        return out
+
+    def mean_scores(self, *, by: str = "model", topic: str | None = None, struktur: str | None = None) -> List[Dict[str, Any]]:
+        """Rata-rata skor per `by` (model | topic | struktur), opsional difilter topic/struktur."""
+        if by not in ("model", "topic", "struktur"):
+            raise ValueError(f"by harus model|topic|struktur, bukan {by!r}")
+        where, params = [], []
+        if topic:
+            where.append("i.topic = ?")
+            params.append(topic)
+        if struktur:
+            where.append("i.struktur = ?")
+            params.append(struktur)
+        return self.query(
+            f"SELECT i.{by} AS {by}, COUNT(*) AS n, AVG(v.clarity) AS clarity,"
+            " AVG(v.context_accuracy) AS context_accuracy, AVG(v.quality_of_working) AS quality_of_working,"
+            " AVG(v.final_answer_accuracy = 'Correct') AS correct_rate"
+            " FROM items i JOIN verifications v ON v.item_id = i.id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + f" GROUP BY i.{by} ORDER BY i.{by}",
+            tuple(params),
+        )
+
+
+class RunStoreSink:
+    """Sink (lihat sinks.py) yang menulis ke RunStore per batch transaksi."""
+
+    def __init__(
+        self,
+        store: RunStore,
+        run_key: str,
+        *,
+        topic: str,
+        struktur: str,
+        model: str,
+        batch_size: int | None = None,
+        flush_s: float | None = None,
+    ):
+        self.store = store
+        self.name = pathlib.Path(store.path).name
+        self.run_id = store.start_run(run_key, topic=topic, struktur=struktur, model=model)
+        self.batch_size = max(1, batch_size or int(os.getenv("RUN_STORE_BATCH", "50")))
+        self.flush_s = flush_s if flush_s is not None else float(os.getenv("RUN_STORE_FLUSH_S", "5"))
+        self._buf: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._buf.append(dict(row))
+        if len(self._buf) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_s:
+            self.flush()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for r in rows:
+            self.write(r)
+
+    def flush(self) -> None:
+        if self._buf:
+            self.store.write_rows(self.run_id, self._buf)
+            self._buf = []
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self.store.finish_run(self.run_id)
+
+
+_STORES: Dict[str, RunStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_run_store(path: str | None = None) -> RunStore:
+    """Satu RunStore per path per proses (dipakai bersama sel grid yang paralel)."""
+    key = str(path or os.getenv("RUN_STORE_PATH") or "outputs/runs.sqlite")
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = RunStore(key)
+        return store
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help="default RUN_STORE_PATH atau outputs/runs.sqlite")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="impor outputs/**.csv")
+    imp.add_argument("root", nargs="?", default="outputs")
+    q = sub.add_parser("sql", help="jalankan query dan cetak hasilnya")
+    q.add_argument("sql")
+    args = ap.parse_args()
+
+    store = RunStore(args.db)
+    if args.cmd == "import":
+        root = pathlib.Path(args.root)
+        files = [root] if root.is_file() else sorted(root.rglob("*.csv"))
+        total = 0
+        for f in files:
+            n = store.import_csv(f)
+            total += n
+            print(f"[import] {f}: {n} baris")
+        print(f"[import] {len(files)} file, {total} baris → {store.path}")
+    else:
+        t0 = time.perf_counter()
+        res = store.query(args.sql)
+        ms = (time.perf_counter() - t0) * 1000
+        for r in res:
+            print(r)
+        print(f"[sql] {len(res)} baris, {ms:.1f} ms")
@@ -0,0 +1,429 @@
+# QUESTION_GENERATION/sinks.py
+"""
+Tujuan penulisan baris hasil (satu baris = satu soal, kolom CSV_HEADER).
+
+CsvSink     : CSV append + flush per baris (format lama, bisa di-resume).
+ParquetSink : Parquet (pyarrow, opsional) dengan row group ber-buffer.
+              - kolom angka bertipe (int32 / float32, kosong → null)
+              - kolom kategori (topic, model, struktur, answer, ...) dictionary-encoded
+              - prompt_generator TIDAK diulang per baris: bagian SYSTEM (sama
+                untuk semua soal satu sel) diganti prompt_hash dan teksnya
+                disimpan sekali di sidecar {nama}.prompts.parquet; bagian USER
+                (topic + avoid-list, pendek dan beda tiap soal) di kolom prompt_user
+              File ditulis ke .tmp lalu di-rename saat close(), jadi pembaca
+              tidak pernah melihat file setengah jadi. Konsekuensinya TIDAK
+              tahan crash: footer Parquet baru ditulis saat close(), jadi run
+              yang crash / di-kill meninggalkan .tmp yang tidak bisa dibaca.
+              Jalankan bersama CsvSink (OUTPUT_FORMAT=both) kalau run harus
+              bisa dibaca / di-resume setelah crash; Parquet-nya bisa dibuat
+              ulang dari CSV dengan `python sinks.py convert`.
+MultiSink   : tulis ke beberapa sink sekaligus (OUTPUT_FORMAT=both, csv,sqlite, ...).
+RunStoreSink (run_store.py): SQLite lintas run, OUTPUT_FORMAT=sqlite.
+
+Konversi CSV lama + gabung satu grid:
+    python sinks.py convert outputs/            # outputs/**.csv → .parquet di sebelahnya
+    python sinks.py convert outputs/ --force    # tulis ulang walau .parquet lebih baru
+    python sinks.py convert outputs/ --merge    # + gabung semua run ke outputs/_all.parquet
+
+Baca untuk analisis (satu file gabungan jauh lebih cepat daripada ratusan
+file kecil: tiap file Parquet punya overhead buka/metadata ~2 ms):
+    from sinks import read_results
+    df = read_results("outputs/_all.parquet").to_pandas()
+    df = read_results("outputs/physics/", prompts=True).to_pandas()
+"""
+from __future__ import annotations
+import argparse, csv, hashlib, os, pathlib, re
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+CSV_HEADER = [
+    "topic","model","struktur","index","latency_model_ms",
+    "question","optionA","optionB","optionC","optionD",
+    "answer","solution_model","solution_verifier",
+    "verifier_model","latency_verifier_ms",
+    "clarity","context_accuracy","final_answer_accuracy","quality_of_working","judge_notes",
+    "prompt_generator",
+    "ttft_ms","tokens_per_sec","prompt_tokens","prompt_est_tokens",
+]
+
+_INT_COLS = ("index", "latency_model_ms", "latency_verifier_ms", "ttft_ms", "prompt_tokens", "prompt_est_tokens")
+_FLOAT_COLS = ("clarity", "context_accuracy", "quality_of_working", "tokens_per_sec")
+_DICT_COLS = ("topic", "model", "struktur", "answer", "verifier_model", "final_answer_accuracy", "prompt_hash")
+
+# urutan kolom Parquet: CSV_HEADER dengan prompt_generator → prompt_hash + prompt_user
+PARQUET_COLUMNS = [
+    c2 for c in CSV_HEADER for c2 in (("prompt_hash", "prompt_user") if c == "prompt_generator" else (c,))
+]
+
+# prompt_generator = "SYSTEM: ...\nUSER: ..." (lihat QuizService._generate_attempt)
+_USER_SEP = "\nUSER: "
+
+# file gabungan (merge_results); nama berawalan "_" tidak ikut dibaca sebagai run
+MERGED_NAME = "_all.parquet"
+
+
+OUTPUT_FORMATS = ("csv", "parquet", "sqlite")
+
+
+def parse_output_formats(value: str | Sequence[str] | None) -> Tuple[str, ...]:
+    """
+    "csv" | "parquet" | "sqlite" | "both" (= csv + parquet), atau gabungan
+    dipisah koma / "+", mis. "csv,sqlite" → tuple format (urutan tetap).
+    """
+    parts = list(value) if isinstance(value, (list, tuple)) else re.split(r"[,+\s]+", (value or "csv").strip().lower())
+    out: List[str] = []
+    for p in parts:
+        if not p:
+            continue
+        for fmt in (("csv", "parquet") if p == "both" else (p,)):
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"format output tidak dikenal: {fmt!r} (pilih dari {', '.join(OUTPUT_FORMATS)}, both)")
+            if fmt not in out:
+                out.append(fmt)
+    return tuple(out) or ("csv",)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Output Parquet butuh pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def split_prompt(prompt: str) -> tuple[str, str | None]:
+    """prompt_generator → (bagian SYSTEM, bagian USER atau None)."""
+    head, sep, tail = prompt.rpartition(_USER_SEP)
+    return (head, tail) if sep else (prompt, None)
+
+
+def join_prompt(head: str, user: str | None) -> str:
+    return head + (_USER_SEP + user if user is not None else "")
+
+
+def prompts_path_for(path: str | pathlib.Path) -> pathlib.Path:
+    p = pathlib.Path(path)
+    return p.with_name(p.stem + ".prompts.parquet")
+
+
+def _to_int(v: Any) -> int | None:
+    if v is None or v == "":
+        return None
+    try:
+        return int(float(v))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(v: Any) -> float | None:
+    if v is None or v == "":
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(v: Any) -> str | None:
+    if v is None or v == "":
+        return None
+    return str(v)
+
+
+def _schema(columns: List[str]):
+    pa, _ = _pyarrow()
+    fields = []
+    for c in columns:
+        if c in _INT_COLS:
+            t = pa.int32()
+        elif c in _FLOAT_COLS:
+            t = pa.float32()
+        elif c in _DICT_COLS:
+            t = pa.dictionary(pa.int32(), pa.string())
+        else:
+            t = pa.string()
+        fields.append(pa.field(c, t))
+    return pa.schema(fields)
+
+
+class CsvSink:
+    def __init__(self, path: str | pathlib.Path, fieldnames: List[str] = CSV_HEADER):
+        self.path = pathlib.Path(path)
+        self.name = self.path.name
+        self.created = not self.path.exists()
+        self._f = self.path.open("a", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=fieldnames, extrasaction="ignore")
+        if self.created:
+            self._w.writeheader()
+            self._f.flush()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._w.writerow(row)
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class ParquetSink:
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        *,
+        row_group_size: int | None = None,
+        columns: List[str] = PARQUET_COLUMNS,
+    ):
+        self.pa, self.pq = _pyarrow()
+        self.path = pathlib.Path(path)
+        self.name = self.path.name
+        self.prompts_path = prompts_path_for(self.path)
+        if row_group_size is None:
+            row_group_size = int(os.getenv("PARQUET_ROW_GROUP", "256"))
+        self.row_group_size = max(1, row_group_size)
+        self.columns = list(columns)
+        self.schema = _schema(self.columns)
+        self.rows = 0
+        self._buf: List[Dict[str, Any]] = []
+        self._prompts: Dict[str, str] = {}
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._writer = None
+        self._closed = False
+
+    def write(self, row: Dict[str, Any]) -> None:
+        r = dict(row)
+        prompt = r.pop("prompt_generator", None)
+        if prompt and "prompt_hash" not in r:
+            head, tail = split_prompt(prompt)
+            h = prompt_hash(head)
+            self._prompts.setdefault(h, head)
+            r["prompt_hash"] = h
+            r["prompt_user"] = tail
+        self._buf.append(r)
+        if len(self._buf) >= self.row_group_size:
+            self._flush_group()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for r in rows:
+            self.write(r)
+
+    def _table(self, rows: List[Dict[str, Any]]):
+        pa = self.pa
+        arrays = []
+        for field in self.schema:
+            c = field.name
+            vals = [r.get(c) for r in rows]
+            if c in _INT_COLS:
+                arrays.append(pa.array([_to_int(v) for v in vals], pa.int32()))
+            elif c in _FLOAT_COLS:
+                arrays.append(pa.array([_to_float(v) for v in vals], pa.float32()))
+            elif c in _DICT_COLS:
+                arrays.append(pa.array([_to_str(v) for v in vals], pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array([_to_str(v) for v in vals], pa.string()))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _flush_group(self) -> None:
+        if not self._buf:
+            return
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = self.pq.ParquetWriter(self._tmp, self.schema, compression="zstd")
+        self._writer.write_table(self._table(self._buf), row_group_size=len(self._buf))
+        self.rows += len(self._buf)
+        self._buf = []
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._flush_group()
+        if self._writer is None:
+            # tidak ada baris sama sekali: tetap tulis file kosong ber-skema
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = self.pq.ParquetWriter(self._tmp, self.schema, compression="zstd")
+        self._writer.close()
+        os.replace(self._tmp, self.path)
+        _write_prompts(self.prompts_path, self._prompts)
+
+
+def _write_prompts(path: pathlib.Path, prompts: Dict[str, str]) -> None:
+    pa, pq = _pyarrow()
+    hashes = list(prompts)
+    table = pa.table({
+        "prompt_hash": pa.array(hashes, pa.string()),
+        "prompt_generator": pa.array([prompts[h] for h in hashes], pa.string()),
+    })
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def _read_prompts(path: pathlib.Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    _, pq = _pyarrow()
+    side = pq.read_table(path)
+    return dict(zip(side["prompt_hash"].to_pylist(), side["prompt_generator"].to_pylist()))
+
+
+class MultiSink:
+    def __init__(self, sinks: List[Any]):
+        self.sinks = sinks
+        self.name = " + ".join(s.name for s in sinks)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        for s in self.sinks:
+            s.write(row)
+
+    def close(self) -> None:
+        err = None
+        for s in self.sinks:
+            try:
+                s.close()
+            except Exception as e:
+                err = err or e
+        if err is not None:
+            raise err
+
+
+def read_csv_rows(path: str | pathlib.Path) -> List[Dict[str, Any]]:
+    with pathlib.Path(path).open("r", newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+def rows_by_index(rows: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Satu baris per index (> 0); baris terverifikasi menang atas baris partial."""
+    by_index: Dict[int, Dict[str, Any]] = {}
+    for r in rows:
+        try:
+            idx = int(r.get("index") or 0)
+        except ValueError:
+            continue
+        if idx <= 0:
+            continue
+        if idx not in by_index or not by_index[idx].get("verifier_model"):
+            by_index[idx] = r
+    return by_index
+
+
+def rewrite_csv(path: str | pathlib.Path, rows: Iterable[Dict[str, Any]], fieldnames: List[str] = CSV_HEADER) -> None:
+    """Tulis ulang CSV secara atomic (tmp + os.replace)."""
+    path = pathlib.Path(path)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as fh:
+        w = csv.DictWriter(fh, fieldnames=fieldnames, extrasaction="ignore")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+    os.replace(tmp, path)
+
+
+def convert_csv(csv_path: str | pathlib.Path, out_path: str | pathlib.Path | None = None, *, row_group_size: int | None = None) -> pathlib.Path:
+    """Satu CSV hasil → Parquet (+ sidecar prompt). Return path Parquet."""
+    csv_path = pathlib.Path(csv_path)
+    out = pathlib.Path(out_path) if out_path else csv_path.with_suffix(".parquet")
+    sink = ParquetSink(out, row_group_size=row_group_size or 4096)
+    try:
+        sink.extend(read_csv_rows(csv_path))
+    finally:
+        sink.close()
+    return out
+
+
+def _parquet_files(root: str | pathlib.Path) -> List[pathlib.Path]:
+    p = pathlib.Path(root)
+    if p.is_file():
+        return [p]
+    return sorted(
+        f for f in p.rglob("*.parquet")
+        if not f.name.endswith(".prompts.parquet") and not f.name.startswith("_")
+    )
+
+
+def read_results(root: str | pathlib.Path, *, prompts: bool = False, columns: List[str] | None = None):
+    """
+    Gabungkan semua file hasil Parquet di bawah `root` jadi satu pyarrow.Table.
+    prompts=True → kolom prompt_generator di-join dari sidecar.
+    """
+    pa, pq = _pyarrow()
+    tables = []
+    for f in _parquet_files(root):
+        t = pq.read_table(f, columns=columns)
+        if prompts and "prompt_hash" in t.column_names and prompts_path_for(f).exists():
+            lookup = _read_prompts(prompts_path_for(f))
+            users = t["prompt_user"].to_pylist() if "prompt_user" in t.column_names else [None] * t.num_rows
+            full = [
+                None if h is None else join_prompt(lookup.get(h, ""), u)
+                for h, u in zip(t["prompt_hash"].to_pylist(), users)
+            ]
+            t = t.append_column("prompt_generator", pa.array(full, pa.string()))
+        tables.append(t)
+    if not tables:
+        return pa.table({})
+    # kamus kategori beda per file → disatukan saat concat
+    return pa.concat_tables(tables, promote_options="default").unify_dictionaries()
+
+
+def merge_results(root: str | pathlib.Path, out: str | pathlib.Path | None = None) -> pathlib.Path:
+    """
+    Gabungkan semua file run di bawah `root` jadi satu Parquet (default
+    root/_all.parquet, satu row group per run) + satu sidecar prompt.
+    Kolom tambahan `source` = path file run relatif terhadap root.
+    """
+    pa, pq = _pyarrow()
+    root = pathlib.Path(root)
+    out = pathlib.Path(out) if out else root / MERGED_NAME
+    tables = []
+    prompts: Dict[str, str] = {}
+    for f in _parquet_files(root):
+        t = pq.read_table(f)
+        src = pa.array([f.relative_to(root).as_posix()] * t.num_rows, pa.string()).dictionary_encode()
+        tables.append(t.append_column("source", src))
+        for h, text in _read_prompts(prompts_path_for(f)).items():
+            prompts.setdefault(h, text)
+    if not tables:
+        raise RuntimeError(f"tidak ada file Parquet di {root} (jalankan convert dulu)")
+    table = pa.concat_tables(tables, promote_options="default").unify_dictionaries()
+    tmp = out.with_name(out.name + ".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, out)
+    _write_prompts(prompts_path_for(out), prompts)
+    return out
+
+
+def _convert_tree(root: str, *, force: bool) -> None:
+    files = [pathlib.Path(root)] if pathlib.Path(root).is_file() else sorted(pathlib.Path(root).rglob("*.csv"))
+    before = after = 0
+    done = 0
+    for f in files:
+        out = f.with_suffix(".parquet")
+        if not force and out.exists() and out.stat().st_mtime >= f.stat().st_mtime:
+            continue
+        convert_csv(f, out)
+        before += f.stat().st_size
+        after += out.stat().st_size + prompts_path_for(out).stat().st_size
+        done += 1
+        print(f"[convert] {f} → {out.name}")
+    if done:
+        print(f"[convert] {done} file: {before / 1e6:.2f} MB CSV → {after / 1e6:.2f} MB Parquet ({after / before:.0%})")
+    else:
+        print("[convert] tidak ada CSV baru untuk dikonversi")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert", help="outputs/**.csv → .parquet (+ .prompts.parquet)")
+    c.add_argument("root", nargs="?", default="outputs")
+    c.add_argument("--force", action="store_true")
+    c.add_argument("--merge", action="store_true", help=f"gabung semua run ke {{root}}/{MERGED_NAME}")
+    args = ap.parse_args()
+    if args.cmd == "convert":
+        _convert_tree(args.root, force=args.force)
+        if args.merge:
+            out = merge_results(args.root)
+            print(f"[merge] {out} ({out.stat().st_size / 1e6:.2f} MB)")
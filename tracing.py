@@ -0,0 +1,193 @@
+# QUESTION_GENERATION/tracing.py
+"""
+Tracing per tahap pipeline (span JSONL, durasi dari time.perf_counter).
+
+Aktifkan lewat env QG_TRACE:
+  QG_TRACE=1        → tulis ke .qg_state/trace.jsonl
+  QG_TRACE=path     → tulis ke file itu (append)
+  kosong / 0 / off  → nonaktif (span jadi no-op murah)
+
+Satu record per span:
+  {"ts": epoch_mulai, "run": run_id, "item": index_soal, "stage": "...",
+   "dur_ms": 12.3, "thread": "...", ...atribut, "error": "..."}
+
+run_id dan item dibawa contextvars, jadi span di dalam validator / rate
+limiter otomatis tercatat atas nama item yang sedang diproses. Thread baru
+tidak mewarisi context: jalankan targetnya lewat contextvars.copy_context().run.
+
+Stage yang dipakai: run, prompt_build, generate, parse, normalize, dedup,
+verify (mencakup rate_limit_sleep, verifier_call, retry_backoff di dalamnya),
+rate_limit_sleep (jeda antar item Gemini, source="item_gap"), csv_write.
+"""
+from __future__ import annotations
+import argparse, contextvars, json, os, threading, time, uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from utils.state import state_path
+
+_run_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("qg_run_id", default=None)
+_item_id: contextvars.ContextVar[Any] = contextvars.ContextVar("qg_item_id", default=None)
+
+_lock = threading.Lock()
+_fh = None
+_path: str | None = None
+
+
+def _target() -> str | None:
+    v = (os.getenv("QG_TRACE") or "").strip()
+    if not v or v.lower() in ("0", "off", "false", "no"):
+        return None
+    if v.lower() in ("1", "on", "true", "yes"):
+        return str(state_path("trace.jsonl"))
+    return v
+
+
+def enabled() -> bool:
+    return _target() is not None
+
+
+def _emit(rec: Dict[str, Any]) -> None:
+    global _fh, _path
+    target = _target()
+    if target is None:
+        return
+    line = json.dumps(rec, ensure_ascii=False, default=str)
+    with _lock:
+        if _fh is None or _path != target:
+            if _fh is not None:
+                _fh.close()
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            _fh = open(target, "a", encoding="utf-8", buffering=1)
+            _path = target
+        _fh.write(line + "\n")
+
+
+def current_run() -> str | None:
+    return _run_id.get()
+
+
+@contextmanager
+def span(stage: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Ukur satu tahap. Yield dict atribut yang boleh ditambah di dalam blok
+    (mis. sp["cached"] = True); exception tetap diteruskan, tapi dicatat.
+    """
+    if not enabled():
+        yield attrs
+        return
+    ts = time.time()
+    t0 = time.perf_counter()
+    err = None
+    try:
+        yield attrs
+    except BaseException as e:
+        err = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        rec = {
+            "ts": round(ts, 6),
+            "run": _run_id.get(),
+            "item": _item_id.get(),
+            "stage": stage,
+            "dur_ms": round((time.perf_counter() - t0) * 1000, 3),
+            "thread": threading.current_thread().name,
+            **attrs,
+        }
+        if err:
+            rec["error"] = err
+        _emit(rec)
+
+
+def event(stage: str, dur_s: float | None = None, **attrs: Any) -> None:
+    """Record tanpa blok (durasi sudah diukur di tempat lain, atau titik waktu saja)."""
+    if not enabled():
+        return
+    rec = {
+        "ts": round(time.time(), 6),
+        "run": _run_id.get(),
+        "item": _item_id.get(),
+        "stage": stage,
+        "dur_ms": round(dur_s * 1000, 3) if dur_s is not None else None,
+        "thread": threading.current_thread().name,
+        **attrs,
+    }
+    _emit(rec)
+
+
+@contextmanager
+def run(**attrs: Any) -> Iterator[str]:
+    """Buka run baru (run_id acak) dan catat span "run" untuk seluruh blok."""
+    rid = uuid.uuid4().hex[:12]
+    token = _run_id.set(rid)
+    item_token = _item_id.set(None)
+    try:
+        with span("run", **attrs):
+            try:
+                yield rid
+            finally:
+                _item_id.set(None)
+    finally:
+        _item_id.reset(item_token)
+        _run_id.reset(token)
+
+
+def set_item(item_id: Any) -> None:
+    """Tandai item (index soal, atau list index untuk batch) di context saat ini."""
+    _item_id.set(item_id)
+
+
+def load(path: str, run_id: str | None = None) -> List[Dict[str, Any]]:
+    recs = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if run_id is None or rec.get("run") == run_id:
+                recs.append(rec)
+    return recs
+
+
+def _pct(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def summarize(recs: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Per stage: n, total_ms, p50_ms, p95_ms, p99_ms."""
+    by_stage: Dict[str, List[float]] = {}
+    for r in recs:
+        if r.get("dur_ms") is not None:
+            by_stage.setdefault(r["stage"], []).append(float(r["dur_ms"]))
+    return {
+        st: {
+            "n": len(xs),
+            "total_ms": round(sum(xs), 1),
+            "p50_ms": round(_pct(xs, 50), 1),
+            "p95_ms": round(_pct(xs, 95), 1),
+            "p99_ms": round(_pct(xs, 99), 1),
+        }
+        for st, xs in by_stage.items()
+    }
+
+
+if __name__ == "__main__":
+    # python tracing.py .qg_state/trace.jsonl [--run RUN_ID]
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--run", default=None)
+    args = ap.parse_args()
+    stats = summarize(load(args.path, args.run))
+    wall = stats.pop("run", {}).get("total_ms", 0.0)
+    print(f"{'stage':18} {'n':>6} {'total s':>9} {'share':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for st, v in sorted(stats.items(), key=lambda kv: -kv[1]["total_ms"]):
+        share = f"{v['total_ms'] / wall:6.1%}" if wall else "     -"
+        print(
+            f"{st:18} {v['n']:6d} {v['total_ms'] / 1000:9.1f} {share} "
+            f"{v['p50_ms']:9.1f} {v['p95_ms']:9.1f} {v['p99_ms']:9.1f}"
+        )
+    print(f"run wall clock: {wall / 1000:.1f}s (verify mencakup rate_limit_sleep/verifier_call/retry_backoff)")
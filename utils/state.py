@@ -0,0 +1,22 @@
+# QUESTION_GENERATION/utils/state.py
+import os, pathlib, sqlite3
+
+def state_path(name: str) -> pathlib.Path:
+    """
+    Lokasi file state lokal (rate limiter, cache, dsb.).
+    Default di folder `.qg_state/` (bisa diganti lewat env QG_STATE_DIR).
+    """
+    base = pathlib.Path(os.getenv("QG_STATE_DIR", ".qg_state"))
+    base.mkdir(parents=True, exist_ok=True)
+    return base / name
+
+def connect_sqlite(path: str | os.PathLike, *, timeout: float = 30.0) -> sqlite3.Connection:
+    """
+    Buka koneksi SQLite yang aman dipakai beberapa proses sekaligus:
+    WAL + busy timeout, autocommit (transaksi dibuka manual pakai BEGIN).
+    """
+    conn = sqlite3.connect(str(path), timeout=timeout, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conn
@@ -1,10 +1,13 @@
 # English-only verifier (Gemini 2.5 Pro). No Indonesian mapping.
-import os, time, json, re, random
+import os, time, json, re, random, threading, hashlib
 import google.generativeai as genai
 from utils.load_env import run_load_env
+from json_utils import extract_json_array, parse_tolerant
+from rate_limit import TokenBucketLimiter, get_limiter
+import tracing
 
 run_load_env()
-print("validator_gemini (per-model delay for pro, EN-only)")
+print("validator_gemini (shared token-bucket limiter, EN-only)")
 
 SCHEMA = r"""
 REQUIRED OUTPUT: exactly one JSON object (no extra text):
@@ -31,6 +34,33 @@ SYSTEM_INSTRUCTION = (
     "  3) Return exactly ONE JSON object that matches the schema; do not add any extra text.\n"
 )
 
+BATCH_SCHEMA = r"""
+REQUIRED OUTPUT: exactly one JSON array (no extra text), one object per item, same order as given:
+[
+  {
+    "id": "the item id exactly as given",
+    "solution_verifier": "your own concise worked solution in 3–8 lines, plain text; no LaTeX/backslashes/markdown",
+    "scores": {
+      "clarity": 0.0,
+      "context_accuracy": 0.0,
+      "quality_of_working": 0.0,
+      "final_answer_accuracy": "Correct"  // or "Incorrect"
+    },
+    "notes": "3–6 brief lines justifying each score (plain text)"
+  }
+]
+Constraints:
+- Judge every item independently; never let one item influence another.
+- Numeric scores must be within 0.0 to 5.0 (decimals allowed).
+- Final Answer Accuracy must be exactly one of: "Correct" or "Incorrect".
+"""
+
+# Versi prompt judge: berubah otomatis kalau SYSTEM_INSTRUCTION / SCHEMA diubah
+JUDGE_PROMPT_VERSION = hashlib.sha256((SYSTEM_INSTRUCTION + "\n" + SCHEMA).encode("utf-8")).hexdigest()[:16]
+
+def default_verifier_model() -> str:
+    return os.getenv("GEMINI_VERIFIER_MODEL", "gemini-2.5-pro")
+
 def _usage_to_dict(usage) -> dict | None:
     if usage is None:
         return None
@@ -42,32 +72,12 @@ def _usage_to_dict(usage) -> dict | None:
     return out or {"repr": repr(usage)}
 
 def _extract_json_object(text: str) -> dict | None:
-    s = (text or "").strip()
-    # strip code fences if any
-    s = re.sub(r"```json|```", "", s, flags=re.I).strip()
-    start = s.find("{")
-    if start == -1:
-        return None
-    depth, end = 0, -1
-    for i, ch in enumerate(s[start:], start=start):
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                end = i
-                break
-    if end == -1:
-        return None
-    chunk = s[start:end+1]
-    # normalise quotes
-    chunk = chunk.replace("“", '"').replace("”", '"').replace("’", "'").replace("‘", "'")
-    # trailing commas
-    chunk = re.sub(r",\s*}", "}", chunk)
+    # parser toleran bersama (fence, smart quotes, trailing comma, dsb.)
     try:
-        return json.loads(chunk)
-    except Exception:
+        obj, _ = parse_tolerant(text, "object")
+    except ValueError:
         return None
+    return obj if isinstance(obj, dict) else None
 
 def _build_messages_with_roles(
     question: str,
@@ -105,20 +115,85 @@ def _build_messages_with_roles(
         {"role": "user", "parts": [user_2]},
     ]
 
-_LAST_CALL_TS: dict[str, float] = {}
+def _build_batch_messages(items: list[dict]):
+    """Versi multi-item dari _build_messages_with_roles; tiap item diberi `id`."""
+    def _opts(o):
+        return ("Options:\n" + "\n".join(f"- {x}" for x in o) + "\n") if o else ""
+
+    blocks = [
+        f"### Item id: {it['id']}\n"
+        f"Question:\n{it['question']}\n\n{_opts(it.get('options'))}"
+        f"Key (A/B/C/D if provided): {it.get('answer') or '-'}\n"
+        for it in items
+    ]
+    user_1 = (
+        f"The following {len(items)} MCQs are to be evaluated. Solve EACH one independently FIRST; "
+        "do NOT use the generator's solutions until afterwards.\n\n" + "\n".join(blocks)
+    )
+    model_msg = (
+        "GENERATOR_SOLUTIONS (THESE ARE NOT your answers; use ONLY after you finish your own solutions):\n\n"
+        + "\n".join(f"### Item id: {it['id']}\n{(it.get('solution') or '').strip()}\n" for it in items)
+    )
+    user_2 = (
+        "Your tasks, for EACH item:\n"
+        "1) Solve the item INDEPENDENTLY without reading its GENERATOR_SOLUTION above.\n"
+        "2) After you have your own answer, evaluate the QUESTION and the GENERATOR_SOLUTION using these metrics:\n"
+        "   - Clarity (0–5, decimals allowed): wording/notation/data sufficiency.\n"
+        "   - Context Accuracy (0–5): realism and conceptual correctness of context/values.\n"
+        "   - Quality of Working (0–5): soundness of the generator's reasoning/steps, formulas, arithmetic, units, rounding, consistency.\n"
+        '   - Final Answer Accuracy: "Correct" or "Incorrect" — judge the generator\'s final answer against the question.\n'
+        "3) Output EXACTLY one JSON array using the following schema (no extra text):\n\n"
+        f"{BATCH_SCHEMA}"
+    )
+    return [
+        {"role": "user", "parts": [user_1]},
+        {"role": "model", "parts": [model_msg]},
+        {"role": "user", "parts": [user_2]},
+    ]
+
+# Versi prompt judge batch (verify_many): terpisah dari JUDGE_PROMPT_VERSION supaya
+# vonis batch dan single tidak bercampur di verify_cache, dan berubah otomatis kalau
+# BATCH_SCHEMA atau teks prompt batch (_build_batch_messages) diubah
+JUDGE_BATCH_PROMPT_VERSION = hashlib.sha256(
+    (
+        "batch\n" + SYSTEM_INSTRUCTION + "\n"
+        + json.dumps(
+            _build_batch_messages([{"id": "0", "question": "", "options": ["", "", "", ""], "answer": "", "solution": ""}]),
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+    ).encode("utf-8")
+).hexdigest()[:16]
 
 def _desired_gap_seconds(model_id: str) -> float:
     if "pro" in model_id.lower():
         return float(os.getenv("GEMINI_PRO_DELAY_SEC", "30"))
     return float(os.getenv("GEMINI_DELAY_BETWEEN_CALLS", "1.0"))
 
-def _delay_for_model(model_id: str):
+def _limiter_for_model(model_id: str) -> TokenBucketLimiter | None:
+    """
+    Budget verifier dalam RPM/TPM/RPD (dibagi antar thread & proses lokal).
+    Kalau GEMINI_VERIFIER_RPM tidak di-set, RPM diturunkan dari jeda lama
+    (GEMINI_PRO_DELAY_SEC / GEMINI_DELAY_BETWEEN_CALLS) dengan burst 1.
+    """
     gap = max(0.0, _desired_gap_seconds(model_id))
-    last = _LAST_CALL_TS.get(model_id, 0.0)
-    now = time.time()
-    if last > 0 and now - last < gap:
-        time.sleep(gap - (now - last))
-    _LAST_CALL_TS[model_id] = time.time()
+    rpm = float(os.getenv("GEMINI_VERIFIER_RPM", "0") or 0) or (60.0 / gap if gap > 0 else 0)
+    tpm = float(os.getenv("GEMINI_VERIFIER_TPM", "0") or 0)
+    rpd = float(os.getenv("GEMINI_VERIFIER_RPD", "0") or 0)
+    if not (rpm or tpm or rpd):
+        return None
+    return get_limiter(
+        f"gemini:{model_id}",
+        rpm=rpm or None,
+        tpm=tpm or None,
+        rpd=rpd or None,
+        burst=int(os.getenv("GEMINI_VERIFIER_BURST", "1")),
+    )
+
+def _estimate_tokens(messages) -> int:
+    # kasar: ~4 karakter per token untuk prompt + jatah output judge
+    chars = sum(len(p) for m in messages for p in m.get("parts", []) if isinstance(p, str))
+    return chars // 4 + int(os.getenv("GEMINI_VERIFIER_EST_OUTPUT_TOKENS", "1024"))
 
 def _parse_retry_seconds(msg: str) -> float | None:
     m = re.search(r"retry in\s+([0-9]+(?:\.[0-9]+)?)s", msg, re.I)
@@ -145,86 +220,7 @@ def _is_rate_like(msg: str) -> bool:
         or "too many requests" in low
     )
 
-def _generate_with_retry(model, model_id: str, messages, temperature: float):
-    max_retries = int(os.getenv("GENAI_MAX_RETRIES", "6"))
-    backoff_base = float(os.getenv("GENAI_BACKOFF_BASE", "1.8"))
-    timeout = float(os.getenv("GENAI_TIMEOUT", "90"))
-
-    for attempt in range(max_retries):
-        try:
-            _delay_for_model(model_id)
-            return model.generate_content(
-                messages,
-                generation_config={"temperature": float(temperature)},
-                request_options={"timeout": timeout},
-            )
-        except Exception as e:
-            msg = str(e)
-            # --- DEBUG LOG BIAR KELIHATAN ERROR ASLINYA ---
-            print("=== Gemini verifier error ===")
-            print(f"  attempt {attempt+1}/{max_retries}")
-            print(f"  type    : {type(e).__name__}")
-            print(f"  message : {msg[:500]}")
-            inner = getattr(e, "__cause__", None) or getattr(e, "__context__", None)
-            if inner is not None:
-                print(f"  inner   : {repr(inner)[:500]}")
-
-            # Hint retry delay dari message (jika ada)
-            hinted = _parse_retry_seconds(msg)
-            if hinted is not None:
-                sleep_s = hinted + random.uniform(0, 0.5)
-                print(f"  hint retry in ~{sleep_s:.1f}s")
-                time.sleep(sleep_s)
-                continue
-
-            # Rate-limit / quota style → exponential backoff
-            if _is_rate_like(msg):
-                sleep_s = min(30.0, (backoff_base ** attempt) + random.uniform(0, 0.5))
-                print(f"  classified as rate/quota issue → sleep {sleep_s:.1f}s then retry")
-                time.sleep(sleep_s)
-                continue
-
-            # Bukan rate-limit → langsung lempar keluar, jangan dibungkus 'rate limited'
-            print("  non-rate error → aborting retries")
-            raise
-
-    # Kalau benar-benar habis retry dan semua dianggap rate/quota
-    raise RuntimeError("Gemini verifier rate limited after retries")
-
-def verify_with_gemini(
-    question: str,
-    *,
-    options: list[str] | None = None,
-    answer_key: str | None = None,
-    model_solution: str | None = None,
-    model_name: str | None = None,
-    temperature: float = 0.15,
-):
-    api_key = os.getenv("GEMINI_API_KEY") or ""
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY is empty or not set. Check your .env and run_load_env().")
-
-    genai.configure(api_key=api_key)
-    model_id = model_name or os.getenv("GEMINI_VERIFIER_MODEL", "gemini-2.5-pro")
-
-    try:
-        model = genai.GenerativeModel(model_id, system_instruction=SYSTEM_INSTRUCTION)
-        use_sys_in_user = False
-    except TypeError:
-        # older client that does not accept system_instruction
-        model = genai.GenerativeModel(model_id)
-        use_sys_in_user = True
-
-    messages = _build_messages_with_roles(question, options, answer_key, model_solution)
-    if use_sys_in_user:
-        messages[0]["parts"][0] = SYSTEM_INSTRUCTION + "\n\n" + messages[0]["parts"][0]
-
-    t0 = time.time()
-    resp = _generate_with_retry(model, model_id, messages, temperature)
-    latency_ms = int((time.time() - t0) * 1000)
-    usage = _usage_to_dict(getattr(resp, "usage_metadata", None))
-
-    # Extract text
+def _response_text(resp) -> str:
     text = (getattr(resp, "text", None) or "").strip()
     if not text and getattr(resp, "candidates", None):
         for c in resp.candidates:
@@ -235,19 +231,21 @@ def verify_with_gemini(
                         break
             if text:
                 break
+    return text
 
-    obj = _extract_json_object(text) or {}
+def _clamp05(x) -> float:
+    try:
+        v = float(x)
+    except Exception:
+        return 0.0
+    return max(0.0, min(5.0, v))
+
+def _normalize_judgement(obj: dict, text: str) -> dict:
+    """Rapikan objek JSON dari judge → solution_verifier/scores/notes."""
     solution_verifier = (obj.get("solution_verifier") or "").strip()
     scores = obj.get("scores") or {}
     notes = (obj.get("notes") or "").strip()
 
-    def clamp05(x):
-        try:
-            v = float(x)
-        except Exception:
-            return 0.0
-        return max(0.0, min(5.0, v))
-
     faa_raw = str(scores.get("final_answer_accuracy", "")).strip().lower()
     if faa_raw.startswith(("c", "t")):
         faa = "Correct"
@@ -257,9 +255,9 @@ def verify_with_gemini(
         faa = ""
 
     norm_scores = {
-        "clarity": clamp05(scores.get("clarity", 0)),
-        "context_accuracy": clamp05(scores.get("context_accuracy", 0)),
-        "quality_of_working": clamp05(scores.get("quality_of_working", 0)),
+        "clarity": _clamp05(scores.get("clarity", 0)),
+        "context_accuracy": _clamp05(scores.get("context_accuracy", 0)),
+        "quality_of_working": _clamp05(scores.get("quality_of_working", 0)),
         "final_answer_accuracy": faa,
     }
 
@@ -268,15 +266,254 @@ def verify_with_gemini(
         solution_verifier = text
 
     return {
-        "model": f"gemini:{model_id}",
-        "latencyMs": latency_ms,
-        "usage": usage,
-        "rawText": text,
         "solution_verifier": solution_verifier,
         "scores": norm_scores,
         "notes": notes,
     }
 
+
+class Verifier:
+    """
+    Sesi verifier yang dipakai ulang antar item: genai.configure, GenerativeModel
+    (dengan SYSTEM_INSTRUCTION) dan semua setting env dibaca SEKALI di sini.
+    """
+
+    def __init__(self, model_name: str | None = None, *, api_key: str | None = None, client=None):
+        self.model_id = model_name or default_verifier_model()
+        self.max_retries = max(1, int(os.getenv("GENAI_MAX_RETRIES", "6")))
+        self.backoff_base = float(os.getenv("GENAI_BACKOFF_BASE", "1.8"))
+        self.timeout = float(os.getenv("GENAI_TIMEOUT", "90"))
+        self.limiter = _limiter_for_model(self.model_id)
+        self.retries = 0
+
+        if client is not None:
+            # objek dengan generate_content() (mis. loadtest.fakes.FakeGeminiModel)
+            self._model = client
+            self._sys_in_user = False
+            return
+
+        api_key = api_key or os.getenv("GEMINI_API_KEY") or ""
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY is empty or not set. Check your .env and run_load_env().")
+
+        genai.configure(api_key=api_key)
+        try:
+            self._model = genai.GenerativeModel(self.model_id, system_instruction=SYSTEM_INSTRUCTION)
+            self._sys_in_user = False
+        except TypeError:
+            # older client that does not accept system_instruction
+            self._model = genai.GenerativeModel(self.model_id)
+            self._sys_in_user = True
+
+    def _generate_with_retry(self, messages, temperature: float):
+        """Return (response, detik menunggu rate limiter)."""
+        max_retries = self.max_retries
+        backoff_base = self.backoff_base
+        est_tokens = _estimate_tokens(messages)
+        waited = 0.0
+
+        for attempt in range(max_retries):
+            try:
+                if self.limiter is not None:
+                    w = self.limiter.acquire(est_tokens)
+                    if w > 0:
+                        tracing.event("rate_limit_sleep", w, source="verifier_limiter", tokens=est_tokens)
+                    waited += w
+                with tracing.span("verifier_call", model=self.model_id, attempt=attempt + 1):
+                    resp = self._model.generate_content(
+                        messages,
+                        generation_config={"temperature": float(temperature)},
+                        request_options={"timeout": self.timeout},
+                    )
+                if self.limiter is not None:
+                    total = getattr(getattr(resp, "usage_metadata", None), "total_token_count", None)
+                    if total:
+                        self.limiter.adjust_tokens(int(total) - est_tokens)
+                return resp, waited
+            except Exception as e:
+                msg = str(e)
+                # --- DEBUG LOG BIAR KELIHATAN ERROR ASLINYA ---
+                print("=== Gemini verifier error ===")
+                print(f"  attempt {attempt+1}/{max_retries}")
+                print(f"  type    : {type(e).__name__}")
+                print(f"  message : {msg[:500]}")
+                inner = getattr(e, "__cause__", None) or getattr(e, "__context__", None)
+                if inner is not None:
+                    print(f"  inner   : {repr(inner)[:500]}")
+
+                # Hint retry delay dari message (jika ada)
+                hinted = _parse_retry_seconds(msg)
+                if hinted is not None:
+                    sleep_s = hinted + random.uniform(0, 0.5)
+                    print(f"  hint retry in ~{sleep_s:.1f}s")
+                    self.retries += 1
+                    with tracing.span("retry_backoff", attempt=attempt + 1, hinted=True):
+                        time.sleep(sleep_s)
+                    continue
+
+                # Rate-limit / quota style → exponential backoff
+                if _is_rate_like(msg):
+                    sleep_s = min(30.0, (backoff_base ** attempt) + random.uniform(0, 0.5))
+                    print(f"  classified as rate/quota issue → sleep {sleep_s:.1f}s then retry")
+                    self.retries += 1
+                    with tracing.span("retry_backoff", attempt=attempt + 1, hinted=False):
+                        time.sleep(sleep_s)
+                    continue
+
+                # Bukan rate-limit → langsung lempar keluar, jangan dibungkus 'rate limited'
+                print("  non-rate error → aborting retries")
+                raise
+
+        # Kalau benar-benar habis retry dan semua dianggap rate/quota
+        raise RuntimeError("Gemini verifier rate limited after retries")
+
+    def _messages(self, user_parts: list[dict]) -> list[dict]:
+        if self._sys_in_user:
+            user_parts[0]["parts"][0] = SYSTEM_INSTRUCTION + "\n\n" + user_parts[0]["parts"][0]
+        return user_parts
+
+    def verify(
+        self,
+        question: str,
+        *,
+        options: list[str] | None = None,
+        answer_key: str | None = None,
+        model_solution: str | None = None,
+        temperature: float = 0.15,
+    ) -> dict:
+        messages = self._messages(
+            _build_messages_with_roles(question, options, answer_key, model_solution)
+        )
+
+        t0 = time.time()
+        resp, waited = self._generate_with_retry(messages, temperature)
+        latency_ms = int((time.time() - t0) * 1000)
+        usage = _usage_to_dict(getattr(resp, "usage_metadata", None))
+
+        text = _response_text(resp)
+        judged = _normalize_judgement(_extract_json_object(text) or {}, text)
+
+        return {
+            "model": f"gemini:{self.model_id}",
+            "latencyMs": latency_ms,
+            "usage": usage,
+            "rawText": text,
+            "rateLimitWaitMs": int(waited * 1000),
+            **judged,
+        }
+
+    def verify_many(self, items: list[dict], *, temperature: float = 0.15) -> dict[str, dict]:
+        """
+        Nilai beberapa MCQ dalam SATU request judge.
+
+        items: list of {"id", "question", "options", "answer", "solution"}.
+        Return {id: hasil seperti verify()}. Item yang hasilnya hilang/rusak di
+        respons batch dinilai ulang satu per satu lewat verify().
+        latencyMs & rateLimitWaitMs hasil batch dibagi rata per item (amortized).
+        """
+        items = [{**it, "id": str(it["id"])} for it in items]
+        if len(items) == 1:
+            it = items[0]
+            return {it["id"]: self.verify(
+                it["question"],
+                options=it.get("options"),
+                answer_key=it.get("answer"),
+                model_solution=it.get("solution"),
+                temperature=temperature,
+            )}
+
+        messages = self._messages(_build_batch_messages(items))
+        t0 = time.time()
+        resp, waited = self._generate_with_retry(messages, temperature)
+        latency_ms = int((time.time() - t0) * 1000)
+        usage = _usage_to_dict(getattr(resp, "usage_metadata", None))
+        text = _response_text(resp)
+
+        try:
+            parsed = extract_json_array(text)
+        except Exception:
+            parsed = []
+        by_id = {
+            str(o.get("id")).strip(): o
+            for o in parsed
+            if isinstance(o, dict) and o.get("id") is not None
+        }
+
+        n = len(items)
+        out: dict[str, dict] = {}
+        for it in items:
+            obj = by_id.get(it["id"])
+            if (
+                isinstance(obj, dict)
+                and isinstance(obj.get("scores"), dict)
+                and (obj.get("solution_verifier") or "").strip()
+            ):
+                judged = _normalize_judgement(obj, text)
+                if judged["scores"]["final_answer_accuracy"]:
+                    out[it["id"]] = {
+                        "model": f"gemini:{self.model_id}",
+                        "latencyMs": latency_ms // n,
+                        "usage": usage,
+                        "rawText": text,
+                        "rateLimitWaitMs": int(waited * 1000) // n,
+                        "batchSize": n,
+                        **judged,
+                    }
+                    continue
+            print(f"  batch judge: item {it['id']} missing/malformed → single-item fallback")
+            out[it["id"]] = self.verify(
+                it["question"],
+                options=it.get("options"),
+                answer_key=it.get("answer"),
+                model_solution=it.get("solution"),
+                temperature=temperature,
+            )
+        return out
+
+
+_VERIFIERS: dict[str, Verifier] = {}
+_VERIFIERS_LOCK = threading.Lock()
+
+def get_verifier(model_name: str | None = None) -> Verifier:
+    """Instance Verifier default (satu per model id), dibuat saat pertama dipakai."""
+    model_id = model_name or default_verifier_model()
+    with _VERIFIERS_LOCK:
+        v = _VERIFIERS.get(model_id)
+        if v is None:
+            v = Verifier(model_id)
+            _VERIFIERS[model_id] = v
+        return v
+
+def register_verifier(verifier: Verifier) -> None:
+    """Pasang instance Verifier sendiri (mis. backend palsu untuk loadtest) untuk model id-nya."""
+    with _VERIFIERS_LOCK:
+        _VERIFIERS[verifier.model_id] = verifier
+
+def verify_with_gemini(
+    question: str,
+    *,
+    options: list[str] | None = None,
+    answer_key: str | None = None,
+    model_solution: str | None = None,
+    model_name: str | None = None,
+    temperature: float = 0.15,
+):
+    return get_verifier(model_name).verify(
+        question,
+        options=options,
+        answer_key=answer_key,
+        model_solution=model_solution,
+        temperature=temperature,
+    )
+
+def verify_many_with_gemini(
+    items: list[dict],
+    *,
+    model_name: str | None = None,
+    temperature: float = 0.15,
+) -> dict[str, dict]:
+    return get_verifier(model_name).verify_many(items, temperature=temperature)
+
 ##################################################################
 
 # Verifier via MAIA Router (OpenAI-compatible, EN-only).
@@ -0,0 +1,61 @@
+# QUESTION_GENERATION/verify_cache.py
+"""
+Cache hasil verifikasi judge (persisten, SQLite).
+
+Kunci = hash item ternormalisasi (question, options, answer, solution)
+      + model judge + versi prompt judge (validator_gemini.JUDGE_PROMPT_VERSION,
+        atau JUDGE_BATCH_PROMPT_VERSION untuk vonis verify_many).
+Jadi item yang sama persis tidak dinilai ulang di run berikutnya, tapi
+ganti model judge / ubah SYSTEM_INSTRUCTION / SCHEMA / BATCH_SCHEMA otomatis invalidasi.
+"""
+from __future__ import annotations
+import hashlib, json, threading, time
+from typing import Any, Dict
+
+from utils.state import state_path, connect_sqlite
+
+
+def item_hash(q: Dict[str, Any]) -> str:
+    """Hash stabil dari item hasil normalize_quiz."""
+    blob = json.dumps(
+        {
+            "question": (q.get("question") or "").strip(),
+            "options": [str(o).strip() for o in (q.get("options") or [])],
+            "answer": str(q.get("answer") or "").strip().upper(),
+            "solution": (q.get("solution") or "").strip(),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class VerificationCache:
+    def __init__(self, path: str | None = None):
+        self.path = path or str(state_path("verify_cache.sqlite"))
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verifications ("
+            " item_hash TEXT NOT NULL, judge_model TEXT NOT NULL, prompt_version TEXT NOT NULL,"
+            " result TEXT NOT NULL, created REAL NOT NULL,"
+            " PRIMARY KEY (item_hash, judge_model, prompt_version))"
+        )
+
+    def get(self, ihash: str, judge_model: str, prompt_version: str) -> Dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM verifications"
+                " WHERE item_hash = ? AND judge_model = ? AND prompt_version = ?",
+                (ihash, judge_model, prompt_version),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, ihash: str, judge_model: str, prompt_version: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verifications"
+                "(item_hash, judge_model, prompt_version, result, created) VALUES (?, ?, ?, ?, ?)",
+                (ihash, judge_model, prompt_version, json.dumps(result, ensure_ascii=False), time.time()),
+            )
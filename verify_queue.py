@@ -0,0 +1,253 @@
+# QUESTION_GENERATION/verify_queue.py
+"""
+Antrian verifikasi tertunda (persisten, SQLite).
+
+Dengan VERIFY_ON_ERROR=defer, kalau judge gagal (kuota habis, 429/503
+berulang, timeout) run TIDAK berhenti: baris partial tetap ditulis ke output,
+itemnya masuk antrian ini, dan generator lanjut ke soal berikutnya. Selama
+judge dianggap down (backoff), soal baru langsung masuk antrian tanpa
+mencoba judge dulu.
+
+Antrian dikosongkan (soal dinilai, baris CSV / Parquet / run store diisi):
+  - otomatis di akhir run, kalau judge sudah pulih
+  - kapan saja lewat CLI (run yang masih berjalan di proses lain selalu
+    dilewati, juga dengan --run):
+
+    python verify_queue.py status
+    python verify_queue.py drain [--batch 4] [--limit N] [--run outputs/.../x.csv]
+"""
+from __future__ import annotations
+import argparse, json, os, pathlib, threading, time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sinks import ParquetSink, read_csv_rows, read_results, rewrite_csv, rows_by_index
+from utils.state import connect_sqlite, state_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    row TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE(run_key, idx)
+);
+CREATE TABLE IF NOT EXISTS active_runs (
+    run_key TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class VerifyQueue:
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("VERIFY_QUEUE_PATH") or str(state_path("verify_queue.sqlite"))
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(self.path)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- job ----------
+
+    def put(self, run_key: str, row: Dict[str, Any], error: str = "") -> None:
+        """Masukkan (atau perbarui) baris partial run_key/index ke antrian."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs(run_key, idx, row, last_error, created, updated) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(run_key, idx) DO UPDATE SET row = excluded.row,"
+                " last_error = excluded.last_error, updated = excluded.updated",
+                (run_key, int(row["index"]), json.dumps(row, ensure_ascii=False), error[:500], now, now),
+            )
+
+    def pending(self, run_key: str | None = None, *, limit: int | None = None, skip_active: bool = True) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        [(run_key, row)] urut run lalu index. skip_active (default) → lewati run yang
+        sedang ditulis proses lain; False hanya untuk inspeksi, jangan untuk drain.
+        """
+        where, params = [], []
+        if run_key is not None:
+            where.append("run_key = ?")
+            params.append(run_key)
+        if skip_active:
+            # filter di SQL, sebelum LIMIT: job run aktif tidak boleh memakan jatah limit
+            busy = sorted(self.active_runs(exclude_self=True))
+            if busy:
+                where.append(f"run_key NOT IN ({', '.join('?' * len(busy))})")
+                params.extend(busy)
+        sql = "SELECT run_key, row FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY run_key, idx"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(k, json.loads(r)) for k, r in rows]
+
+    def complete(self, run_key: str, idxs: Iterable[int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM jobs WHERE run_key = ? AND idx = ?", [(run_key, int(i)) for i in idxs]
+            )
+
+    def fail(self, run_key: str, idxs: Iterable[int], error: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET attempts = attempts + 1, last_error = ?, updated = ? WHERE run_key = ? AND idx = ?",
+                [(error[:500], time.time(), run_key, int(i)) for i in idxs],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT run_key, COUNT(*) FROM jobs GROUP BY run_key ORDER BY run_key"))
+
+    # ---------- run yang sedang ditulis ----------
+
+    def begin_run(self, run_key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO active_runs(run_key, pid, started) VALUES (?, ?, ?)",
+                (run_key, os.getpid(), time.time()),
+            )
+
+    def end_run(self, run_key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM active_runs WHERE run_key = ? AND pid = ?", (run_key, os.getpid()))
+
+    def active_runs(self, *, exclude_self: bool = False) -> set:
+        with self._lock:
+            rows = self._conn.execute("SELECT run_key, pid FROM active_runs").fetchall()
+        me = os.getpid()
+        return {k for k, pid in rows if _pid_alive(pid) and not (exclude_self and pid == me)}
+
+
+class JudgeBackoff:
+    """
+    Setelah judge gagal, anggap judge down selama jeda backoff (mulai
+    VERIFY_DEFER_BACKOFF_S, dobel tiap gagal lagi, maks VERIFY_DEFER_BACKOFF_MAX_S);
+    satu sukses mengembalikan ke normal. Dipakai bersama sel grid yang paralel.
+    """
+
+    def __init__(self, base_s: float | None = None, max_s: float | None = None):
+        self.base_s = base_s if base_s is not None else float(os.getenv("VERIFY_DEFER_BACKOFF_S", "30"))
+        self.max_s = max_s if max_s is not None else float(os.getenv("VERIFY_DEFER_BACKOFF_MAX_S", "600"))
+        self._lock = threading.Lock()
+        self._current = 0.0
+        self._until = 0.0
+
+    def remaining(self) -> float:
+        with self._lock:
+            return max(0.0, self._until - time.monotonic())
+
+    def failed(self) -> float:
+        with self._lock:
+            self._current = min(self.max_s, self._current * 2 if self._current else self.base_s)
+            self._until = time.monotonic() + self._current
+            return self._current
+
+    def ok(self) -> None:
+        with self._lock:
+            self._current = 0.0
+            self._until = 0.0
+
+
+def apply_to_outputs(run_key: str, rows: List[Dict[str, Any]]) -> List[str]:
+    """
+    Tulis baris terverifikasi ke semua output run yang ada: CSV (run_key),
+    Parquet di sebelahnya, dan run store (kalau run itu tercatat di sana).
+    Baris lama dengan index yang sama diganti; return nama output yang diperbarui.
+    """
+    csv_path = pathlib.Path(run_key)
+    new = {int(r["index"]): r for r in rows}
+    updated = []
+
+    def merged(existing: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_index = rows_by_index(existing)
+        by_index.update(new)
+        return [by_index[i] for i in sorted(by_index)]
+
+    if csv_path.exists():
+        rewrite_csv(csv_path, merged(read_csv_rows(csv_path)))
+        updated.append(csv_path.name)
+    pq_path = csv_path.with_suffix(".parquet")
+    if pq_path.exists():
+        existing = read_results(pq_path, prompts=True).to_pylist()
+        sink = ParquetSink(pq_path, row_group_size=4096)
+        try:
+            sink.extend(merged(existing))
+        finally:
+            sink.close()
+        updated.append(pq_path.name)
+    store_path = os.getenv("RUN_STORE_PATH") or "outputs/runs.sqlite"
+    if pathlib.Path(store_path).exists():
+        from run_store import get_run_store
+
+        store = get_run_store(store_path)
+        found = store.query("SELECT id FROM runs WHERE run_key = ?", (run_key,))
+        if found:
+            store.write_rows(found[0]["id"], rows)
+            updated.append(pathlib.Path(store_path).name)
+    return updated
+
+
+_QUEUES: Dict[str, VerifyQueue] = {}
+_QUEUES_LOCK = threading.Lock()
+_BACKOFF = JudgeBackoff()
+
+
+def get_verify_queue(path: str | None = None) -> VerifyQueue:
+    """Satu VerifyQueue per path per proses."""
+    key = str(path or os.getenv("VERIFY_QUEUE_PATH") or state_path("verify_queue.sqlite"))
+    with _QUEUES_LOCK:
+        q = _QUEUES.get(key)
+        if q is None:
+            q = _QUEUES[key] = VerifyQueue(key)
+        return q
+
+
+def get_judge_backoff() -> JudgeBackoff:
+    return _BACKOFF
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="jumlah item tertunda per run")
+    dr = sub.add_parser("drain", help="nilai item tertunda dan isi baris output")
+    dr.add_argument("--run", default=None, help="hanya run ini (path CSV)")
+    dr.add_argument("--batch", type=int, default=4, help="item per request judge (verify_many)")
+    dr.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "status":
+        q = get_verify_queue()
+        counts = q.counts()
+        active = q.active_runs()
+        for k, n in counts.items():
+            print(f"{n:5d}  {k}{'  (running)' if k in active else ''}")
+        print(f"[verify_queue] {sum(counts.values())} item tertunda di {len(counts)} run ({q.path})")
+    else:
+        from main import drain
+
+        drain(run=args.run, batch=args.batch, limit=args.limit)